@@ -0,0 +1,59 @@
+import unittest
+try:
+	from unittest.mock import Mock
+except ImportError:
+	from mock import Mock
+
+from tuned.hardware.event_queue import DeviceEventQueue
+
+def device(sys_name, subsystem = "net"):
+	return Mock(subsystem = subsystem, sys_name = sys_name,
+			sys_path = "/sys/devices/%s" % sys_name)
+
+class DeviceEventQueueTestCase(unittest.TestCase):
+	def setUp(self):
+		self._events = []
+		self._queue = DeviceEventQueue(self._handler, max_depth = 3, workers = 2)
+
+	def _handler(self, event, device):
+		self._events.append((event, device.sys_name))
+
+	def test_coalescing(self):
+		vf0 = device("vf0")
+		vf1 = device("vf1")
+		self._queue.put("add", vf0)
+		self._queue.put("change", vf0)
+		self._queue.put("add", vf1)
+		self._queue.put("remove", vf1)
+		self._queue.put("change", device("eth0"))
+		self._queue.put("change", device("eth0"))
+		stats = self._queue.stats()
+		self.assertEqual(stats["depth"], 2)
+		self.assertEqual(stats["coalesced"], 4)
+
+		self._queue.start()
+		self._queue.stop()
+		self.assertEqual(self._events, [("add", "vf0"), ("change", "eth0")])
+		self.assertEqual(self._queue.stats()["processed"], 2)
+
+	def test_drops(self):
+		for i in range(4):
+			self._queue.put("add", device("vf%d" % i))
+		self.assertTrue(self._queue.put("add", device("sda", "block")))
+		stats = self._queue.stats()
+		self.assertEqual(stats["dropped"], 1)
+		self.assertEqual(stats["max_depth"], 3)
+
+		self._queue.start()
+		self._queue.stop()
+		self.assertEqual([e for e in self._events if e[1] != "sda"],
+				[("add", "vf0"), ("add", "vf1"), ("add", "vf2")])
+		self.assertIn(("add", "sda"), self._events)
+
+	def test_remove_and_add(self):
+		vf0 = device("vf0")
+		self._queue.put("remove", vf0)
+		self._queue.put("add", vf0)
+		self._queue.start()
+		self._queue.stop()
+		self.assertEqual(self._events, [("remove", "vf0"), ("add", "vf0")])
@@ -58,6 +58,40 @@ class InventoryTestCase(unittest.TestCase):
 		self.assertFalse(self._dummier.CallbackWasCalled)
 		self.assertIsNone(self._inventory._monitor_observer)
 
+	def test_device_cache(self):
+		inventory = Inventory(set_receive_buffer_size=False)
+		dummy = DummyPlugin()
+		inventory.subscribe(dummy,subsystem_name,dummy.TestCallback)
+		device1 = Mock(subsystem = subsystem_name,sys_name = "dev1",
+				sys_path = "/sys/devices/dev1")
+		inventory._handle_udev_event("add", device1)
+		self.assertIs(inventory.get_device(subsystem_name,"dev1"),device1)
+
+		device2 = Mock(subsystem = subsystem_name,sys_name = "dev2",
+				sys_path = "/sys/devices/dev2",
+				properties = {"DEVPATH_OLD": "/devices/dev1"})
+		inventory._handle_udev_event("move", device2)
+		self.assertIsNone(inventory.get_device(subsystem_name,"dev1"))
+		self.assertIs(inventory.get_device(subsystem_name,"dev2"),device2)
+
+		# the changed device is looked up again, its sysfs attributes
+		# cached by pyudev may be stale
+		device3 = Mock(subsystem = subsystem_name,sys_name = "dev2",
+				sys_path = "/sys/devices/dev2")
+		inventory._handle_udev_event("change", device2)
+		inventory._get_udev_device = Mock(return_value = device3)
+		self.assertIs(inventory.get_device(subsystem_name,"dev2"),device3)
+		self.assertIs(inventory.get_device(subsystem_name,"dev2"),device3)
+		inventory._get_udev_device.assert_called_once_with(subsystem_name,"dev2")
+		del inventory._get_udev_device
+
+		inventory._handle_udev_event("remove", device3)
+		self.assertIsNone(inventory.get_device(subsystem_name,"dev2"))
+
+		inventory._handle_udev_event("add", device1)
+		inventory.unsubscribe(dummy)
+		self.assertIsNone(inventory.get_device(subsystem_name,"dev1"))
+
 class DummyPlugin():
 	def __init__(self):
 		self.CallbackWasCalled = False
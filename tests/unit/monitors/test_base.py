@@ -96,3 +96,32 @@ class MonitorBaseClassTestCase(unittest.TestCase):
 		self.assertSetEqual(set(["a", "b"]), MockMonitor._updating_devices)
 		monitor2.cleanup()
 		self.assertSetEqual(set(), MockMonitor._updating_devices)
+
+class LoadHistoryTestCase(unittest.TestCase):
+	def test_delta_and_max(self):
+		history = tuned.monitors.base.LoadHistory(2, max_init = [5, 1])
+		history.append([0, 0], 0)
+		self.assertEqual(history.delta(), [0, 0])
+		history.append([3, 4, 100], 1)
+		self.assertEqual(history.latest(), [3, 4])
+		self.assertEqual(history.delta(), [3, 4])
+		self.assertEqual(history.max_delta(), [5, 4])
+		history.append([10, 5], 2)
+		self.assertEqual(history.delta(), [7, 1])
+		self.assertEqual(history.max_delta(), [7, 4])
+
+	def test_ring_buffer(self):
+		history = tuned.monitors.base.LoadHistory(1, size = 3)
+		for i in range(5):
+			history.append([i * i], i)
+		self.assertEqual(len(history), 3)
+		self.assertEqual(history.samples(), [[4], [9], [16]])
+
+	def test_rate_and_ewma(self):
+		history = tuned.monitors.base.LoadHistory(1, alpha = 0.5)
+		history.append([0], 0)
+		history.append([10], 2)
+		self.assertEqual(history.rate(), [5.0])
+		self.assertEqual(history.ewma(), [2.5])
+		history.append([20], 4)
+		self.assertEqual(history.ewma(), [3.75])
@@ -0,0 +1,46 @@
+import unittest
+import tuned.monitors.base
+from tuned.monitors.repository import Repository
+
+class CountingMonitor(tuned.monitors.base.Monitor):
+	updates = 0
+
+	@classmethod
+	def _init_available_devices(cls):
+		cls._available_devices = set(["a", "b"])
+
+	@classmethod
+	def update(cls):
+		cls.updates += 1
+		for device in cls._updating_devices:
+			cls._load[device] = cls.updates
+
+class MonitorRepositoryTestCase(unittest.TestCase):
+	def test_update_once_per_class(self):
+		repository = Repository()
+		monitor1 = CountingMonitor(["a"])
+		monitor2 = CountingMonitor(["b"])
+		repository.monitors.update([monitor1, monitor2])
+		updates = CountingMonitor.updates
+		repository.update()
+		self.assertEqual(CountingMonitor.updates, updates + 1)
+		self.assertEqual(repository.tick, 1)
+		self.assertEqual(repository.snapshot[CountingMonitor],
+				{"a": updates + 1, "b": updates + 1})
+		repository.delete(monitor1)
+		repository.delete(monitor2)
+		repository.update()
+		self.assertEqual(repository.snapshot, {})
+
+	def test_update_selected_monitors(self):
+		repository = Repository()
+		monitor = CountingMonitor(["a"])
+		repository.monitors.add(monitor)
+		repository.update()
+		updates = CountingMonitor.updates
+		repository.update([])
+		self.assertEqual(CountingMonitor.updates, updates)
+		self.assertEqual(repository.snapshot[CountingMonitor]["a"], updates)
+		repository.update([monitor])
+		self.assertEqual(CountingMonitor.updates, updates + 1)
+		repository.delete(monitor)
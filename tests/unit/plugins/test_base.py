@@ -124,6 +124,31 @@ class PluginBaseTestCase(unittest.TestCase):
 		self.assertEqual(device1.setting,'010')
 		self.assertEqual(device2.setting,'010')
 
+	def test_instance_retune(self):
+		instance = self._commands_plugin.create_instance('retune_instance',0,'',\
+			'','','',{'size':'XL'})
+		instance._has_static_tuning = True
+		self._commands_plugin._instance_apply_static(instance)
+		self.assertEqual(self._commands_plugin._size,'XL')
+
+		self.assertTrue(self._commands_plugin.instance_retune(instance,\
+			{'size':'XL'}))
+		self.assertTrue(self._commands_plugin.instance_retune(instance,\
+			{'size':'XXL'}))
+		self.assertEqual(self._commands_plugin._size,'XXL')
+		self.assertEqual(instance.options['size'],'XXL')
+		# options which are not commands cannot be retuned
+		self.assertFalse(self._commands_plugin.instance_retune(instance,\
+			{'size':'XXL','mode':'slow'}))
+
+		self._commands_plugin._instance_unapply_static(instance)
+		self.assertEqual(self._commands_plugin._size,'S')
+
+	def test_changed_options(self):
+		self.assertEqual(self._plugin._changed_options(\
+			{'a':'1','b':'2','c':'${x}'},{'a':'1','c':'${x}','d':'4'}),\
+			['c','d','b'])
+
 	def test_process_assignment_modifiers(self):
 		self.assertEqual(self._plugin._process_assignment_modifiers('100',None)\
 			,'100')
@@ -208,7 +233,7 @@ class CommandsPlugin(Plugin):
 	@classmethod
 	def _get_config_options(self):
 		"""Default configuration options for the plugin."""
-		return {'size':'S','device_setting':'101'}
+		return {'size':'S','device_setting':'101','mode':'fast'}
 
 	@decorators.command_set('size')
 	def _set_size(self, new_size, instance, sim, remove):
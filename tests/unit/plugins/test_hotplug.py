@@ -0,0 +1,106 @@
+import unittest
+
+import tuned.hardware as hardware
+import tuned.monitors as monitors
+import tuned.plugins as plugins
+import tuned.plugins.decorators as decorators
+import tuned.consts as consts
+from tuned.plugins.hotplug import Plugin
+from tuned import storage
+
+monitors_repository = monitors.Repository()
+hardware_inventory = hardware.Inventory(set_receive_buffer_size=False)
+device_matcher = hardware.DeviceMatcher()
+device_matcher_udev = hardware.DeviceMatcherUdev()
+plugin_instance_factory = plugins.instance.Factory()
+storage_factory = storage.Factory(storage.PickleProvider())
+
+class HotplugPluginTestCase(unittest.TestCase):
+	def setUp(self):
+		self._plugin = DummyHotplugPlugin(monitors_repository,storage_factory,\
+			hardware_inventory,device_matcher,device_matcher_udev,\
+			plugin_instance_factory,DummyGlobalConfig(60000),None)
+		self._plugin.init_devices()
+		self._instance = self._plugin.create_instance('vfs',0,'vf*',None,\
+			None,None,{'setting':'1'})
+
+	def tearDown(self):
+		self._plugin.cleanup()
+
+	def test_batch(self):
+		for device in ['vf0','vf1','vf2','eth0']:
+			self._plugin._add_device(device)
+		self._plugin._remove_device('vf1')
+		self.assertEqual(self._plugin.tuned, [])
+		self.assertEqual(self._instance.assigned_devices, set(['vf0','vf2']))
+
+		self._plugin._apply_device_batch()
+		self.assertEqual(self._plugin.tuned, [['vf0','vf2']])
+		self.assertEqual(self._instance.processed_devices, set(['vf0','vf2']))
+		self.assertEqual(self._instance.assigned_devices, set())
+		self.assertEqual(self._plugin._free_devices, set(['eth0']))
+
+	def test_destroyed_instance(self):
+		self._plugin._add_device('vf0')
+		self._plugin.destroy_instance(self._instance)
+		self._plugin._apply_device_batch()
+		self.assertEqual(self._plugin.tuned, [])
+		self.assertEqual(self._plugin._free_devices, set(['vf0']))
+
+	def test_unapply_with_pending_batch(self):
+		self._plugin.instance_apply_tuning(self._instance)
+		self._plugin._add_device('vf0')
+		self.assertIsNotNone(self._plugin._hotplug_timer)
+		self._plugin.instance_unapply_tuning(self._instance)
+		self.assertIsNone(self._plugin._hotplug_timer)
+		self._plugin._apply_device_batch()
+		self.assertEqual(self._plugin.tuned, [])
+		self.assertEqual(self._instance.processed_devices, set())
+		self._plugin.destroy_instance(self._instance)
+		self.assertEqual(self._plugin._free_devices, set(['vf0']))
+
+class DummyGlobalConfig(object):
+	def __init__(self, batch_window):
+		self._batch_window = batch_window
+
+	def get(self, key, default = None):
+		if key == consts.CFG_DYNAMIC_TUNING:
+			return False
+		return default
+
+	def get_int(self, key, default = 0):
+		if key == consts.CFG_HOTPLUG_BATCH_WINDOW:
+			return self._batch_window
+		return default
+
+class DummyHotplugPlugin(Plugin):
+	def __init__(self, *args, **kwargs):
+		super(DummyHotplugPlugin, self).__init__(*args, **kwargs)
+		self.tuned = []
+
+	def _init_devices(self):
+		self._devices_supported = True
+		self._assigned_devices = set()
+		self._free_devices = set()
+
+	@classmethod
+	def _get_config_options(cls):
+		return {'setting':None}
+
+	def _instance_init(self, instance):
+		instance._has_static_tuning = True
+		instance._has_dynamic_tuning = False
+
+	def _instance_cleanup(self, instance):
+		pass
+
+	def _execute_all_device_commands(self, instance, devices):
+		self.tuned.append(list(devices))
+
+	@decorators.command_set('setting', per_device = True)
+	def _set_setting(self, value, device, instance, sim, remove):
+		return value
+
+	@decorators.command_get('setting')
+	def _get_setting(self, device, instance, ignore_missing = False):
+		return None
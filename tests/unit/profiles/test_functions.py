@@ -0,0 +1,63 @@
+import unittest
+
+from tuned.profiles.functions import base
+from tuned.profiles.functions.repository import Repository
+
+class FunctionCacheTestCase(unittest.TestCase):
+	def setUp(self):
+		self._repository = Repository()
+
+	def test_purity(self):
+		pure = DummyFunction(base.PURE)
+		stable = DummyFunction(base.STABLE)
+		volatile = DummyFunction(base.VOLATILE)
+		for i in range(2):
+			for f in [pure, stable, volatile]:
+				self.assertEqual(self._repository.execute(f, ["a", "b"]), "a,b")
+		self.assertEqual([pure.calls, stable.calls, volatile.calls], [1, 1, 2])
+
+		self._repository.execute(pure, ["c"])
+		self.assertEqual(pure.calls, 2)
+
+		self._repository.new_cycle()
+		for f in [pure, stable, volatile]:
+			self._repository.execute(f, ["a", "b"])
+		self.assertEqual([pure.calls, stable.calls, volatile.calls], [2, 2, 3])
+
+	def test_expand(self):
+		self.assertEqual(self._repository.expand("${f:cpulist_pack:1,2,3,5}"), "1-3,5")
+		self.assertEqual(self._repository.expand("${f:cpulist_pack:1,2,3,5}"), "1-3,5")
+
+class ParserTestCase(unittest.TestCase):
+	def setUp(self):
+		self._repository = Repository()
+
+	def test_nested(self):
+		self.assertEqual(self._repository.expand(\
+			"cpus ${f:cpulist_pack:${f:cpulist_unpack:1-3},5}"),\
+			"cpus 1-3,5")
+
+	def test_escaped(self):
+		self.assertEqual(self._repository.expand(\
+			"\\${f:cpulist_pack:${f:cpulist_unpack:1-2}} ${VAR}"),\
+			"${f:cpulist_pack:1,2} ${VAR}")
+		self.assertEqual(self._repository.expand("${f:strip: a\\:b:c }"),\
+			"a:bc")
+
+	def test_invalid_syntax(self):
+		self.assertEqual(self._repository.expand(\
+			"${f:cpulist_pack:1,2}} ${f:cpulist_pack:1,2}"),\
+			"1-2} ${f:cpulist_pack:1,2}")
+		self.assertEqual(self._repository.expand(\
+			"${f:strip:${f:cpulist_pack:1,2}"),\
+			"${f:strip:1-2")
+
+class DummyFunction(base.Function):
+	def __init__(self, purity):
+		super(DummyFunction, self).__init__("dummy_%s" % purity, 0)
+		self.purity = purity
+		self.calls = 0
+
+	def execute(self, args):
+		self.calls += 1
+		return ",".join(args)
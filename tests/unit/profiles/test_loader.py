@@ -112,6 +112,43 @@ class LoaderTestCase(unittest.TestCase):
 		self.assertEqual(config.units['test_unit'].devices,\
 			'/dev/net,/dev/cpu')
 
+	def test_profile_cache(self):
+		cache = profiles.CompiledProfileCache(self._test_dir + '/cache.pickle')
+		loader = profiles.Loader(profiles.Locator([self._profiles_dir]),\
+			profiles.Factory(),profiles.Merger(),None,\
+			profiles.variables.Variables(),cache)
+		self.assertIsNone(cache.get(['dummy3'],loader.profile_locator,\
+			profiles.variables.Variables()))
+		loader.load(['dummy3'])
+		cached = cache.get(['dummy3'],loader.profile_locator,\
+			profiles.variables.Variables())
+		self.assertEqual(cached.units['test_unit'].options['random_option'],\
+			'random')
+
+		# a new cache instance reads the entry from the disk
+		cache = profiles.CompiledProfileCache(self._test_dir + '/cache.pickle')
+		merged_profile = profiles.Loader(loader.profile_locator,\
+			profiles.Factory(),profiles.Merger(),None,\
+			profiles.variables.Variables(),cache).load(['dummy3'])
+		self.assertEqual(merged_profile.name,'dummy3')
+		self.assertEqual(merged_profile.units['test_unit'].\
+			options['test_option'],'bye bye')
+
+		# modification of an included profile invalidates the entry
+		with open(self._dummy_profile_dir + '/tuned.conf') as f:
+			content = f.read()
+		try:
+			with open(self._dummy_profile_dir + '/tuned.conf','a') as f:
+				f.write('changed_option=changed\n')
+			self.assertIsNone(cache.get(['dummy3'],loader.profile_locator,\
+				profiles.variables.Variables()))
+			merged_profile = loader.load(['dummy3'])
+			self.assertEqual(merged_profile.units['test_unit'].\
+				options['changed_option'],'changed')
+		finally:
+			with open(self._dummy_profile_dir + '/tuned.conf','w') as f:
+				f.write(content)
+
 	@classmethod
 	def tearDownClass(cls):
 		shutil.rmtree(cls._test_dir)
@@ -2,7 +2,11 @@ import unittest
 import os
 import shutil
 import tempfile
-from tuned.profiles.locator import Locator
+from tuned.profiles.locator import Locator, IndexedLocator
+try:
+	import pyinotify
+except ImportError:
+	pyinotify = None
 
 class LocatorTestCase(unittest.TestCase):
 	def setUp(self):
@@ -81,3 +85,37 @@ class LocatorTestCase(unittest.TestCase):
 
 		attrs = self.locator.get_profile_attrs("different", ["summary"], ["non existing profile"])
 		self.assertEqual([False, "", "", ""], attrs)
+
+class IndexedLocatorTestCase(LocatorTestCase):
+	def setUp(self):
+		self.locator = IndexedLocator(self._tmp_load_dirs)
+
+	def tearDown(self):
+		self.locator.close()
+
+	def test_index_update(self):
+		self.assertEqual(self.locator.get_profile_attrs("powersafe", ["summary"], [""])[2], "this is powersafe")
+		conf_name = os.path.join(self._tmp_load_dirs[0], "powersafe", "tuned.conf")
+		with open(conf_name, "w") as conf_file:
+			conf_file.write("[main]\nsummary=this is changed powersafe\n")
+		os.utime(conf_name, ns = (0, 0))
+		self.assertEqual(self.locator.get_profile_attrs("powersafe", ["summary"], [""])[2], "this is changed powersafe")
+
+		self._create_profile(self._tmp_load_dirs[0], "throughput")
+		self.assertIn("throughput", self.locator.get_known_names())
+		shutil.rmtree(os.path.join(self._tmp_load_dirs[0], "throughput"))
+		self.assertNotIn("throughput", self.locator.get_known_names())
+		self.assertIsNone(self.locator.get_config("throughput"))
+
+	@unittest.skipIf(pyinotify is None, "pyinotify is not available")
+	def test_index_watched(self):
+		self.assertIn("powersafe", self.locator.get_known_names())
+		self.assertIsNotNone(self.locator._notifier)
+		self.assertIn(self._tmp_load_dirs[0], self.locator._index)
+
+		self._create_profile(self._tmp_load_dirs[0], "latency")
+		self.assertIn("latency", self.locator.get_known_names())
+		self.assertIn("latency", self.locator._index[self._tmp_load_dirs[0]])
+		shutil.rmtree(os.path.join(self._tmp_load_dirs[0], "latency"))
+		self.assertNotIn("latency", self.locator.get_known_names())
+		self.assertIsNotNone(self.locator._notifier)
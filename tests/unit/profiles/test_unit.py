@@ -34,3 +34,9 @@ class UnitTestCase(unittest.TestCase):
 	def test_parsing_options(self):
 		unit = Unit("sample", {"type": "net", "enabled": True, "replace": True, "other": "foo"})
 		self.assertEqual(unit.type, "net")
+
+	def test_option_update_interval(self):
+		unit = Unit("sample", {"update_interval": "0.5", "foo": "bar"})
+		self.assertEqual(unit.update_interval, "0.5")
+		self.assertDictEqual(unit.options, {"foo": "bar"})
+		self.assertIsNone(Unit("sample", {}).update_interval)
@@ -27,6 +27,16 @@ class VariablesTestCase(unittest.TestCase):
 
 		self.assertEqual("This is var1 and this is var2", v.expand("This is ${variable1} and this is ${variable2}"))
 
+	def test_expand_cache(self):
+		v = variables.Variables()
+		v.add_variable("a", "1")
+		self.assertEqual("1 ${b} ${a}", v.expand("${a} ${b} \\${a}"))
+		self.assertEqual("1 ${b} ${a}", v.expand("${a} ${b} \\${a}"))
+		v.add_variable("b", "${a}2")
+		self.assertEqual("1 12 ${a}", v.expand("${a} ${b} \\${a}"))
+		v.add_variable("a", "3")
+		self.assertEqual("3 12", v.expand("${a} ${b}"))
+
 	@classmethod
 	def tearDownClass(cls):
 		shutil.rmtree(cls.test_dir)
@@ -0,0 +1,99 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import tuned.storage
+
+class StorageJournalProviderTestCase(unittest.TestCase):
+	def setUp(self):
+		self._temp_dir = tempfile.mkdtemp()
+		self._path = os.path.join(self._temp_dir, "save.pickle")
+
+	def tearDown(self):
+		shutil.rmtree(self._temp_dir)
+
+	def test_crash_recovery(self):
+		provider = tuned.storage.JournalProvider(self._path)
+		provider.load()
+		provider.set("ns1", "opt1", "value1")
+		provider.set("ns1", "opt2", {"a": 1})
+		provider.set("ns2", "opt1", "value2")
+		provider.unset("ns2", "opt1")
+		# no save(), the provider is lost as in a crash
+		self.assertFalse(os.path.exists(self._path))
+
+		provider = tuned.storage.JournalProvider(self._path)
+		provider.load()
+		self.assertEqual("value1", provider.get("ns1", "opt1"))
+		self.assertEqual({"a": 1}, provider.get("ns1", "opt2"))
+		self.assertIsNone(provider.get("ns2", "opt1"))
+		# the recovered journal is compacted into the snapshot
+		self.assertTrue(os.path.exists(self._path))
+		self.assertEqual(0, os.path.getsize(self._path + ".journal"))
+
+	def test_compaction(self):
+		provider = tuned.storage.JournalProvider(self._path, compact_records = 3)
+		provider.set("ns", "opt1", 1)
+		provider.set("ns", "opt2", 2)
+		self.assertFalse(os.path.exists(self._path))
+		provider.set("ns", "opt1", 3)
+		self.assertTrue(os.path.exists(self._path))
+		self.assertEqual(0, os.path.getsize(self._path + ".journal"))
+		provider.unset("ns", "opt2")
+
+		provider = tuned.storage.JournalProvider(self._path)
+		provider.load()
+		self.assertEqual(3, provider.get("ns", "opt1"))
+		self.assertIsNone(provider.get("ns", "opt2"))
+
+	def test_torn_record(self):
+		provider = tuned.storage.JournalProvider(self._path)
+		provider.set("ns", "opt1", "value1")
+		provider.set("ns", "opt2", "value2")
+		size = os.path.getsize(self._path + ".journal")
+		with open(self._path + ".journal", "r+b") as f:
+			f.truncate(size - 3)
+
+		provider = tuned.storage.JournalProvider(self._path)
+		provider.load()
+		self.assertEqual("value1", provider.get("ns", "opt1"))
+		self.assertIsNone(provider.get("ns", "opt2"))
+
+	def test_clear(self):
+		provider = tuned.storage.JournalProvider(self._path)
+		provider.set("ns", "opt1", "value1")
+		provider.save()
+		provider.clear()
+		self.assertFalse(os.path.exists(self._path))
+		self.assertFalse(os.path.exists(self._path + ".journal"))
+
+		provider = tuned.storage.JournalProvider(self._path)
+		provider.load()
+		self.assertIsNone(provider.get("ns", "opt1"))
+
+	def test_deferred_set_coalesced(self):
+		provider = tuned.storage.JournalProvider(self._path, flush_interval = 3600)
+		value = {}
+		for pid in range(100):
+			value[pid] = pid
+			provider.set_deferred("ns", "pids", value)
+		self.assertFalse(os.path.exists(self._path + ".journal"))
+		provider.flush()
+		self.assertEqual(1, provider._journal_records)
+		self.assertIsNone(provider._flush_timer)
+
+		del value[0]
+		provider.set_deferred("ns", "pids", value)
+		provider.save()
+		provider = tuned.storage.JournalProvider(self._path)
+		provider.load()
+		self.assertEqual(99, len(provider.get("ns", "pids")))
+
+	def test_deferred_set_flushed_by_timer(self):
+		provider = tuned.storage.JournalProvider(self._path, flush_interval = 0.01)
+		provider.set_deferred("ns", "opt", "value")
+		timer = provider._flush_timer
+		timer.join(5)
+		self.assertEqual(1, provider._journal_records)
+		self.assertFalse(provider._dirty)
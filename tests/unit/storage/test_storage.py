@@ -16,6 +16,16 @@ class StorageStorageTestCase(unittest.TestCase):
 		storage.set("optname", "optval")
 		mock_provider.set.assert_called_once_with("foo", "optname", "optval")
 
+	def test_set_deferred(self):
+		mock_provider = Mock()
+		factory = tuned.storage.Factory(mock_provider)
+		storage = factory.create("foo")
+
+		storage.set_deferred("optname", "optval")
+		mock_provider.set_deferred.assert_called_once_with("foo", "optname", "optval")
+		storage.flush()
+		mock_provider.flush.assert_called_once_with()
+
 	def test_get(self):
 		mock_provider = Mock()
 		mock_provider.get.side_effect = [ None, "defval", "somevalue" ]
@@ -0,0 +1,253 @@
+import unittest
+try:
+	from unittest.mock import Mock
+except ImportError:
+	from mock import Mock
+
+from tuned.units.manager import Manager
+import tuned.consts as consts
+
+class MockInstance(object):
+	def __init__(self, name, update_interval = None, has_dynamic_tuning = True,
+			priority = 0, plugin = None, log = None, load_monitor = None):
+		self.name = name
+		self.update_interval = update_interval
+		self.has_dynamic_tuning = has_dynamic_tuning
+		self.priority = priority
+		self.plugin = plugin
+		self.load_monitor = load_monitor
+		self.updates = 0
+		self._log = log
+
+	def update_tuning(self):
+		self.updates += 1
+
+	def apply_tuning(self):
+		self._log.append(("apply", self.name))
+
+	def unapply_tuning(self, rollback):
+		self._log.append(("unapply", self.name))
+
+def create_manager(apply_threads = 1):
+	monitors_repository = Mock()
+	monitors_repository.monitors = []
+	config = Mock()
+	config.get_int.return_value = apply_threads
+	return Manager(Mock(), monitors_repository, 0, Mock(), config)
+
+class ManagerSchedulerTestCase(unittest.TestCase):
+	def setUp(self):
+		self._manager = create_manager()
+
+	def test_parse_update_interval(self):
+		self.assertIsNone(self._manager.parse_update_interval("a", None))
+		self.assertEqual(self._manager.parse_update_interval("a", "0.1"), 0.1)
+		self.assertIsNone(self._manager.parse_update_interval("a", "0"))
+		self.assertIsNone(self._manager.parse_update_interval("a", "foo"))
+		self.assertIsNone(self._manager.parse_update_interval("a", "nan"))
+		self.assertIsNone(self._manager.parse_update_interval("a", "inf"))
+
+	def test_per_instance_intervals(self):
+		fast = MockInstance("fast", 1)
+		slow = MockInstance("slow")
+		static = MockInstance("static", has_dynamic_tuning = False)
+		self._manager.instances.extend([fast, slow, static])
+		self._manager.schedule_updates(10)
+		start = self._manager.next_update_deadline() - 1
+		for i in range(1, 11):
+			self._manager.update_scheduled(start + i)
+		self.assertEqual(fast.updates, 10)
+		self.assertEqual(slow.updates, 1)
+		self.assertEqual(static.updates, 0)
+
+	def test_deadline_does_not_drift(self):
+		instance = MockInstance("a", 1)
+		self._manager.instances.append(instance)
+		self._manager.schedule_updates(10)
+		deadline = self._manager.next_update_deadline()
+		self._manager.update_scheduled(deadline + 0.25)
+		self.assertEqual(self._manager.next_update_deadline(), deadline + 1)
+		# the missed updates are skipped
+		self._manager.update_scheduled(deadline + 3.5)
+		self.assertEqual(instance.updates, 2)
+		self.assertEqual(self._manager.next_update_deadline(), deadline + 4.5)
+
+	def test_only_due_monitors_updated(self):
+		fast = MockInstance("fast", 1, load_monitor = "fast_monitor")
+		slow = MockInstance("slow", load_monitor = "slow_monitor")
+		self._manager.instances.extend([fast, slow])
+		self._manager.schedule_updates(10)
+		deadline = self._manager.next_update_deadline()
+		self._manager.update_scheduled(deadline)
+		self._manager._monitors_repository.update.assert_called_once_with(["fast_monitor"])
+
+	def test_destroyed_instance_not_updated(self):
+		instance = MockInstance("a", 1)
+		self._manager.instances.append(instance)
+		self._manager.schedule_updates(10)
+		deadline = self._manager.next_update_deadline()
+		self._manager.instances.remove(instance)
+		self._manager.update_scheduled(deadline)
+		self.assertEqual(instance.updates, 0)
+		self.assertIsNone(self._manager.next_update_deadline())
+
+	def test_new_instance_scheduled(self):
+		self._manager.schedule_updates(10)
+		self.assertIsNone(self._manager.next_update_deadline())
+		self._manager.instances.append(MockInstance("a", 1))
+		self._manager.update_scheduled(0)
+		self.assertEqual(self._manager.next_update_deadline(), 1)
+
+class ManagerParallelApplyTestCase(unittest.TestCase):
+	def _create_instances(self, manager, log):
+		a = Mock(parallel_apply = True)
+		b = Mock(parallel_apply = True)
+		c = Mock(parallel_apply = True)
+		manager.instances.extend([
+			MockInstance("a1", priority = 0, plugin = a, log = log),
+			MockInstance("b1", priority = 0, plugin = b, log = log),
+			MockInstance("a2", priority = 0, plugin = a, log = log),
+			MockInstance("c1", priority = 10, plugin = c, log = log),
+		])
+
+	def test_instance_groups(self):
+		manager = create_manager()
+		self._create_instances(manager, [])
+		groups = manager._instance_groups(manager.instances)
+		self.assertEqual([[[i.name for i in group] for group in tier] for tier in groups],
+				[[["a1", "a2"], ["b1"]], [["c1"]]])
+
+	def test_instance_groups_sequential_plugins(self):
+		manager = create_manager()
+		disk = Mock(parallel_apply = True)
+		irq = Mock(parallel_apply = False)
+		scheduler = Mock(parallel_apply = False)
+		manager.instances.extend([
+			MockInstance("irq", plugin = irq),
+			MockInstance("disk", plugin = disk),
+			MockInstance("scheduler", plugin = scheduler),
+		])
+		groups = manager._instance_groups(manager.instances)
+		self.assertEqual([[[i.name for i in group] for group in tier] for tier in groups],
+				[[["irq", "scheduler"], ["disk"]]])
+
+	def test_parallel_apply_keeps_order(self):
+		for threads in [1, 4]:
+			log = []
+			manager = create_manager(threads)
+			self._create_instances(manager, log)
+			manager.start_tuning()
+			self.assertEqual(set(log[:3]), set([("apply", "a1"), ("apply", "b1"), ("apply", "a2")]))
+			self.assertLess(log.index(("apply", "a1")), log.index(("apply", "a2")))
+			self.assertEqual(log[3], ("apply", "c1"))
+			del log[:]
+			manager.stop_tuning()
+			self.assertEqual(log[0], ("unapply", "c1"))
+			self.assertLess(log.index(("unapply", "a2")), log.index(("unapply", "a1")))
+			self.assertEqual(len(log), 4)
+
+class MockUnit(object):
+	def __init__(self, name, type, options = None, priority = 0):
+		self.name = name
+		self.type = type
+		self.options = options or {}
+		self.priority = priority
+		self.enabled = True
+		self.devices = "*"
+		self.devices_udev_regex = None
+		self.cpuinfo_regex = None
+		self.uname_regex = None
+		self.script_pre = None
+		self.script_post = None
+		self.update_interval = None
+
+class MockSwitchInstance(MockInstance):
+	def __init__(self, plugin, unit, log):
+		super(MockSwitchInstance, self).__init__(unit.name,
+				has_dynamic_tuning = False, priority = unit.priority,
+				plugin = plugin, log = log)
+		self.options = unit.options
+		self.devices_expression = unit.devices
+		self.devices_udev_regex = unit.devices_udev_regex
+		self.script_pre = unit.script_pre
+		self.script_post = unit.script_post
+
+	def unapply_tuning(self, rollback):
+		self._log.append(("unapply", self.name, rollback))
+
+class MockPlugin(object):
+	def __init__(self, name, log, can_retune = True):
+		self.name = name
+		self._log = log
+		self._can_retune = can_retune
+
+	def create_instance(self, name, priority, devices, devices_udev_regex,
+			script_pre, script_post, options):
+		unit = MockUnit(name, self.name, options, priority)
+		return MockSwitchInstance(self, unit, self._log)
+
+	def instance_retune(self, instance, options):
+		if not self._can_retune:
+			return False
+		self._log.append(("retune", instance.name))
+		instance.options = options
+		return True
+
+	def destroy_instance(self, instance):
+		self._log.append(("destroy", instance.name))
+
+	def init_devices(self):
+		pass
+
+	def assign_free_devices(self, instance):
+		pass
+
+	def initialize_instance(self, instance):
+		pass
+
+class ManagerSwitchTestCase(unittest.TestCase):
+	def setUp(self):
+		self._log = []
+		self._plugins = {
+			"sysctl": MockPlugin("sysctl", self._log),
+			"cpu": MockPlugin("cpu", self._log, can_retune = False),
+			"vm": MockPlugin("vm", self._log),
+		}
+		self._manager = create_manager()
+		self._manager.plugins_repository.create.side_effect = lambda name: self._plugins[name]
+		self._manager.create({
+			"sysctl": MockUnit("sysctl", "sysctl", {"a": "1"}),
+			"cpu": MockUnit("cpu", "cpu", {"governor": "performance"}),
+			"vm": MockUnit("vm", "vm", {"transparent_hugepages": "always"}, 10),
+		})
+
+	def test_switch(self):
+		self._manager.switch({
+			"sysctl": MockUnit("sysctl", "sysctl", {"a": "2"}),
+			"cpu": MockUnit("cpu", "cpu", {"governor": "powersave"}),
+			"disk": MockUnit("disk", "vm", {}, 5),
+		})
+		self.assertEqual(self._log, [
+			("retune", "sysctl"),
+			("unapply", "vm", consts.ROLLBACK_FULL),
+			("destroy", "vm"),
+			("unapply", "cpu", consts.ROLLBACK_FULL),
+			("destroy", "cpu"),
+			("apply", "cpu"),
+			("apply", "disk"),
+		])
+		self.assertEqual([instance.name for instance in self._manager.instances],
+				["sysctl", "cpu", "disk"])
+		self.assertEqual(self._manager.instances[0].options, {"a": "2"})
+		# plugins left without instances are cleaned up and created again
+		self.assertEqual(self._manager.plugins_repository.delete.call_count, 2)
+
+	def test_switch_removes_unused_plugins(self):
+		self._manager.switch({
+			"sysctl": MockUnit("sysctl", "sysctl", {"a": "1"}),
+		})
+		self.assertEqual([instance.name for instance in self._manager.instances],
+				["sysctl"])
+		self.assertEqual(set([plugin.name for plugin in self._manager.plugins]),
+				set(["sysctl"]))
+		self.assertEqual(self._manager.plugins_repository.delete.call_count, 2)
@@ -0,0 +1,66 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from tuned.utils.cgroup2_cpuset import CgroupV2Cpuset
+
+class CgroupV2CpusetTestCase(unittest.TestCase):
+	def setUp(self):
+		self._mount_point = tempfile.mkdtemp()
+		self._write("cgroup.controllers", "cpuset cpu io memory\n")
+		self._write("cgroup.subtree_control", "cpu memory\n")
+		self._write("cgroup.procs", "1\n2\n3\n")
+		self._write("system.slice/cpuset.cpus", "\n")
+		self._write("user.slice/cpuset.cpus", "0-3\n")
+		os.makedirs(os.path.join(self._mount_point, "init.scope"))
+		self._cgroup = CgroupV2Cpuset(self._mount_point)
+
+	def tearDown(self):
+		shutil.rmtree(self._mount_point)
+
+	def _write(self, path, data):
+		path = os.path.join(self._mount_point, path)
+		if not os.path.isdir(os.path.dirname(path)):
+			os.makedirs(os.path.dirname(path))
+		with open(path, "w") as f:
+			f.write(data)
+
+	def _read(self, path):
+		with open(os.path.join(self._mount_point, path)) as f:
+			return f.read()
+
+	def test_available(self):
+		self.assertTrue(self._cgroup.available())
+		self._write("cgroup.controllers", "cpu io\n")
+		self.assertFalse(self._cgroup.available())
+
+	def test_root_pids(self):
+		self.assertEqual(self._cgroup.root_pids(), set([1, 2, 3]))
+		self.assertIsNone(CgroupV2Cpuset(os.path.join(self._mount_point, "missing")).root_pids())
+
+	def test_apply_restore(self):
+		original = self._cgroup.backup()
+		self.assertEqual(list(original["cpus"].items()),
+				[("init.scope", ""), ("system.slice", ""), ("user.slice", "0-3")])
+		self.assertTrue(original["subtree_control"])
+		# backup() does not change anything
+		self.assertEqual(self._read("cgroup.subtree_control"), "cpu memory\n")
+
+		self.assertTrue(self._cgroup.apply(original, "0-1"))
+		self.assertEqual(self._read("cgroup.subtree_control"), "+cpuset")
+		self.assertFalse(os.path.exists(os.path.join(self._mount_point, "init.scope", "cpuset.cpus")))
+		self.assertEqual(self._read("system.slice/cpuset.cpus"), "0-1")
+		self.assertEqual(self._read("user.slice/cpuset.cpus"), "0-1")
+
+		self._cgroup.restore(original)
+		self.assertEqual(self._read("system.slice/cpuset.cpus"), "\n")
+		self.assertEqual(self._read("user.slice/cpuset.cpus"), "0-3")
+		self.assertEqual(self._read("cgroup.subtree_control"), "-cpuset")
+
+	def test_controller_enabled(self):
+		self._write("cgroup.subtree_control", "cpuset cpu\n")
+		original = self._cgroup.backup()
+		self._cgroup.restore(original)
+		self.assertFalse(original["subtree_control"])
+		self.assertEqual(self._read("cgroup.subtree_control"), "cpuset cpu\n")
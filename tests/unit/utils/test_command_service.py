@@ -0,0 +1,72 @@
+import unittest
+import threading
+
+from tuned.utils.command_service import CommandService
+
+class CommandServiceTestCase(unittest.TestCase):
+	def setUp(self):
+		self._cmd = DummyCommands()
+		self._service = CommandService(self._cmd, max_workers = 4)
+
+	def tearDown(self):
+		self._service.shutdown()
+
+	def test_cache_in_cycle(self):
+		self._service.execute(["ethtool", "-k", "eth0"], cache = True)
+		self._service.execute(["ethtool", "-k", "eth0"], cache = True)
+		self.assertEqual(self._cmd.calls, 2)
+		with self._service.cycle():
+			with self._service.cycle():
+				self.assertEqual(self._service.execute(["ethtool", "-k", "eth0"], cache = True),
+						(0, "ethtool -k eth0"))
+			self._service.execute(["ethtool", "-k", "eth0"], cache = True)
+			self.assertEqual(self._cmd.calls, 3)
+			self._service.execute(["ethtool", "-K", "eth0", "tso", "off"])
+			self.assertEqual(self._cmd.calls, 4)
+		self._service.execute(["ethtool", "-k", "eth0"], cache = True)
+		self.assertEqual(self._cmd.calls, 5)
+
+	def test_invalidate(self):
+		with self._service.cycle():
+			self._service.execute(["ethtool", "-k", "eth0"], cache = True)
+			self._service.execute(["ethtool", "-k", "eth1"], cache = True)
+			self._service.invalidate("eth0")
+			self._service.execute(["ethtool", "-k", "eth0"], cache = True)
+			self._service.execute(["ethtool", "-k", "eth1"], cache = True)
+			self.assertEqual(self._cmd.calls, 3)
+			self._service.invalidate()
+			self._service.execute(["ethtool", "-k", "eth1"], cache = True)
+			self.assertEqual(self._cmd.calls, 4)
+
+	def test_cached(self):
+		calls = []
+		func = lambda: calls.append(1) or len(calls)
+		self.assertEqual(self._service.cached(["links"], func), 1)
+		with self._service.cycle():
+			self.assertEqual(self._service.cached(["links"], func), 2)
+			self.assertEqual(self._service.cached(["links"], func), 2)
+			self._service.invalidate("links")
+			self.assertEqual(self._service.cached(["links"], func), 3)
+
+	def test_execute_many(self):
+		args_list = [["ethtool", "-k", "eth%d" % i] for i in range(8)]
+		res = self._service.execute_many(args_list)
+		self.assertEqual(res, [(0, " ".join(args)) for args in args_list])
+
+	def test_prefetch(self):
+		self._service.prefetch([["ethtool", "-k", "eth0"]])
+		self.assertEqual(self._cmd.calls, 0)
+		with self._service.cycle():
+			self._service.prefetch([["ethtool", "-k", "eth0"], ["ethtool", "-c", "eth0"]])
+			self._service.execute(["ethtool", "-c", "eth0"], cache = True)
+			self.assertEqual(self._cmd.calls, 2)
+
+class DummyCommands(object):
+	def __init__(self):
+		self.calls = 0
+		self._lock = threading.Lock()
+
+	def execute(self, args, **kwargs):
+		with self._lock:
+			self.calls += 1
+		return (0, " ".join(args))
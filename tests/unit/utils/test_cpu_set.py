@@ -0,0 +1,39 @@
+import unittest
+
+from tuned.utils.cpu_set import CpuSet
+
+class CpuSetTestCase(unittest.TestCase):
+	def test_parse(self):
+		self.assertEqual(list(CpuSet.parse('4-8,^6,0xf00,,!10-11')),[4,5,7,8,9])
+		self.assertEqual(list(CpuSet.parse('0x1,0000,0001')),[0,32])
+		self.assertEqual(list(CpuSet.parse('1,2,3-x')),[])
+		self.assertEqual(list(CpuSet.parse(['1','3-4'])),[1,3,4])
+		self.assertIsNone(CpuSet.parse(None))
+
+	def test_parse_cached(self):
+		self.assertIs(CpuSet.parse('0-3,8'),CpuSet.parse('0-3,8'))
+
+	def test_iteration(self):
+		cpus = CpuSet.from_list([511,0,64,1])
+		self.assertEqual(list(cpus),[0,1,64,511])
+		self.assertEqual(len(cpus),4)
+		self.assertIn(64,cpus)
+		self.assertNotIn(63,cpus)
+		self.assertFalse(CpuSet())
+
+	def test_operations(self):
+		a = CpuSet.parse('0-7')
+		b = CpuSet.parse('4-11')
+		self.assertEqual(list(a & b),[4,5,6,7])
+		self.assertEqual(a | b,CpuSet.parse('0-11'))
+		self.assertEqual(list(a - b),[0,1,2,3])
+
+	def test_pack(self):
+		self.assertEqual(CpuSet.from_list([0,1,3,4,5,6,8,9,32]).pack(),\
+			['0-1','3-6','8-9','32'])
+		self.assertEqual(CpuSet().pack(),[])
+
+	def test_to_hex(self):
+		self.assertEqual(CpuSet.parse('1-3,5,32').to_hex(),'00000001,0000002e')
+		self.assertEqual(CpuSet.from_hex('00000001,0000002e'),\
+			CpuSet.parse('1-3,5,32'))
@@ -0,0 +1,50 @@
+import unittest
+
+from tuned.utils.ethtool_ioctl import EthtoolIoctl, ETHTOOL_GCHANNELS, \
+		ETHTOOL_SCHANNELS, ETHTOOL_GRINGPARAM, ETHTOOL_SRINGPARAM
+
+class EthtoolIoctlTestCase(unittest.TestCase):
+	def setUp(self):
+		self._ethtool = DummyEthtoolIoctl()
+
+	def test_get_ring(self):
+		self.assertEqual(self._ethtool.get_ring("eth0"),
+				{"rx": "512", "rx-mini": "n/a", "rx-jumbo": "n/a", "tx": "256"})
+
+	def test_set_ring(self):
+		self._ethtool.set_ring("eth0", {"rx": "1024"})
+		self.assertEqual(self._ethtool.data[ETHTOOL_GRINGPARAM], [4096, 0, 0, 4096, 1024, 0, 0, 256])
+		self.assertEqual(self._ethtool.cmds, [ETHTOOL_GRINGPARAM, ETHTOOL_SRINGPARAM])
+		self.assertRaises(ValueError, self._ethtool.set_ring, "eth0", {"combined": "1"})
+
+	def test_get_channels(self):
+		self.assertEqual(self._ethtool.get_channels("eth0"),
+				{"rx": "n/a", "tx": "n/a", "other": "1", "combined": "8"})
+
+	def test_set_channels(self):
+		self._ethtool.set_channels("eth0", {"combined": 4})
+		self.assertEqual(self._ethtool.data[ETHTOOL_GCHANNELS], [0, 0, 1, 16, 0, 0, 1, 4])
+		self.assertEqual(self._ethtool.cmds, [ETHTOOL_GCHANNELS, ETHTOOL_SCHANNELS])
+
+	def test_unsupported(self):
+		self.assertRaises(EnvironmentError, self._ethtool.get_ring, "lo")
+
+class DummyEthtoolIoctl(EthtoolIoctl):
+	def __init__(self):
+		super(DummyEthtoolIoctl, self).__init__()
+		self.cmds = []
+		# maximums and current values
+		self.data = {
+			ETHTOOL_GRINGPARAM: [4096, 0, 0, 4096, 512, 0, 0, 256],
+			ETHTOOL_GCHANNELS: [0, 0, 1, 16, 0, 0, 1, 8],
+		}
+
+	def _ioctl(self, device, data):
+		if device == "lo":
+			raise EnvironmentError(95, "Operation not supported")
+		cmd = data[0]
+		self.cmds.append(cmd)
+		if cmd in self.data:
+			data[1:] = type(data)("I", self.data[cmd])
+		else:
+			self.data[cmd - 1] = list(data[1:])
@@ -0,0 +1,55 @@
+import unittest
+import os
+import threading
+import time
+
+from tuned.utils.event_loop import EventLoop
+
+class EventLoopTestCase(unittest.TestCase):
+	def setUp(self):
+		self._loop = EventLoop()
+
+	def tearDown(self):
+		self._loop.close()
+
+	def test_timers_order(self):
+		calls = []
+		self._loop.call_later(0.02, lambda: calls.append(2))
+		self._loop.call_later(0.01, lambda: calls.append(1))
+		while len(calls) < 2:
+			self._loop.run_once()
+		self.assertEqual(calls, [1, 2])
+
+	def test_cancelled_timer(self):
+		calls = []
+		timer = self._loop.call_later(0.01, lambda: calls.append(1))
+		timer.cancel()
+		self._loop.run_once(0.05)
+		self.assertEqual(calls, [])
+
+	def test_fd_callback(self):
+		(rfd, wfd) = os.pipe()
+		calls = []
+		def callback():
+			calls.append(os.read(rfd, 1))
+		self._loop.register_fd(rfd, callback)
+		self.assertEqual(self._loop.registered_fds(), [rfd])
+		os.write(wfd, b"x")
+		self._loop.run_once(1)
+		self.assertEqual(calls, [b"x"])
+		self._loop.unregister_fd(rfd)
+		self.assertEqual(self._loop.registered_fds(), [])
+		os.close(rfd)
+		os.close(wfd)
+
+	def test_wakeup_terminates_run(self):
+		terminate = threading.Event()
+		def stop():
+			terminate.set()
+			self._loop.wakeup()
+		timer = threading.Timer(0.01, stop)
+		timer.start()
+		start = time.monotonic()
+		self._loop.run(terminate)
+		timer.join()
+		self.assertLess(time.monotonic() - start, 5)
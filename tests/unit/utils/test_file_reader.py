@@ -0,0 +1,45 @@
+import unittest
+import os
+import tempfile
+
+from tuned.utils.file_reader import CachedFileReader
+
+class CachedFileReaderTestCase(unittest.TestCase):
+	def setUp(self):
+		self._reader = CachedFileReader()
+		(fd, self._path) = tempfile.mkstemp()
+		os.close(fd)
+
+	def tearDown(self):
+		self._reader.close()
+		if os.path.exists(self._path):
+			os.unlink(self._path)
+
+	def _write(self, data):
+		with open(self._path, "w") as f:
+			f.write(data)
+
+	def test_reread_cached_fd(self):
+		self._write("first")
+		self.assertEqual(self._reader.read(self._path), "first")
+		self._write("second")
+		self.assertEqual(self._reader.read(self._path), "second")
+		self.assertIn(self._path, self._reader._fds)
+
+	def test_missing_file(self):
+		self.assertEqual(self._reader.read(self._path + ".missing", err_ret = "0"), "0")
+		self.assertNotIn(self._path + ".missing", self._reader._fds)
+
+	def test_replaced_file_after_invalidate(self):
+		self._write("old")
+		self.assertEqual(self._reader.read(self._path), "old")
+		os.unlink(self._path)
+		self._write("new")
+		self._reader.invalidate(os.path.dirname(self._path))
+		self.assertEqual(self._reader._fds, {})
+		self.assertEqual(self._reader.read(self._path), "new")
+
+	def test_large_file(self):
+		data = "x" * (CachedFileReader._chunk_size * 2 + 10)
+		self._write(data)
+		self.assertEqual(self._reader.read(self._path), data)
@@ -0,0 +1,80 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from tuned.utils.cpu_set import CpuSet
+from tuned.utils.irq_affinity import IrqAffinityTable, DEFAULT_IRQ
+import tuned.utils.irq_affinity as irq_affinity
+
+class IrqAffinityTableTestCase(unittest.TestCase):
+	def setUp(self):
+		self._irq_dir = tempfile.mkdtemp()
+		self._write("default_smp_affinity", "f\n")
+		self._write("0/smp_affinity", "1\n")
+		self._write("10/smp_affinity", "f\n")
+		self._write("9/smp_affinity", "3\n")
+		os.makedirs(os.path.join(self._irq_dir, "11"))
+		# IRQ without a handler, not listed in /proc/interrupts
+		self._write("13/smp_affinity", "f\n")
+		self._write("interrupts",
+				"           CPU0       CPU1\n"
+				"  0:         40          0   IO-APIC   2-edge      timer\n"
+				"  9:          0          0   IO-APIC   9-fasteoi   acpi\n"
+				" 10:         12          3   PCI-MSI 65536-edge      eth0\n"
+				" 11:          0          0   PCI-MSI 65537-edge      eth0-tx\n"
+				"NMI:          0          0   Non-maskable interrupts\n")
+
+	def tearDown(self):
+		shutil.rmtree(self._irq_dir)
+
+	def _write(self, path, data):
+		path = os.path.join(self._irq_dir, path)
+		if not os.path.isdir(os.path.dirname(path)):
+			os.makedirs(os.path.dirname(path))
+		with open(path, "w") as f:
+			f.write(data)
+
+	def _table(self):
+		return IrqAffinityTable(self._irq_dir,
+				os.path.join(self._irq_dir, "interrupts"))
+
+	def _read(self, path):
+		with open(os.path.join(self._irq_dir, path)) as f:
+			return f.read()
+
+	def test_load(self):
+		table = self._table().load()
+		self.assertEqual(table.irqs(), ["0", "9", "10"])
+		self.assertEqual(list(table.get("10")), [0, 1, 2, 3])
+		self.assertEqual(list(table.get(DEFAULT_IRQ)), [0, 1, 2, 3])
+		self.assertIsNone(table.get("11"))
+
+	def test_apply_changed_only(self):
+		table = self._table().load()
+		stats = table.apply({"0": [0], "9": CpuSet.parse("0"), "10": [0]})
+		self.assertEqual(sorted(stats.changed), ["10", "9"])
+		self.assertEqual(stats.skipped, ["0"])
+		self.assertEqual(self._read("9/smp_affinity"), "00000001")
+		self.assertEqual(self._read("0/smp_affinity"), "1\n")
+		self.assertEqual(list(table.get("9")), [0])
+		self.assertEqual(table.set("9", [0]), irq_affinity.UNCHANGED)
+
+	def test_written_entry_read_again(self):
+		table = self._table().load()
+		self.assertEqual(table.set("10", [0, 5]), irq_affinity.CHANGED)
+		# the kernel drops the offline CPUs from the affinity
+		self._write("10/smp_affinity", "1\n")
+		self.assertEqual(list(table.get("10")), [0])
+		self.assertEqual(table.irqs(), ["0", "9", "10"])
+
+	def test_failed(self):
+		table = self._table()
+		self.assertEqual(table.set("12", [0]), irq_affinity.FAILED)
+		self.assertEqual(table.stats.failed, ["12"])
+
+	def test_read_on_demand(self):
+		table = self._table()
+		self.assertEqual(list(table.get("9")), [0, 1])
+		self.assertEqual(table.set(DEFAULT_IRQ, [0, 1]), irq_affinity.CHANGED)
+		self.assertEqual(self._read("default_smp_affinity"), "00000003")
@@ -0,0 +1,83 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from tuned.utils.process_snapshot import ProcessSnapshot
+
+class ProcessSnapshotTestCase(unittest.TestCase):
+	def setUp(self):
+		self._proc_dir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self._proc_dir)
+
+	def _write(self, path, data):
+		path = os.path.join(self._proc_dir, path)
+		if not os.path.isdir(os.path.dirname(path)):
+			os.makedirs(os.path.dirname(path))
+		with open(path, "w") as f:
+			f.write(data)
+
+	def _add_task(self, pid, tid, comm, flags = 0, cmdline = None, cgroup = None):
+		stat = "%d (%s) S 1 %d %d 0 -1 %d 0 0 0 0\n" % (tid, comm, pid, pid, flags)
+		self._write("%d/task/%d/stat" % (pid, tid), stat)
+		if cgroup is not None:
+			self._write("%d/task/%d/cgroup" % (pid, tid), cgroup)
+		if pid == tid:
+			self._write("%d/stat" % pid, stat)
+			self._write("%d/cmdline" % pid, cmdline or "")
+			if cgroup is not None:
+				self._write("%d/cgroup" % pid, cgroup)
+
+	def test_walk(self):
+		self._add_task(2, 2, "kthreadd", 0x00200000)
+		self._add_task(100, 100, "my (app)", cmdline = "/usr/bin/app\0--opt\0")
+		self._add_task(100, 101, "worker")
+		os.makedirs(os.path.join(self._proc_dir, "self"))
+
+		snapshot = ProcessSnapshot(self._proc_dir)
+		processes = snapshot.processes
+		self.assertEqual([p.pid for p in processes], [2, 100])
+		self.assertTrue(processes[0].kthread)
+		self.assertEqual(processes[0].cmdline, "[kthreadd]")
+		self.assertEqual(processes[1].comm, "my (app)")
+		self.assertEqual(processes[1].cmdline, "/usr/bin/app --opt")
+		self.assertEqual([(t.tid, t.comm, t.cmdline) for t in processes[1].threads],
+				[(101, "worker", "/usr/bin/app --opt")])
+		self.assertEqual([t.tid for t in snapshot.tasks()], [2, 100, 101])
+
+	def test_cmdline_format(self):
+		# the same format as procfs.process_cmdline(), empty arguments
+		# are kept and the part after the last NUL is dropped
+		self._add_task(100, 100, "app", cmdline = "/usr/bin/app\0\0--opt\0")
+		self._add_task(200, 200, "nginx", cmdline = "nginx: worker process")
+		snapshot = ProcessSnapshot(self._proc_dir)
+		self.assertEqual([p.cmdline for p in snapshot.processes],
+				["/usr/bin/app  --opt", "nginx"])
+		self.assertEqual(snapshot.cmdline(100), "/usr/bin/app  --opt")
+		self.assertEqual(snapshot.cmdline(200), "nginx")
+
+	def test_cgroup(self):
+		self._add_task(100, 100, "app", cmdline = "app\0",
+				cgroup = "1:cpuset:/\n0::/system.slice/app.service\n")
+		self._add_task(100, 101, "worker", cgroup = "0::/system.slice/app.service/worker\n")
+		self._add_task(200, 200, "app2", cmdline = "app2\0")
+		processes = ProcessSnapshot(self._proc_dir).processes
+		self.assertEqual(processes[0].cgroup, "0::/system.slice/app.service,1:cpuset:/")
+		self.assertEqual(processes[0].threads[0].cgroup, "0::/system.slice/app.service/worker")
+		self.assertEqual(processes[1].cgroup, "")
+
+	def test_snapshot_is_reused(self):
+		self._add_task(100, 100, "app", cmdline = "app\0")
+		snapshot = ProcessSnapshot(self._proc_dir)
+		self.assertEqual(len(snapshot.processes), 1)
+		self._add_task(200, 200, "app2", cmdline = "app2\0")
+		self.assertEqual(len(snapshot.processes), 1)
+		self.assertEqual(len(ProcessSnapshot(self._proc_dir).processes), 2)
+
+	def test_vanished_process(self):
+		self._add_task(100, 100, "app", cmdline = "app\0")
+		os.makedirs(os.path.join(self._proc_dir, "200"))
+		snapshot = ProcessSnapshot(self._proc_dir)
+		self.assertEqual([p.pid for p in snapshot.processes], [100])
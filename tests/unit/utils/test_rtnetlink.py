@@ -0,0 +1,56 @@
+import unittest
+import socket
+import struct
+
+from tuned.utils import rtnetlink
+from tuned.utils.rtnetlink import RtNetlink
+
+def attr(attr_type, value):
+	length = 4 + len(value)
+	return struct.pack("=HH", length, attr_type) + value + b"\0" * (((length + 3) & ~3) - length)
+
+def message(msg_type, flags, seq, body):
+	return struct.pack("=IHHII", 16 + len(body), msg_type, flags, seq, 0) + body
+
+def link(index, name, mtu, txqueuelen, seq = 1):
+	body = struct.pack("=BxHiII", socket.AF_UNSPEC, 1, index, 0, 0)
+	body += attr(rtnetlink.IFLA_IFNAME, name.encode() + b"\0")
+	body += attr(rtnetlink.IFLA_MTU, struct.pack("=I", mtu))
+	body += attr(rtnetlink.IFLA_TXQLEN, struct.pack("=I", txqueuelen))
+	return message(rtnetlink.RTM_NEWLINK, rtnetlink.NLM_F_MULTI, seq, body)
+
+class RtNetlinkTestCase(unittest.TestCase):
+	def setUp(self):
+		self._sock = DummySocket()
+		self._rtnetlink = RtNetlink()
+		self._rtnetlink._open = lambda: self._sock
+
+	def test_dump_links(self):
+		self._sock.responses = [
+			link(1, "lo", 65536, 1000) + link(2, "eth0", 1500, 1000),
+			link(3, "eth1", 9000, 5000, seq = 7) + link(3, "eth1", 9000, 5000)
+					+ message(rtnetlink.NLMSG_DONE, rtnetlink.NLM_F_MULTI, 1, b"\0" * 4),
+		]
+		self.assertEqual(self._rtnetlink.dump_links(), {
+			"lo": {"mtu": "65536", "txqueuelen": "1000"},
+			"eth0": {"mtu": "1500", "txqueuelen": "1000"},
+			"eth1": {"mtu": "9000", "txqueuelen": "5000"},
+		})
+		length, msg_type, flags, seq, pid = struct.unpack_from("=IHHII", self._sock.sent[0])
+		self.assertEqual(msg_type, rtnetlink.RTM_GETLINK)
+		self.assertTrue(flags & rtnetlink.NLM_F_DUMP)
+
+	def test_error(self):
+		self._sock.responses = [message(rtnetlink.NLMSG_ERROR, 0, 1, struct.pack("=i", -1) + b"\0" * 16)]
+		self.assertRaises(EnvironmentError, self._rtnetlink.dump_links)
+
+class DummySocket(object):
+	def __init__(self):
+		self.sent = []
+		self.responses = []
+
+	def send(self, data):
+		self.sent.append(data)
+
+	def recv(self, size):
+		return self.responses.pop(0)
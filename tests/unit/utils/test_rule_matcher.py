@@ -0,0 +1,48 @@
+import unittest
+
+from tuned.utils.rule_matcher import RuleMatcher
+
+class RuleMatcherTestCase(unittest.TestCase):
+	def test_highest_priority_wins(self):
+		matcher = RuleMatcher([("ksoftirq", "low"), (r"\[ksoftirqd/(0|1)\]", "mid"), ("irq", "high")])
+		self.assertEqual(matcher.match("[ksoftirqd/0]"), "high")
+		self.assertEqual(matcher.match("[ksoftirqd/2]"), "high")
+		self.assertEqual(matcher.match("[ksoftirq]"), "high")
+		self.assertEqual(matcher.match("ksoftir"), None)
+
+		matcher = RuleMatcher([("irq", "low"), (r"ksoftirqd/(0|1)", "high")])
+		self.assertEqual(matcher.match("[ksoftirqd/1]"), "high")
+		self.assertEqual(matcher.match("[ksoftirqd/2]"), "low")
+
+	def test_overlapping_rules(self):
+		# the rules sorted by rule_prio, the rule matching earlier in
+		# the string does not win over the rule with higher rule_prio
+		matcher = RuleMatcher([("^/usr/bin/qemu", "vm"), ("vcpu", "vcpu")])
+		self.assertEqual(matcher.match("/usr/bin/qemu-kvm -name vcpu"), "vcpu")
+		self.assertEqual(matcher.match("/usr/bin/qemu-kvm -name guest"), "vm")
+		matcher = RuleMatcher([("vcpu", "vcpu"), ("^/usr/bin/qemu", "vm")])
+		self.assertEqual(matcher.match("/usr/bin/qemu-kvm -name vcpu"), "vm")
+
+	def test_anchors(self):
+		matcher = RuleMatcher([("^python", "a"), ("bash$", "b")])
+		self.assertEqual(matcher.match("python3 x"), "a")
+		self.assertIsNone(matcher.match("/usr/bin/python3"))
+		self.assertEqual(matcher.match("/bin/bash"), "b")
+		self.assertIsNone(matcher.match("bash -c"))
+
+	def test_no_rules(self):
+		self.assertIsNone(RuleMatcher([]).match("anything"))
+
+	def test_cache(self):
+		matcher = RuleMatcher([("a", 1)], cache_size = 2)
+		self.assertEqual(matcher.match("a"), 1)
+		self.assertIsNone(matcher.match("b"))
+		self.assertEqual(len(matcher._cache), 2)
+		self.assertEqual(matcher.match("ca"), 1)
+		self.assertEqual(len(matcher._cache), 1)
+
+	def test_uncombinable_rules(self):
+		matcher = RuleMatcher([("(?P<x>a)", 1), ("(?P<x>b)", 2)])
+		self.assertIsNone(matcher._regex)
+		self.assertEqual(matcher.match("ab"), 2)
+		self.assertEqual(matcher.match("a"), 1)
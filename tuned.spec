@@ -8,40 +8,9 @@
 %global system_profiles_dir %{_prefix}/lib/tuned/profiles
 %endif
 
-%if 0%{?fedora}
-%if 0%{?fedora} > 27
-%bcond_without python3
-%else
-%bcond_with python3
-%endif
-%else
-
-# ! 0%%{?fedora}
-%if 0%{?rhel}
-%if 0%{?rhel} < 8
-%bcond_with python3
-%else
-%bcond_without python3
-%endif
-%else
-# ! 0%%{?rhel}
-%bcond_without python3
-%endif
-%endif
-
-%if %{with python3}
+# the code requires python3 (e.g. time.monotonic, os.pread, concurrent.futures)
 %global _py python3
 %global make_python_arg PYTHON=%{__python3}
-%else
-%{!?python2_sitelib:%global python2_sitelib %{python_sitelib}}
-%if 0%{?rhel} && 0%{?rhel} < 8
-%global make_python_arg PYTHON=%{__python}
-%global _py python
-%else
-%global make_python_arg PYTHON=%{__python2}
-%global _py python2
-%endif
-%endif
 
 %if %{with snapshot}
 %if 0%{!?git_short_commit:1}
@@ -78,32 +47,17 @@ Requires(postun): systemd
 BuildRequires: make
 BuildRequires: %{_py}
 BuildRequires: %{_py}-devel
-# BuildRequires for 'make test'
-# python-mock is needed for python-2.7, but it's not available on RHEL-7, only in the EPEL
-%if %{without python3} && ( ! 0%{?rhel} || 0%{?rhel} >= 8 || 0%{?epel})
-BuildRequires: %{_py}-mock
-%endif
 BuildRequires: %{_py}-pyudev
 Requires: %{_py}-pyudev
 Requires: %{_py}-linux-procfs
+# also used to watch the profile directories, without it the profile
+# lookups are checked by stat()
 Requires: %{_py}-inotify
-%if %{without python3}
-Requires: %{_py}-schedutils
-%endif
-# requires for packages with inconsistent python2/3 names
-%if %{with python3}
 # BuildRequires for 'make test'
 BuildRequires: python3-dbus
 BuildRequires: python3-gobject-base
 Requires: python3-dbus
 Requires: python3-gobject-base
-%else
-# BuildRequires for 'make test'
-BuildRequires: dbus-python
-BuildRequires: pygobject3-base
-Requires: dbus-python
-Requires: pygobject3-base
-%endif
 Requires: virt-what
 Requires: ethtool
 Requires: gawk
@@ -153,12 +107,7 @@ network and ATA harddisk devices are implemented.
 Summary: GTK GUI for tuned
 Requires: %{name} = %{version}-%{release}
 Requires: powertop, polkit
-# requires for packages with inconsistent python2/3 names
-%if %{with python3}
 Requires: python3-gobject-base
-%else
-Requires: pygobject3-base
-%endif
 
 %description gtk
 GTK GUI that can control tuned and provides simple profile editor.
@@ -335,12 +284,8 @@ touch %{buildroot}%{_sysconfdir}/modprobe.d/kvm.rt.tuned.conf
 # validate desktop file
 desktop-file-validate %{buildroot}%{_datadir}/applications/tuned-gui.desktop
 
-# On RHEL-7 EPEL is needed, because there is no python-mock package and
-# python-2.7 doesn't have mock built-in
-%if 0%{?rhel} >= 8 || 0%{?epel} || ! 0%{?rhel}
 %check
 make test %{make_python_arg}
-%endif
 
 %post
 %systemd_post tuned.service
@@ -464,13 +409,8 @@ fi
 %exclude %{docdir}/README.NFV
 %doc %{docdir}
 %{_datadir}/bash-completion/completions/tuned-adm
-%if %{with python3}
 %exclude %{python3_sitelib}/tuned/gtk
 %{python3_sitelib}/tuned
-%else
-%exclude %{python2_sitelib}/tuned/gtk
-%{python2_sitelib}/tuned
-%endif
 %{_sbindir}/tuned
 %{_sbindir}/tuned-adm
 %exclude %{_sysconfdir}/tuned/realtime-variables.conf
@@ -536,11 +476,7 @@ fi
 
 %files gtk
 %{_sbindir}/tuned-gui
-%if %{with python3}
 %{python3_sitelib}/tuned/gtk
-%else
-%{python2_sitelib}/tuned/gtk
-%endif
 %{_datadir}/tuned/ui
 %{_datadir}/icons/hicolor/scalable/apps/tuned.svg
 %{_datadir}/applications/tuned-gui.desktop
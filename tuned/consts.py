@@ -17,9 +17,19 @@ DBUS_INTERFACE = "com.redhat.tuned.control"
 DBUS_OBJECT = "/Tuned"
 DEFAULT_PROFILE = "balanced"
 DEFAULT_STORAGE_FILE = "/run/tuned/save.pickle"
+# journal of the storage changes, it is appended to DEFAULT_STORAGE_FILE path
+STORAGE_JOURNAL_SUFFIX = ".journal"
+# number of journal records which triggers the journal compaction
+STORAGE_JOURNAL_COMPACT_RECORDS = 1000
+# maximal delay (in seconds) of writing the deferred storage changes
+STORAGE_FLUSH_INTERVAL = 0.5
 USER_PROFILES_DIR = "/etc/tuned/profiles"
 SYSTEM_PROFILES_DIR = "/usr/lib/tuned/profiles"
 PERSISTENT_STORAGE_DIR = "/var/lib/tuned"
+# cache of the parsed and merged profiles
+PROFILE_CACHE_FILE = PERSISTENT_STORAGE_DIR + "/profile_cache.pickle"
+# maximal number of profiles in the profile cache
+PROFILE_CACHE_SIZE = 16
 PLUGIN_MAIN_UNIT_NAME = "main"
 PLUGIN_VARIABLES_UNIT_NAME = "variables"
 # Magic section header because ConfigParser does not support "headerless" config
@@ -56,6 +66,9 @@ CGROUP_CLEANUP_TASKS_RETRY = 10
 PROCFS_MOUNT_POINT = "/proc"
 DEF_CGROUP_MOUNT_POINT = "/sys/fs/cgroup/cpuset"
 DEF_CGROUP_MODE = 0o770
+DEF_CGROUP_V2_MOUNT_POINT = "/sys/fs/cgroup"
+# maximal number of perf events drained before the processes are tuned
+SCHED_EVENTS_BATCH_SIZE = 4096
 
 # service plugin configuration
 SERVICE_SYSTEMD_CFG_PATH = "/etc/systemd/system/%s.service.d"
@@ -147,6 +160,10 @@ CFG_CPU_EPP_FLAG = "hwp_epp"
 CFG_ROLLBACK = "rollback"
 CFG_PROFILE_DIRS = "profile_dirs"
 CFG_STARTUP_UDEV_SETTLE_WAIT = "startup_udev_settle_wait"
+CFG_APPLY_THREADS = "apply_threads"
+CFG_INCREMENTAL_SWITCH = "incremental_switch"
+CFG_HOTPLUG_BATCH_WINDOW = "hotplug_batch_window"
+CFG_PROFILE_CACHE = "profile_cache"
 
 # no_daemon mode
 CFG_DEF_DAEMON = True
@@ -200,6 +217,18 @@ CFG_DEF_ROLLBACK = "auto"
 CFG_DEF_PROFILE_DIRS = [SYSTEM_PROFILES_DIR, USER_PROFILES_DIR]
 # default startup udev settle wait
 CFG_DEF_STARTUP_UDEV_SETTLE_WAIT = 0
+# number of threads applying instances of the same priority, 1 means sequentially
+CFG_DEF_APPLY_THREADS = 1
+CFG_FUNC_APPLY_THREADS = "getint"
+# switch profiles by applying only the differences between them
+CFG_DEF_INCREMENTAL_SWITCH = False
+CFG_FUNC_INCREMENTAL_SWITCH = "getboolean"
+# window in milliseconds for batching hotplugged devices, 0 disables batching
+CFG_DEF_HOTPLUG_BATCH_WINDOW = 0
+CFG_FUNC_HOTPLUG_BATCH_WINDOW = "getint"
+# cache the parsed and merged profiles on disk
+CFG_DEF_PROFILE_CACHE = True
+CFG_FUNC_PROFILE_CACHE = "getboolean"
 
 PATH_CPU_DMA_LATENCY = "/dev/cpu_dma_latency"
 
@@ -246,3 +275,9 @@ CAPTURE_LOG_LEVELS = {
 HOTPLUG_WAIT_FOR_DEV_INIT_RETRIES = 100
 # how long to wait for device initialization in seconds during retry
 HOTPLUG_WAIT_FOR_DEV_INIT_DELAY = 0.1
+# maximal number of pending udev events per subsystem
+HOTPLUG_EVENT_QUEUE_SIZE = 1024
+# number of threads processing the udev events
+HOTPLUG_EVENT_WORKERS = 1
+# number of threads running the external commands concurrently
+COMMAND_SERVICE_WORKERS = 4
@@ -24,8 +24,11 @@ class Application(object):
 		self._dbus_exporter = None
 		self._unix_socket_exporter = None
 
-		storage_provider = storage.PickleProvider()
-		storage_factory = storage.Factory(storage_provider)
+		# the storage survives crashes, the plugins recover the original
+		# values saved by the previous run
+		self._storage_provider = storage.JournalProvider()
+		self._storage_provider.load()
+		storage_factory = storage.Factory(self._storage_provider)
 
 		self.config = GlobalConfig() if config is None else config
 		if self.config.get_bool(consts.CFG_DYNAMIC_TUNING):
@@ -50,8 +53,12 @@ class Application(object):
 
 		profile_factory = profiles.Factory()
 		profile_merger = profiles.Merger()
-		profile_locator = profiles.Locator(self.config.get_list(consts.CFG_PROFILE_DIRS, consts.CFG_DEF_PROFILE_DIRS))
-		profile_loader = profiles.Loader(profile_locator, profile_factory, profile_merger, self.config, self.variables)
+		profile_locator = profiles.IndexedLocator(self.config.get_list(consts.CFG_PROFILE_DIRS, consts.CFG_DEF_PROFILE_DIRS))
+		self._profile_locator = profile_locator
+		profile_cache = None
+		if self.config.get_bool(consts.CFG_PROFILE_CACHE, consts.CFG_DEF_PROFILE_CACHE):
+			profile_cache = profiles.CompiledProfileCache()
+		profile_loader = profiles.Loader(profile_locator, profile_factory, profile_merger, self.config, self.variables, profile_cache)
 
 		self._daemon = daemon.Daemon(unit_manager, profile_loader, profile_name, self.config, self)
 		self._controller = controller.Controller(self._daemon, self.config)
@@ -215,6 +222,8 @@ class Application(object):
 		result = self._controller.run()
 		if self.config.get_bool(consts.CFG_DAEMON, consts.CFG_DEF_DAEMON):
 			exports.stop()
+		self._storage_provider.save()
+		self._profile_locator.close()
 
 		if self._pid_file is not None:
 			self._delete_pid_file()
@@ -5,6 +5,7 @@ from tuned.exceptions import TunedException
 import threading
 import tuned.consts as consts
 from tuned.utils.commands import commands
+from tuned.utils.event_loop import EventLoop
 from tuned.plugins import hotplug
 import pyudev
 import time
@@ -50,6 +51,15 @@ class Controller(tuned.exports.interfaces.ExportableInterface):
 		self._terminate = threading.Event()
 		self._cmd = commands()
 		self._timer_store = TimerStore()
+		self._event_loop = None
+
+	def _sync_exports_fds(self):
+		fds = set(exports.get_fds())
+		registered = set(self._event_loop.registered_fds())
+		for fd in registered - fds:
+			self._event_loop.unregister_fd(fd)
+		for fd in fds - registered:
+			self._event_loop.register_fd(fd, exports.period_check)
 
 	def run(self):
 		"""
@@ -89,15 +99,28 @@ class Controller(tuned.exports.interfaces.ExportableInterface):
 			exports.start()
 
 		if daemon:
-			# we have to pass some timeout, otherwise signals will not work
-			while not self._cmd.wait(self._terminate, 1):
-				exports.period_check()
+			# sleep until a request arrives on some exporter or until
+			# terminate() wakes us up, the exporters notify us when their
+			# file descriptors change (e.g. the unix socket is created)
+			self._event_loop = EventLoop()
+			exports.set_fds_changed_callback(self._event_loop.wakeup)
+			try:
+				while not self._terminate.is_set():
+					self._sync_exports_fds()
+					self._event_loop.run_once()
+			finally:
+				exports.set_fds_changed_callback(None)
+				self._event_loop.close()
+				self._event_loop = None
 
 		log.info("terminating controller")
 		self.stop()
 
 	def terminate(self):
 		self._terminate.set()
+		event_loop = self._event_loop
+		if event_loop is not None:
+			event_loop.wakeup()
 
 	def sighup(self):
 		if self._daemon._sighup_processing.is_set():
@@ -187,6 +210,12 @@ class Controller(tuned.exports.interfaces.ExportableInterface):
 		return self.start()
 
 	def _switch_profile(self, profile_name, manual):
+		try:
+			if self._daemon.switch_profile(profile_name, manual):
+				return (True, "OK")
+		except tuned.exceptions.TunedException as e:
+			log.error("Failed to apply profile '%s', the previous profile stays applied" % profile_name)
+			return (False, str(e))
 		was_running = self._daemon.is_running()
 		msg = "OK"
 		success = True
@@ -504,8 +533,10 @@ class Controller(tuned.exports.interfaces.ExportableInterface):
 		script_pre = options.pop("script_pre", None)
 		script_post = options.pop("script_post", None)
 		priority = int(options.pop("priority", self._daemon._unit_manager._def_instance_priority))
+		update_interval = options.pop("update_interval", None)
 		try:
 			instance = plugin.create_instance(instance_name, priority, devices, devices_udev_regex, script_pre, script_post, options)
+			instance.update_interval = self._daemon._unit_manager.parse_update_interval(instance_name, update_interval)
 			plugin.initialize_instance(instance)
 			self._daemon._unit_manager.instances.append(instance)
 		except Exception as e:
@@ -6,6 +6,7 @@ from tuned.exceptions import TunedException
 from tuned.profiles.exceptions import InvalidProfileException
 import tuned.consts as consts
 from tuned.utils.commands import commands
+from tuned.utils.event_loop import EventLoop
 from tuned import exports
 from tuned.utils.profile_recommender import ProfileRecommender
 import re
@@ -22,6 +23,7 @@ class Daemon(object):
 		self._dynamic_tuning = consts.CFG_DEF_DYNAMIC_TUNING
 		self._recommend_command = True
 		self._rollback = consts.CFG_DEF_ROLLBACK
+		self._incremental_switch = consts.CFG_DEF_INCREMENTAL_SWITCH
 		if config is not None:
 			self._daemon = config.get_bool(consts.CFG_DAEMON, consts.CFG_DEF_DAEMON)
 			self._sleep_interval = int(config.get(consts.CFG_SLEEP_INTERVAL, consts.CFG_DEF_SLEEP_INTERVAL))
@@ -29,6 +31,7 @@ class Daemon(object):
 			self._dynamic_tuning = config.get_bool(consts.CFG_DYNAMIC_TUNING, consts.CFG_DEF_DYNAMIC_TUNING)
 			self._recommend_command = config.get_bool(consts.CFG_RECOMMEND_COMMAND, consts.CFG_DEF_RECOMMEND_COMMAND)
 			self._rollback = config.get(consts.CFG_ROLLBACK, consts.CFG_DEF_ROLLBACK)
+			self._incremental_switch = config.get_bool(consts.CFG_INCREMENTAL_SWITCH, consts.CFG_DEF_INCREMENTAL_SWITCH)
 		self._application = application
 		if self._sleep_interval <= 0:
 			self._sleep_interval = int(consts.CFG_DEF_SLEEP_INTERVAL)
@@ -37,6 +40,7 @@ class Daemon(object):
 		elif self._update_interval < self._sleep_interval:
 			self._update_interval = self._sleep_interval
 		self._sleep_cycles = self._update_interval // self._sleep_interval
+		self._update_interval = self._sleep_cycles * self._sleep_interval
 		log.info("using sleep interval of %d second(s)" % self._sleep_interval)
 		if self._dynamic_tuning:
 			log.info("dynamic tuning is enabled (can be overridden by plugins)")
@@ -56,6 +60,8 @@ class Daemon(object):
 
 	def _init_threads(self):
 		self._thread = None
+		self._event_loop = None
+		self._dynamic_tuning_timer_handle = None
 		self._terminate = threading.Event()
 		# Flag which is set if terminating due to profile_switch
 		self._terminate_profile_switch = threading.Event()
@@ -212,21 +218,12 @@ class Daemon(object):
 		self._sighup_processing.clear()
 
 		if self._daemon:
-			# In python 2 interpreter with applied patch for rhbz#917709 we need to periodically
-			# poll, otherwise the python will not have chance to update events / locks (due to GIL)
-			# and e.g. DBus control will not work. The polling interval of 1 seconds (which is
-			# the default) is still much better than 50 ms polling with unpatched interpreter.
-			# For more details see TuneD rhbz#917587.
-			_sleep_cnt = self._sleep_cycles
-			while not self._cmd.wait(self._terminate, self._sleep_interval):
-				if self._dynamic_tuning:
-					_sleep_cnt -= 1
-					if _sleep_cnt <= 0:
-						_sleep_cnt = self._sleep_cycles
-						log.debug("updating monitors")
-						self._unit_manager.update_monitors()
-						log.debug("performing tunings")
-						self._unit_manager.update_tuning()
+			# Dynamic tuning is driven by a timer, so the thread sleeps until
+			# the next update is due or until it is asked to terminate.
+			if self._dynamic_tuning:
+				self._unit_manager.schedule_updates(self._update_interval)
+				self._schedule_dynamic_tuning()
+			self._event_loop.run(self._terminate)
 
 		self._profile_applied.clear()
 
@@ -265,6 +262,76 @@ class Daemon(object):
 			self._unit_manager.stop_tuning(rollback)
 		self._unit_manager.destroy_all()
 
+	def _schedule_dynamic_tuning(self):
+		if self._dynamic_tuning_timer_handle is not None:
+			self._dynamic_tuning_timer_handle.cancel()
+		deadline = self._unit_manager.next_update_deadline()
+		if deadline is None:
+			# no instance with dynamic tuning yet, check for dynamically
+			# created instances in the global update interval
+			self._dynamic_tuning_timer_handle = self._event_loop.call_later(self._update_interval, self._dynamic_tuning_timer)
+		else:
+			self._dynamic_tuning_timer_handle = self._event_loop.call_at(deadline, self._dynamic_tuning_timer)
+
+	def _dynamic_tuning_timer(self):
+		log.debug("performing scheduled tunings")
+		self._unit_manager.update_scheduled()
+		if not self._terminate.is_set():
+			self._schedule_dynamic_tuning()
+
+	def _switch_profile_incremental(self, profile_names, manual):
+		self._load_profiles(profile_names, manual)
+		self._profile_applied.clear()
+		self._unit_manager.switch(self._profile.units)
+		self._save_active_profile(" ".join(self._active_profiles),
+					  self._manual)
+		self._save_post_loaded_profile(self._post_loaded_profile)
+		self._profile_applied.set()
+		log.info("static tuning from profile '%s' applied incrementally" % self._profile.name)
+		if self._dynamic_tuning:
+			self._schedule_dynamic_tuning()
+		self._notify_profile_changed(" ".join(self._active_profiles), True, "OK")
+
+	def switch_profile(self, profile_names, manual):
+		"""
+		Switch the running daemon to another profile by applying only the
+		differences between the profiles. The switch is performed by the
+		daemon thread.
+
+		Return:
+		bool -- False if the incremental switch is not possible or it failed
+		unexpectedly, the daemon has to be stopped and started with the new
+		profile instead
+
+		Raises:
+		TunedException -- the new profile cannot be loaded, the previous
+		profile stays applied
+		"""
+		if not self._incremental_switch or not self._daemon or not self.is_running():
+			return False
+		if not (profile_names or self._post_loaded_profile):
+			return False
+		done = threading.Event()
+		result = {}
+		def switch():
+			try:
+				self._switch_profile_incremental(profile_names, manual)
+			except TunedException as e:
+				result["error"] = e
+			except Exception as e:
+				log.error("Incremental switch to profile '%s' failed, the profile will be fully reapplied" % profile_names)
+				log.exception(e)
+				result["failed"] = True
+			finally:
+				done.set()
+		self._event_loop.call_later(0, switch)
+		while not self._cmd.wait(done, self._sleep_interval):
+			if not self.is_running():
+				raise TunedException("TuneD stopped while switching the profile.")
+		if "error" in result:
+			raise result["error"]
+		return "failed" not in result
+
 	def _save_active_profile(self, profile_names, manual):
 		try:
 			self._cmd.save_active_profile(profile_names, manual)
@@ -337,6 +404,7 @@ class Daemon(object):
 
 		log.info("starting tuning")
 		self._not_used.set()
+		self._event_loop = EventLoop()
 		self._thread = threading.Thread(target=self._thread_code)
 		self._terminate_profile_switch.clear()
 		self._terminate.clear()
@@ -372,7 +440,10 @@ class Daemon(object):
 		if profile_switch:
 			self._terminate_profile_switch.set()
 		self._terminate.set()
+		self._event_loop.wakeup()
 		self._thread.join()
 		self._thread = None
+		self._event_loop.close()
+		self._event_loop = None
 
 		return True
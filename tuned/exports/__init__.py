@@ -63,3 +63,11 @@ def stop():
 def period_check():
 	ctl = controller.ExportsController.get_instance()
 	return ctl.period_check()
+
+def get_fds():
+	ctl = controller.ExportsController.get_instance()
+	return ctl.get_fds()
+
+def set_fds_changed_callback(callback):
+	ctl = controller.ExportsController.get_instance()
+	return ctl.set_fds_changed_callback(callback)
@@ -12,6 +12,7 @@ class ExportsController(tuned.patterns.Singleton):
 		self._exporters = []
 		self._objects = []
 		self._exports_initialized = False
+		self._fds_changed_callback = None
 
 	def register_exporter(self, instance):
 		"""Register objects exporter."""
@@ -79,6 +80,21 @@ class ExportsController(tuned.patterns.Singleton):
 		for exporter in self._exporters:
 			exporter.period_check()
 
+	def get_fds(self):
+		"""Return file descriptors of all exporters which need period_check when readable."""
+		fds = []
+		for exporter in self._exporters:
+			fds.extend(exporter.get_fds())
+		return fds
+
+	def set_fds_changed_callback(self, callback):
+		"""Set callback called when the exporters' file descriptors may have changed."""
+		self._fds_changed_callback = callback
+
+	def _fds_changed(self):
+		if self._fds_changed_callback is not None:
+			self._fds_changed_callback()
+
 	def _initialize_exports(self):
 		if self._exports_initialized:
 			return
@@ -100,8 +116,10 @@ class ExportsController(tuned.patterns.Singleton):
 		self._initialize_exports()
 		for exporter in self._exporters:
 			exporter.start()
+		self._fds_changed()
 
 	def stop(self):
 		"""Stop the exports."""
 		for exporter in self._exporters:
 			exporter.stop()
+		self._fds_changed()
@@ -22,3 +22,7 @@ class ExporterInterface(object):
 
 	def period_check(self):
 		pass
+
+	def get_fds(self):
+		# file descriptors which need period_check() when readable
+		return []
@@ -133,6 +133,12 @@ class UnixSocketExporter(interfaces.ExporterInterface):
 	def stop(self):
 		if self._socket_object:
 			self._socket_object.close()
+			self._socket_object = None
+
+	def get_fds(self):
+		if not self.running():
+			return []
+		return [self._socket_object]
 
 	def _send_data(self, s, data):
 		log.debug("Sending socket data: %s)" % data)
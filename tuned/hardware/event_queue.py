@@ -0,0 +1,141 @@
+import collections
+import threading
+import tuned.logs
+from tuned import consts
+
+__all__ = ["DeviceEventQueue"]
+
+log = tuned.logs.get()
+
+class DeviceEventQueue(object):
+	"""
+	Bounded queue of udev events processed by worker threads, so the
+	udev monitor observer thread never waits for the plugins.
+
+	Every subsystem has its own queue of at most max_depth events, the
+	events of a subsystem are processed in order by one worker at a time.
+	The pending events of a device are coalesced: a 'remove' cancels a
+	pending 'add' and repeated 'change' events are merged into the last
+	pending 'add' or 'change' event. Events arriving to a full queue are
+	dropped.
+	"""
+
+	def __init__(self, handler, max_depth = None, workers = None):
+		self._handler = handler
+		if max_depth is None:
+			max_depth = consts.HOTPLUG_EVENT_QUEUE_SIZE
+		self._max_depth = max_depth
+		if workers is None:
+			workers = consts.HOTPLUG_EVENT_WORKERS
+		self._workers_count = workers
+		self._cond = threading.Condition()
+		# subsystem -> OrderedDict(sys_path -> list of [event, device])
+		self._queues = collections.OrderedDict()
+		self._depths = {}
+		# subsystems being processed by a worker
+		self._busy = set()
+		self._full = set()
+		self._workers = []
+		self._stopping = False
+		self._processed = 0
+		self._coalesced = 0
+		self._dropped = 0
+		self._max_seen_depth = 0
+
+	def start(self):
+		with self._cond:
+			self._stopping = False
+		for i in range(self._workers_count):
+			worker = threading.Thread(target = self._worker, name = "udev-events-%d" % i)
+			worker.daemon = True
+			worker.start()
+			self._workers.append(worker)
+
+	def stop(self):
+		"""Process the pending events and stop the workers."""
+		with self._cond:
+			self._stopping = True
+			self._cond.notify_all()
+		for worker in self._workers:
+			worker.join()
+		self._workers = []
+		log.debug("udev event queue: %s" % self.stats())
+
+	def stats(self):
+		with self._cond:
+			return {
+				"depth": sum(self._depths.values()),
+				"max_depth": self._max_seen_depth,
+				"processed": self._processed,
+				"coalesced": self._coalesced,
+				"dropped": self._dropped,
+			}
+
+	def put(self, event, device):
+		subsystem = device.subsystem
+		with self._cond:
+			queue = self._queues.setdefault(subsystem, collections.OrderedDict())
+			pending = queue.get(device.sys_path)
+			last = pending[-1] if pending else None
+			if last is not None and last[0] == "add" and event == "remove":
+				# the device vanished before it was processed
+				pending.pop()
+				if not pending:
+					del queue[device.sys_path]
+				self._depths[subsystem] -= 1
+				self._coalesced += 2
+				return True
+			if last is not None and event == "change" and last[0] in ["add", "change"]:
+				last[1] = device
+				self._coalesced += 1
+				return True
+			depth = self._depths.get(subsystem, 0)
+			if depth >= self._max_depth:
+				self._dropped += 1
+				if subsystem not in self._full:
+					self._full.add(subsystem)
+					log.warning("udev event queue of subsystem '%s' is full, dropping events" % subsystem)
+				return False
+			self._full.discard(subsystem)
+			queue.setdefault(device.sys_path, []).append([event, device])
+			self._depths[subsystem] = depth + 1
+			self._max_seen_depth = max(self._max_seen_depth, depth + 1)
+			self._cond.notify()
+			return True
+
+	# must be called with the condition held
+	def _get(self):
+		for subsystem, queue in self._queues.items():
+			if subsystem in self._busy or not queue:
+				continue
+			sys_path, pending = next(iter(queue.items()))
+			event, device = pending.pop(0)
+			if not pending:
+				del queue[sys_path]
+			self._depths[subsystem] -= 1
+			self._busy.add(subsystem)
+			return subsystem, event, device
+		return None
+
+	def _worker(self):
+		while True:
+			with self._cond:
+				item = self._get()
+				while item is None:
+					if self._stopping and not self._busy \
+							and not any(self._depths.values()):
+						self._cond.notify_all()
+						return
+					self._cond.wait()
+					item = self._get()
+			subsystem, event, device = item
+			try:
+				self._handler(event, device)
+			except Exception as e:
+				log.error("Exception occured when processing udev event '%s' of '%s'." % (event, device))
+				log.exception(e)
+			finally:
+				with self._cond:
+					self._busy.discard(subsystem)
+					self._processed += 1
+					self._cond.notify_all()
@@ -1,6 +1,9 @@
 import pyudev
+import threading
+import time
 import tuned.logs
 from tuned import consts
+from .event_queue import DeviceEventQueue
 
 __all__ = ["Inventory"]
 
@@ -10,6 +13,11 @@ class Inventory(object):
 	"""
 	Inventory object can handle information about available hardware devices. It also informs the plugins
 	about related hardware events.
+
+	The devices of the subsystems with subscribed plugins are cached by their sys_path, the cache is
+	populated by the lookups and enumerations and kept coherent by the udev events of the subsystems.
+	The devices are dropped from the cache on the change events, as pyudev.Device caches the values of
+	the sysfs attributes, the next lookup creates a new device then.
 	"""
 
 	def __init__(self, udev_context=None, udev_monitor_cls=None, monitor_observer_factory=None, buffer_size=None, set_receive_buffer_size=True):
@@ -35,11 +43,64 @@ class Inventory(object):
 			monitor_observer_factory = _MonitorObserverFactory()
 		self._monitor_observer_factory = monitor_observer_factory
 		self._monitor_observer = None
+		# the events are processed inline when the queue is not running
+		self._event_queue = None
 
 		self._subscriptions = {}
 
+		# sys_path -> pyudev.Device
+		self._devices = {}
+		# (subsystem, sys_name) -> sys_path
+		self._device_paths = {}
+		self._devices_lock = threading.Lock()
+
+	def _cache_device(self, device):
+		with self._devices_lock:
+			if device.subsystem not in self._subscriptions:
+				return
+			self._uncache_path(device.sys_path)
+			self._devices[device.sys_path] = device
+			self._device_paths[(device.subsystem, device.sys_name)] = device.sys_path
+
+	# must be called with the devices lock held
+	def _uncache_path(self, sys_path):
+		device = self._devices.pop(sys_path, None)
+		if device is not None:
+			self._device_paths.pop((device.subsystem, device.sys_name), None)
+
+	def _uncache_device(self, device):
+		with self._devices_lock:
+			self._uncache_path(device.sys_path)
+
+	def _uncache_subsystem(self, subsystem):
+		with self._devices_lock:
+			for sys_path in [sys_path for (_subsystem, sys_name), sys_path
+					in self._device_paths.items() if _subsystem == subsystem]:
+				self._uncache_path(sys_path)
+
+	def _update_device_cache(self, event, device):
+		if event in ["remove", "change"]:
+			self._uncache_device(device)
+			return
+		if event == "move":
+			devpath_old = device.properties.get("DEVPATH_OLD")
+			if devpath_old is not None:
+				with self._devices_lock:
+					self._uncache_path(self._udev_context.sys_path + devpath_old)
+		self._cache_device(device)
+
 	def get_device(self, subsystem, sys_name):
 		"""Get a pyudev.Device object for the sys_name (e.g. 'sda')."""
+		with self._devices_lock:
+			sys_path = self._device_paths.get((subsystem, sys_name))
+			if sys_path is not None:
+				return self._devices[sys_path]
+		d = self._get_udev_device(subsystem, sys_name)
+		if d is not None:
+			self._cache_device(d)
+		return d
+
+	def _get_udev_device(self, subsystem, sys_name):
 		try:
 			try:
 				d = pyudev.Devices.from_name(self._udev_context, subsystem, sys_name)
@@ -55,21 +116,28 @@ class Inventory(object):
 
 	def get_devices(self, subsystem):
 		"""Get list of devices on a given subsystem."""
-		return self._udev_context.list_devices(subsystem=subsystem)
+		return _CachingEnumerator(self, self._udev_context.list_devices(subsystem=subsystem))
 
 	def _handle_udev_event(self, event, device):
 		if not device.subsystem in self._subscriptions:
 			return
+		self._update_device_cache(event, device)
+		event_queue = self._event_queue
+		if event_queue is not None:
+			event_queue.put(event, device)
+		else:
+			self._process_udev_event(event, device)
 
+	def _process_udev_event(self, event, device):
 		retry = consts.HOTPLUG_WAIT_FOR_DEV_INIT_RETRIES
 		while not device.is_initialized and retry > 0:
 			log.debug("Device '%s' is uninitialized, waiting '%.2f' seconds for its initialization." % (device, consts.HOTPLUG_WAIT_FOR_DEV_INIT_DELAY))
 			time.sleep(consts.HOTPLUG_WAIT_FOR_DEV_INIT_DELAY)
-			retry =- 1
+			retry -= 1
 		if not device.is_initialized:
 			log.warn("Unsuccessfully waited for device '%s' initialization, continuing with uninitialized device, problems may occur." % device)
 
-		for (plugin, callback) in self._subscriptions[device.subsystem]:
+		for (plugin, callback) in list(self._subscriptions.get(device.subsystem, [])):
 			try:
 				callback(event, device)
 			except Exception as e:
@@ -91,6 +159,8 @@ class Inventory(object):
 	def start_processing_events(self):
 		if self._monitor_observer is None:
 			log.debug("starting monitor observer")
+			self._event_queue = DeviceEventQueue(self._process_udev_event)
+			self._event_queue.start()
 			self._monitor_observer = self._monitor_observer_factory.create(self._udev_monitor, self._handle_udev_event)
 			self._monitor_observer.start()
 
@@ -99,6 +169,9 @@ class Inventory(object):
 			log.debug("stopping monitor observer")
 			self._monitor_observer.stop()
 			self._monitor_observer = None
+			# the pending events are processed before the queue stops
+			self._event_queue.stop()
+			self._event_queue = None
 
 	def _unsubscribe_subsystem(self, plugin, subsystem):
 		for callback_data in self._subscriptions[subsystem]:
@@ -118,6 +191,31 @@ class Inventory(object):
 
 		for _subsystem in empty_subsystems:
 			del self._subscriptions[_subsystem]
+			# no events keep the cached devices of the subsystem coherent
+			self._uncache_subsystem(_subsystem)
+
+class _CachingEnumerator(object):
+	"""
+	Wrapper of pyudev.Enumerator which caches the enumerated devices
+	in the inventory, the match_* filters are wrapped too.
+	"""
+
+	def __init__(self, inventory, enumerator):
+		self._inventory = inventory
+		self._enumerator = enumerator
+
+	def __getattr__(self, name):
+		attr = getattr(self._enumerator, name)
+		if not name.startswith("match"):
+			return attr
+		def match(*args, **kwargs):
+			return _CachingEnumerator(self._inventory, attr(*args, **kwargs))
+		return match
+
+	def __iter__(self):
+		for device in self._enumerator:
+			self._inventory._cache_device(device)
+			yield device
 
 class _MonitorObserverFactory(object):
 	def create(self, *args, **kwargs):
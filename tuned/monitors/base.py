@@ -1,7 +1,97 @@
+import array
+import operator
+import time
 import tuned.logs
+from tuned.utils.file_reader import CachedFileReader
 log = tuned.logs.get()
 
-__all__ = ["Monitor"]
+__all__ = ["Monitor", "LoadHistory"]
+
+class LoadHistory(object):
+	"""
+	Ring buffer of the last 'size' load samples of one device.
+
+	Each sample consists of 'fields' counters (only the first 'fields'
+	values of the appended sample are used). The samples are kept in
+	one preallocated array, on every append the deltas of the counters,
+	their running maxima (starting with 'max_init') and the exponentially
+	weighted moving average of the rates are updated, so the consumers
+	do not need to keep and recompute their own lists.
+	"""
+
+	__slots__ = ["_fields", "_size", "_samples", "_times", "_count", "_pos",
+			"_delta", "_max", "_rate", "_ewma", "_alpha"]
+
+	def __init__(self, fields, size = 2, max_init = 0, alpha = 0.5, typecode = "q"):
+		assert size >= 2
+		self._fields = fields
+		self._size = size
+		self._samples = array.array(typecode, [0]) * (fields * size)
+		self._times = array.array("d", [0.0]) * size
+		self._count = 0
+		self._pos = 0
+		if not isinstance(max_init, (list, tuple)):
+			max_init = [max_init] * fields
+		self._max = array.array(typecode, max_init)
+		self._delta = array.array(typecode, [0]) * fields
+		self._rate = array.array("d", [0.0]) * fields
+		self._ewma = array.array("d", [0.0]) * fields
+		self._alpha = alpha
+
+	def __len__(self):
+		return self._count
+
+	def _slice(self, pos):
+		return self._samples[pos * self._fields:(pos + 1) * self._fields]
+
+	def append(self, sample, timestamp = None):
+		if timestamp is None:
+			timestamp = time.monotonic()
+		sample = array.array(self._samples.typecode, sample[:self._fields])
+		prev = (self._pos - 1) % self._size
+		offset = self._pos * self._fields
+		self._samples[offset:offset + self._fields] = sample
+		self._times[self._pos] = timestamp
+		if self._count > 0:
+			self._delta = array.array(self._samples.typecode,
+					map(operator.sub, sample, self._slice(prev)))
+			self._max = array.array(self._samples.typecode,
+					map(max, self._max, self._delta))
+			dt = timestamp - self._times[prev]
+			if dt > 0:
+				self._rate = array.array("d", [float(d) / dt for d in self._delta])
+				alpha = self._alpha
+				self._ewma = array.array("d",
+						[e + alpha * (r - e) for (e, r) in zip(self._ewma, self._rate)])
+		self._count = min(self._count + 1, self._size)
+		self._pos = (self._pos + 1) % self._size
+
+	def latest(self):
+		"""The last sample."""
+		if self._count == 0:
+			return None
+		return self._slice((self._pos - 1) % self._size).tolist()
+
+	def samples(self):
+		"""All stored samples from the oldest one."""
+		start = (self._pos - self._count) % self._size
+		return [self._slice((start + i) % self._size).tolist() for i in range(self._count)]
+
+	def delta(self):
+		"""Difference between the last two samples."""
+		return self._delta.tolist()
+
+	def max_delta(self):
+		"""Maximum of the deltas seen so far (at least max_init)."""
+		return self._max.tolist()
+
+	def rate(self):
+		"""Delta of the last two samples per second."""
+		return self._rate.tolist()
+
+	def ewma(self):
+		"""Exponentially weighted moving average of the rates."""
+		return self._ewma.tolist()
 
 class Monitor(object):
 	"""
@@ -15,6 +105,9 @@ class Monitor(object):
 	  - update(cls)
 	"""
 
+	# reader of the statistics files shared by all monitors
+	_reader = CachedFileReader()
+
 	# class properties
 
 	@classmethod
@@ -48,6 +141,11 @@ class Monitor(object):
 	def update(cls):
 		raise NotImplementedError()
 
+	@classmethod
+	def _invalidate_device(cls, device):
+		"""Drop cached file descriptors of the hotplugged device."""
+		pass
+
 	@classmethod
 	def _register_instance(cls, instance):
 		cls._instances.add(instance)
@@ -71,7 +169,9 @@ class Monitor(object):
 	# instance properties
 
 	def __init__(self, devices = None):
-		if not hasattr(self, "_class_initialized"):
+		# check the class itself, the attribute can be inherited from
+		# a base class whose initialization failed
+		if "_class_initialized" not in type(self).__dict__:
 			self._init_class()
 			assert hasattr(self, "_class_initialized")
 
@@ -106,6 +206,7 @@ class Monitor(object):
 
 	def add_device(self, device):
 		assert (isinstance(device,str) or isinstance(device,unicode))
+		self._invalidate_device(device)
 		self._update_available_devices()
 		if device in self._available_devices:
 			self._devices.add(device)
@@ -113,6 +214,7 @@ class Monitor(object):
 
 	def remove_device(self, device):
 		assert (isinstance(device,str) or isinstance(device,unicode))
+		self._invalidate_device(device)
 		if device in self._devices:
 			self._devices.remove(device)
 			self._updating_devices.remove(device)
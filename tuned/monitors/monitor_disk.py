@@ -24,12 +24,34 @@ class DiskMonitor(tuned.monitors.Monitor):
 
 		return vendor in cls._supported_vendors
 
+	@classmethod
+	def _invalidate_device(cls, device):
+		cls._reader.invalidate("/sys/block/%s/" % device)
+
+	@classmethod
+	def _read_diskstats(cls):
+		# /proc/diskstats has the same fields as /sys/block/<dev>/stat
+		# prefixed by the major, minor and the device name
+		stats = {}
+		for line in cls._reader.read("/proc/diskstats", err_ret = "").splitlines():
+			fields = line.split()
+			if len(fields) < 14:
+				continue
+			# sysfs uses "!" instead of "/" in the block device names
+			stats[fields[2].replace("/", "!")] = fields[3:]
+		return stats
+
 	@classmethod
 	def update(cls):
+		stats = cls._read_diskstats()
 		for device in cls._updating_devices:
-			cls._update_disk(device)
+			if device in stats:
+				cls._load[device] = list(map(int, stats[device]))
+			else:
+				cls._update_disk(device)
 
 	@classmethod
 	def _update_disk(cls, dev):
-		with open("/sys/block/" + dev + "/stat") as statfile:
-			cls._load[dev] = list(map(int, statfile.read().split()))
+		data = cls._reader.read("/sys/block/" + dev + "/stat")
+		if data is not None:
+			cls._load[dev] = list(map(int, data.split()))
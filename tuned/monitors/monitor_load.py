@@ -7,6 +7,5 @@ class LoadMonitor(tuned.monitors.Monitor):
 
 	@classmethod
 	def update(cls):
-		with open("/proc/loadavg") as statfile:
-			data = statfile.read().split()
+		data = cls._reader.read("/proc/loadavg", err_ret = "0").split()
 		cls._load["system"] = float(data[0])
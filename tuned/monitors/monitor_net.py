@@ -2,9 +2,6 @@ import tuned.monitors
 import os
 import re
 from tuned.utils.nettool import ethcard
-from tuned.utils.commands import commands
-
-cmd = commands()
 
 class NetMonitor(tuned.monitors.Monitor):
 
@@ -40,13 +37,34 @@ class NetMonitor(tuned.monitors.Monitor):
 		except AttributeError:
 			return dev
 	@classmethod
+	def _invalidate_device(cls, device):
+		cls._reader.invalidate("/sys/class/net/%s/" % cls._dev_map(device))
+
+	@classmethod
+	def _read_net_dev(cls):
+		# /proc/net/dev has the statistics of all interfaces, after the
+		# interface name there are 8 receive and 8 transmit columns
+		stats = {}
+		for line in cls._reader.read("/proc/net/dev", err_ret = "").splitlines()[2:]:
+			(name, sep, data) = line.partition(":")
+			fields = data.split()
+			if not sep or len(fields) < 10:
+				continue
+			stats[name.strip()] = [fields[0], fields[1], fields[8], fields[9]]
+		return stats
+
+	@classmethod
 	def _updateStat(cls, dev):
 		files = ["rx_bytes", "rx_packets", "tx_bytes", "tx_packets"]
-		for i,f in enumerate(files):
-			cls._load[dev][i] = cmd.read_file("/sys/class/net/" + cls._dev_map(dev) + "/statistics/" + f, err_ret = "0").strip()
+		# assign a new list, so the loads from the previous update stay intact
+		cls._load[dev] = [cls._reader.read("/sys/class/net/" + cls._dev_map(dev) + "/statistics/" + f, err_ret = "0").strip() for f in files]
 
 	@classmethod
 	def update(cls):
+		stats = cls._read_net_dev()
 		for device in cls._updating_devices:
-			cls._updateStat(device)
-
+			load = stats.get(cls._dev_map(device))
+			if load is not None:
+				cls._load[device] = load
+			else:
+				cls._updateStat(device)
@@ -11,11 +11,23 @@ class Repository(ClassLoader):
 	def __init__(self):
 		super(Repository, self).__init__()
 		self._monitors = set()
+		self._tick = 0
+		self._snapshot = {}
 
 	@property
 	def monitors(self):
 		return self._monitors
 
+	@property
+	def tick(self):
+		"""Number of the last update() call."""
+		return self._tick
+
+	@property
+	def snapshot(self):
+		"""Loads of all monitor classes from the last update(), {monitor_class: {device: load}}."""
+		return self._snapshot
+
 	def _set_loader_parameters(self):
 		self._namespace = "tuned.monitors"
 		self._prefix = "monitor_"
@@ -32,3 +44,29 @@ class Repository(ClassLoader):
 		assert isinstance(monitor, self._interface)
 		monitor.cleanup()
 		self._monitors.remove(monitor)
+
+	def update(self, monitors = None):
+		"""
+		Update the monitors, all of them if monitors is None. Monitor
+		update() refreshes all devices of the monitor class, so it is
+		called only once per class regardless of the number of monitor
+		instances. The snapshot keeps the loads of the classes which
+		were not updated.
+		"""
+		self._tick += 1
+		if monitors is None:
+			monitors = self._monitors
+		classes = set(type(monitor) for monitor in self._monitors)
+		snapshot = dict((monitor_cls, load) for (monitor_cls, load)
+				in self._snapshot.items() if monitor_cls in classes)
+		for monitor_cls in set(type(monitor) for monitor in monitors if monitor in self._monitors):
+			log.debug("updating monitor %s" % monitor_cls.__name__)
+			try:
+				monitor_cls.update()
+			except Exception as e:
+				log.error("BUG: Unhandled exception in update of monitor %s: %s"
+						% (monitor_cls.__name__, str(e)))
+				log.exception(e)
+				continue
+			snapshot[monitor_cls] = dict(monitor_cls._load)
+		self._snapshot = snapshot
@@ -19,6 +19,11 @@ class Plugin(object):
 	Intentionally a lot of logic is included in the plugin to increase plugin flexibility.
 	"""
 
+	# the instances of the plugin may be applied concurrently with the
+	# instances of other plugins, i.e. the plugin does not touch resources
+	# (files, caches) shared with other plugins
+	parallel_apply = False
+
 	def __init__(self, monitors_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, instance_factory, global_cfg, variables):
 		"""Plugin constructor."""
 
@@ -221,7 +226,9 @@ class Plugin(object):
 				return True
 		return False
 
-	def _call_device_script(self, instance, script, op, devices, rollback = consts.ROLLBACK_SOFT):
+	# With batch = True the script is called once with all the devices as
+	# arguments, otherwise it is called for every device.
+	def _call_device_script(self, instance, script, op, devices, rollback = consts.ROLLBACK_SOFT, batch = False):
 		if script is None:
 			return None
 		if len(devices) == 0:
@@ -237,13 +244,13 @@ class Plugin(object):
 			return False
 		dir_name = os.path.dirname(script)
 		ret = True
-		for dev in devices:
+		for devs in [list(devices)] if batch else [[dev] for dev in devices]:
 			environ = os.environ
 			environ.update(self._variables.get_env())
 			arguments = [op]
 			if rollback == consts.ROLLBACK_FULL:
 				arguments.append("full_rollback")
-			arguments.append(dev)
+			arguments.extend(devs)
 			log.info("calling script '%s' with arguments '%s'" % (script, str(arguments)))
 			log.debug("using environment '%s'" % str(list(environ.items())))
 			try:
@@ -330,6 +337,85 @@ class Plugin(object):
 			self._instance_post_static(instance, False)
 			self._call_device_script(instance, instance.script_pre, "unapply", instance.processed_devices, rollback = rollback)
 
+	def instance_retune(self, instance, options):
+		"""
+		Switch the applied plugin instance to new options. Only the
+		options which differ are rolled back and applied again.
+
+		Return:
+		bool -- False if the instance cannot be retuned in place, then it
+		has to be unapplied and created again
+		"""
+		options = self._get_effective_options(options)
+		changed = self._changed_options(instance.options, options)
+		if not changed:
+			return True
+		if not instance.active or not instance.has_static_tuning \
+				or instance.has_dynamic_tuning:
+			return False
+		# the options which are not commands (e.g. 'dynamic') are
+		# processed only when the instance is created
+		if any(option not in self._commands for option in changed):
+			return False
+		log.debug("retuning instance %s (%s), changed options: %s"
+				% (instance.name, self.name, ", ".join(changed)))
+		return self._instance_retune_static(instance, options, changed)
+
+	def _changed_options(self, old_options, new_options):
+		"""
+		Return names of the options which differ. The values referencing
+		variables or functions are always considered changed, their
+		expansion may differ between the profiles.
+		"""
+		changed = []
+		for option in list(new_options) + [option for option in old_options if option not in new_options]:
+			old_value = old_options.get(option, None)
+			new_value = new_options.get(option, None)
+			if old_value != new_value or "${" in str(new_value):
+				changed.append(option)
+		return changed
+
+	def _uses_generic_static_tuning(self):
+		cls = type(self)
+		for method in ["_instance_apply_static", "_instance_unapply_static",
+				"_instance_pre_static", "_instance_post_static"]:
+			if getattr(cls, method) is not getattr(Plugin, method):
+				return False
+		return True
+
+	def _instance_retune_static(self, instance, options, changed):
+		"""
+		Retune the instance by the plugin commands. Plugins overriding the
+		static tuning have to override this method too, otherwise their
+		instances are recreated.
+		"""
+		if not self._uses_generic_static_tuning():
+			return False
+		old_options = instance.options
+		commands = [command for command in list(self._commands.values()) if command["name"] in changed]
+		# roll back the removed options and the custom commands, which
+		# keep their own state
+		for command in reversed(commands):
+			if old_options.get(command["name"], None) is None:
+				continue
+			if options.get(command["name"], None) is None or command["custom"] is not None:
+				if command["per_device"]:
+					for device in instance.processed_devices:
+						self._cleanup_device_command(instance, command, device)
+				else:
+					self._cleanup_non_device_command(instance, command)
+		instance.options = options
+		for command in commands:
+			new_value = self._variables.expand(options.get(command["name"], None))
+			if new_value is None:
+				continue
+			if command["per_device"]:
+				for device in instance.processed_devices:
+					self._retune_device_command(instance, command, device, new_value)
+			else:
+				self._retune_non_device_command(instance, command, new_value)
+		return True
+
 	def _instance_apply_static(self, instance):
 		self._execute_all_non_device_commands(instance)
 		self._execute_all_device_commands(instance, instance.assigned_devices)
@@ -533,6 +619,30 @@ class Plugin(object):
 			if new_value is not None:
 				command["set"](new_value, instance, sim = False, remove = False)
 
+	# The value saved by the previous profile is kept, so the setting is
+	# changed directly without the transient rollback to the original.
+	def _retune_device_command(self, instance, command, device, new_value):
+		old_value = self._storage_get(instance, command, device)
+		if command["custom"] is not None or old_value is None:
+			self._execute_device_command(instance, command, device, new_value)
+			return
+		new_value = self._process_assignment_modifiers(new_value, old_value)
+		if new_value is None:
+			self._cleanup_device_command(instance, command, device)
+		else:
+			command["set"](new_value, device, instance, sim = False, remove = False)
+
+	def _retune_non_device_command(self, instance, command, new_value):
+		old_value = self._storage_get(instance, command)
+		if command["custom"] is not None or old_value is None:
+			self._execute_non_device_command(instance, command, new_value)
+			return
+		new_value = self._process_assignment_modifiers(new_value, old_value)
+		if new_value is None:
+			self._cleanup_non_device_command(instance, command)
+		else:
+			command["set"](new_value, instance, sim = False, remove = False)
+
 	def _norm_value(self, value):
 		v = self._cmd.unquote(str(value))
 		if re.match(r'\s*(0+,?)+([\da-fA-F]*,?)*\s*$', v):
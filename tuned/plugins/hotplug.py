@@ -1,6 +1,8 @@
 from . import base
 import tuned.consts as consts
 import tuned.logs
+import collections
+import threading
 
 log = tuned.logs.get()
 
@@ -11,11 +13,47 @@ class Plugin(base.Plugin):
 
 	def __init__(self, *args, **kwargs):
 		super(Plugin, self).__init__(*args, **kwargs)
+		# window in seconds for batching the added devices, 0 disables it
+		self._hotplug_batch_window = 0
+		if self._global_cfg is not None:
+			self._hotplug_batch_window = self._global_cfg.get_int(consts.CFG_HOTPLUG_BATCH_WINDOW,
+					consts.CFG_DEF_HOTPLUG_BATCH_WINDOW) / 1000.0
+		self._hotplug_lock = threading.RLock()
+		# instance name -> (instance, set of the added devices)
+		self._hotplug_batch = collections.OrderedDict()
+		self._hotplug_timer = None
 
 	def cleanup(self):
 		self._hardware_events_cleanup()
+		with self._hotplug_lock:
+			if self._hotplug_timer is not None:
+				self._hotplug_timer.cancel()
+				self._hotplug_timer = None
+			self._hotplug_batch.clear()
 		super(Plugin, self).cleanup()
 
+	# The batch is applied from the timer thread, so the tuning of the
+	# instances by the daemon thread holds the lock as well.
+
+	def instance_apply_tuning(self, instance):
+		with self._hotplug_lock:
+			super(Plugin, self).instance_apply_tuning(instance)
+
+	def instance_update_tuning(self, instance):
+		with self._hotplug_lock:
+			super(Plugin, self).instance_update_tuning(instance)
+
+	def instance_unapply_tuning(self, instance, rollback = consts.ROLLBACK_SOFT):
+		with self._hotplug_lock:
+			# the devices waiting in the batch are not tuned, they
+			# must not be tuned after the rollback of the instance
+			self._drop_device_batch(instance)
+			super(Plugin, self).instance_unapply_tuning(instance, rollback)
+
+	def instance_retune(self, instance, options):
+		with self._hotplug_lock:
+			return super(Plugin, self).instance_retune(instance, options)
+
 	def _hardware_events_init(self):
 		pass
 
@@ -37,38 +75,102 @@ class Plugin(base.Plugin):
 			self._move_device(device.sys_name)
 
 	def _add_device_process(self, instance, device_name):
+		if self._hotplug_batch_window > 0:
+			self._add_device_batch(instance, device_name)
+			return
 		log.info("instance %s: adding new device %s" % (instance.name, device_name))
 		self._assigned_devices.add(device_name)
 		self._call_device_script(instance, instance.script_pre, "apply", [device_name])
-		self._added_device_apply_tuning(instance, device_name)
+		self._added_devices_apply_tuning(instance, [device_name])
 		self._call_device_script(instance, instance.script_post, "apply", [device_name])
 		instance.processed_devices.add(device_name)
 
-	def _add_device(self, device_name):
-		if device_name in (self._assigned_devices | self._free_devices):
-			log.debug("device: '%s' already exists, ignoring" % device_name)
-			return
+	def _add_device_batch(self, instance, device_name):
+		"""
+		Assign the device to the instance, the tuning is applied later
+		together with the other devices added within the batching window.
+		"""
+		log.info("instance %s: adding new device %s to the batch" % (instance.name, device_name))
+		self._assigned_devices.add(device_name)
+		instance.assigned_devices.add(device_name)
+		self._hotplug_batch.setdefault(instance.name, (instance, set()))[1].add(device_name)
+		if self._hotplug_timer is None:
+			self._hotplug_timer = threading.Timer(self._hotplug_batch_window,
+					self._apply_device_batch)
+			self._hotplug_timer.daemon = True
+			self._hotplug_timer.start()
+
+	def _drop_device_batch(self, instance):
+		"""
+		Drop the devices of the instance waiting in the batch. They stay
+		assigned to the instance, so they are released with it.
+		"""
+		with self._hotplug_lock:
+			batch = self._hotplug_batch.pop(instance.name, None)
+			if batch is not None and batch[1]:
+				log.debug("instance %s: dropping devices %s from the batch"
+						% (instance.name, ", ".join(sorted(batch[1]))))
+			if not self._hotplug_batch and self._hotplug_timer is not None:
+				self._hotplug_timer.cancel()
+				self._hotplug_timer = None
+
+	def _apply_device_batch(self):
+		with self._hotplug_lock:
+			self._hotplug_timer = None
+			batch = self._hotplug_batch
+			self._hotplug_batch = collections.OrderedDict()
+			for instance, devices in batch.values():
+				# the instance could be destroyed or (re)applied meanwhile
+				if self._instances.get(instance.name) is not instance:
+					continue
+				devices = sorted(devices & instance.assigned_devices)
+				if not devices:
+					continue
+				log.info("instance %s: adding new devices %s" % (instance.name, ", ".join(devices)))
+				self._call_device_script(instance, instance.script_pre, "apply", devices, batch = True)
+				self._added_devices_apply_tuning(instance, devices)
+				self._call_device_script(instance, instance.script_post, "apply", devices, batch = True)
+				instance.assigned_devices.difference_update(devices)
+				instance.processed_devices.update(devices)
 
-		for instance_name, instance in list(self._instances.items()):
-			if len(self._get_matching_devices(instance, [device_name])) == 1:
-				self._add_device_process(instance, device_name)
-				break
-		else:
-			log.debug("no instance wants %s" % device_name)
-			self._free_devices.add(device_name)
+	def _add_device(self, device_name):
+		with self._hotplug_lock:
+			if device_name in (self._assigned_devices | self._free_devices):
+				log.debug("device: '%s' already exists, ignoring" % device_name)
+				return
+
+			for instance_name, instance in list(self._instances.items()):
+				if len(self._get_matching_devices(instance, [device_name])) == 1:
+					self._add_device_process(instance, device_name)
+					break
+			else:
+				log.debug("no instance wants %s" % device_name)
+				self._free_devices.add(device_name)
 
 	def _add_devices_nocheck(self, instance, device_names):
 		"""
 		Add devices specified by the set to the instance, no check is performed.
 		"""
-		for dev in device_names:
-			self._add_device_process(instance, dev)
+		with self._hotplug_lock:
+			for dev in device_names:
+				self._add_device_process(instance, dev)
 		# This can be a bit racy (we can overcount),
 		# but it shouldn't affect the boolean result
 		instance.active = len(instance.processed_devices) \
 				+ len(instance.assigned_devices) > 0
 
 	def _remove_device_process(self, instance, device_name):
+		batch = self._hotplug_batch.get(instance.name)
+		if batch is not None and device_name in batch[1] \
+				and device_name in instance.assigned_devices:
+			# the device was not tuned yet
+			log.info("instance %s: removing device %s from the batch" % (instance.name, device_name))
+			batch[1].remove(device_name)
+			instance.assigned_devices.remove(device_name)
+			self._assigned_devices.remove(device_name)
+			instance.active = len(instance.processed_devices) \
+					+ len(instance.assigned_devices) > 0
+			return True
 		if device_name in instance.processed_devices:
 			self._call_device_script(instance, instance.script_post, "unapply", [device_name])
 			self._removed_device_unapply_tuning(instance, device_name)
@@ -102,30 +204,33 @@ class Plugin(base.Plugin):
 		device_name -- name of the device
 
 		"""
-		if device_name not in (self._assigned_devices | self._free_devices):
-			log.debug("device: '%s' doesn't exist, ignoring" % device_name)
-			return
-
-		for instance in list(self._instances.values()):
-			if self._remove_device_process(instance, device_name):
-				break
-		else:
-			try:
-				self._free_devices.remove(device_name)
-			except KeyError:
-				log.debug("device: '%s' isn't initialized, not removing it" % device_name)
+		with self._hotplug_lock:
+			if device_name not in (self._assigned_devices | self._free_devices):
+				log.debug("device: '%s' doesn't exist, ignoring" % device_name)
+				return
+
+			for instance in list(self._instances.values()):
+				if self._remove_device_process(instance, device_name):
+					break
+			else:
+				try:
+					self._free_devices.remove(device_name)
+				except KeyError:
+					log.debug("device: '%s' isn't initialized, not removing it" % device_name)
 
 	def _remove_devices_nocheck(self, instance, device_names):
 		"""
 		Remove devices specified by the set from the instance, no check is performed.
 		"""
-		for dev in device_names:
-			self._remove_device_process(instance, dev)
+		with self._hotplug_lock:
+			for dev in device_names:
+				self._remove_device_process(instance, dev)
 
-	def _added_device_apply_tuning(self, instance, device_name):
-		self._execute_all_device_commands(instance, [device_name])
+	def _added_devices_apply_tuning(self, instance, device_names):
+		self._execute_all_device_commands(instance, device_names)
 		if instance.has_dynamic_tuning and self._global_cfg.get(consts.CFG_DYNAMIC_TUNING, consts.CFG_DEF_DYNAMIC_TUNING):
-			self._instance_apply_dynamic(instance, device_name)
+			for device_name in device_names:
+				self._instance_apply_dynamic(instance, device_name)
 
 	def _removed_device_unapply_tuning(self, instance, device_name):
 		if instance.has_dynamic_tuning and self._global_cfg.get(consts.CFG_DYNAMIC_TUNING, consts.CFG_DEF_DYNAMIC_TUNING):
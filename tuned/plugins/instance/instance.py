@@ -15,8 +15,10 @@ class Instance(object):
 
 		self._active = True
 		self._priority = priority
+		self._update_interval = None
 		self._has_static_tuning = False
 		self._has_dynamic_tuning = False
+		self._load_monitor = None
 		self._assigned_devices = set()
 		self._processed_devices = set()
 
@@ -43,6 +45,15 @@ class Instance(object):
 	def priority(self):
 		return self._priority
 
+	@property
+	def update_interval(self):
+		"""Interval of dynamic tuning updates in seconds, None means the global update_interval."""
+		return self._update_interval
+
+	@update_interval.setter
+	def update_interval(self, value):
+		self._update_interval = value
+
 	@property
 	def devices_expression(self):
 		return self._devices_expression
@@ -71,6 +82,10 @@ class Instance(object):
 	def options(self):
 		return self._options
 
+	@options.setter
+	def options(self, value):
+		self._options = value
+
 	@property
 	def has_static_tuning(self):
 		return self._has_static_tuning
@@ -79,6 +94,11 @@ class Instance(object):
 	def has_dynamic_tuning(self):
 		return self._has_dynamic_tuning
 
+	@property
+	def load_monitor(self):
+		"""Monitor used by the dynamic tuning of the instance or None."""
+		return self._load_monitor
+
 	# methods
 
 	def apply_tuning(self):
@@ -35,6 +35,8 @@ class AudioPlugin(hotplug.Plugin):
 	====
 	"""
 
+	parallel_apply = True
+
 	def _init_devices(self):
 		self._devices_supported = True
 		self._assigned_devices = set()
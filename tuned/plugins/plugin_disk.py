@@ -2,6 +2,7 @@ import errno
 from . import hotplug
 from .decorators import *
 import tuned.logs
+import tuned.monitors
 import tuned.consts as consts
 from tuned.utils.commands import commands
 import os
@@ -82,6 +83,8 @@ class DiskPlugin(hotplug.Plugin):
 	specified by the [option]`readahead_multiply` option.
 	"""
 
+	parallel_apply = True
+
 	def __init__(self, *args, **kwargs):
 		super(DiskPlugin, self).__init__(*args, **kwargs)
 
@@ -147,10 +150,11 @@ class DiskPlugin(hotplug.Plugin):
 		if self._device_is_supported(device) or event == "remove":
 			super(DiskPlugin, self)._hardware_events_callback(event, device)
 
-	def _added_device_apply_tuning(self, instance, device_name):
+	def _added_devices_apply_tuning(self, instance, device_names):
 		if instance._load_monitor is not None:
-			instance._load_monitor.add_device(device_name)
-		super(DiskPlugin, self)._added_device_apply_tuning(instance, device_name)
+			for device_name in device_names:
+				instance._load_monitor.add_device(device_name)
+		super(DiskPlugin, self)._added_devices_apply_tuning(instance, device_names)
 
 	def _removed_device_unapply_tuning(self, instance, device_name):
 		if instance._load_monitor is not None:
@@ -284,22 +288,20 @@ class DiskPlugin(hotplug.Plugin):
 		log.debug("%s idle: read %d, write %d, level %d" % (device, idle["read"], idle["write"], idle["level"]))
 
 	def _init_stats_and_idle(self, instance, device):
-		instance._stats[device] = { "new": 11 * [0], "old": 11 * [0], "max": 11 * [1] }
+		history = tuned.monitors.LoadHistory(11, max_init = 1)
+		# start from zero counters
+		history.append(11 * [0])
+		instance._stats[device] = { "history": history }
 		instance._idle[device] = { "level": 0, "read": 0, "write": 0 }
 		instance._spindown_change_delayed[device] = False
 
 	def _update_stats(self, instance, device, new_load):
-		instance._stats[device]["old"] = old_load = instance._stats[device]["new"]
-		instance._stats[device]["new"] = new_load
-
-		# load difference
-		diff = [new_old[0] - new_old[1] for new_old in zip(new_load, old_load)]
-		instance._stats[device]["diff"] = diff
+		history = instance._stats[device]["history"]
+		history.append(new_load)
 
-		# adapt maximum expected load if the difference is higher
-		old_max_load = instance._stats[device]["max"]
-		max_load = [max(pair) for pair in zip(old_max_load, diff)]
-		instance._stats[device]["max"] = max_load
+		# load difference and maximum expected load (adapted if the difference is higher)
+		diff = history.delta()
+		max_load = history.max_delta()
 
 		# read/write ratio
 		instance._stats[device]["read"] =  float(diff[1]) / float(max_load[1])
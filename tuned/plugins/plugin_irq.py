@@ -2,8 +2,9 @@ from . import hotplug
 from .decorators import *
 import tuned.consts as consts
 import tuned.logs
+from tuned.utils.irq_affinity import IrqAffinityTable
+import tuned.utils.irq_affinity as irq_affinity
 
-import errno
 import os
 
 log = tuned.logs.get()
@@ -58,6 +59,8 @@ class IrqPlugin(hotplug.Plugin):
 	def __init__(self, monitor_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, plugin_instance_factory, global_cfg, variables):
 		super(IrqPlugin, self).__init__(monitor_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, plugin_instance_factory, global_cfg, variables)
 		self._irqs = {}
+		# affinity table shared by the IRQs of one apply/unapply/verify
+		self._irq_table = None
 
 	#
 	# plugin-level methods: devices and plugin options
@@ -116,68 +119,79 @@ class IrqPlugin(hotplug.Plugin):
 
 	def _instance_apply_static(self, instance):
 		log.debug("Applying IRQ affinities (%s)" % instance.name)
-		super(IrqPlugin, self)._instance_apply_static(instance)
+		self._irq_table = IrqAffinityTable().load()
+		try:
+			super(IrqPlugin, self)._instance_apply_static(instance)
+			log.debug("IRQ affinities (%s): %s" % (instance.name, self._irq_table.stats))
+		finally:
+			self._irq_table = None
 
 	def _instance_unapply_static(self, instance, rollback):
 		log.debug("Unapplying IRQ affinities (%s)" % instance.name)
-		super(IrqPlugin, self)._instance_unapply_static(instance, rollback)
+		self._irq_table = IrqAffinityTable().load()
+		try:
+			super(IrqPlugin, self)._instance_unapply_static(instance, rollback)
+		finally:
+			self._irq_table = None
 
 	def _instance_verify_static(self, instance, ignore_missing, devices):
 		log.debug("Verifying IRQ affinities (%s)" % instance.name)
-		return super(IrqPlugin, self)._instance_verify_static(instance, ignore_missing, devices)
+		self._irq_table = IrqAffinityTable().load()
+		try:
+			return super(IrqPlugin, self)._instance_verify_static(instance, ignore_missing, devices)
+		finally:
+			self._irq_table = None
 
 	#
 	# "low-level" methods to get/set irq affinities
 	#
-	def _get_irq_affinity(self, irq):
+	def _get_irq_table(self):
+		"""Get the IRQ affinity table
+
+		Returns:
+			table (IrqAffinityTable): the table shared by the current
+				apply/unapply/verify, otherwise a new table which reads
+				the affinities of the IRQs on demand
+		"""
+		if self._irq_table is not None:
+			return self._irq_table
+		return IrqAffinityTable()
+
+	def _get_irq_affinity(self, irq, irq_table):
 		"""Get current IRQ affinity from the kernel
 
 		Args:
 			irq (str): IRQ number (as string) or "DEFAULT"
+			irq_table (IrqAffinityTable): table to read the affinity from
 
 		Returns:
 			affinity (set): set of all CPUs that belong to the IRQ affinity mask,
 				if reading of the affinity fails, an empty set is returned
 		"""
-		try:
-			filename = "/proc/irq/default_smp_affinity" if irq == "DEFAULT" else "/proc/irq/%s/smp_affinity" % irq
-			with open(filename, "r") as f:
-				affinity_hex = f.readline().strip()
-			return set(self._cmd.hex2cpulist(affinity_hex))
-		except (OSError, IOError) as e:
-			log.debug("Failed to read SMP affinity of IRQ %s: %s" % (irq, e))
+		affinity = irq_table.get(irq)
+		if affinity is None:
 			return set()
+		return set(affinity)
 
-	def _set_irq_affinity(self, irq, affinity, restoring):
-		"""Set IRQ affinity in the kernel
+	def _set_irq_affinity(self, irq, affinity, restoring, irq_table):
+		"""Set IRQ affinity in the kernel, unless the IRQ already has it
 
 		Args:
 			irq (str): IRQ number (as string) or "DEFAULT"
 			affinity (set): affinity mask as set of CPUs
 			restoring (bool): are we rolling back a previous change?
+			irq_table (IrqAffinityTable): table to write the affinity to
 
 		Returns:
 			status (int):  0 on success, -2 if changing the affinity is not
 				supported, -1 if some other error occurs
 		"""
-		try:
-			affinity_hex = self._cmd.cpulist2hex(list(affinity))
-			log.debug("Setting SMP affinity of IRQ %s to '%s'" % (irq, affinity_hex))
-			filename = "/proc/irq/default_smp_affinity" if irq == "DEFAULT" else "/proc/irq/%s/smp_affinity" % irq
-			with open(filename, "w") as f:
-				f.write(affinity_hex)
-			return 0
-		except (OSError, IOError) as e:
-			# EIO is returned by
-			# kernel/irq/proc.c:write_irq_affinity() if changing
-			# the affinity is not supported
-			# (at least on kernels 3.10 and 4.18)
-			if hasattr(e, "errno") and e.errno == errno.EIO and not restoring:
-				log.debug("Setting SMP affinity of IRQ %s is not supported" % irq)
-				return -2
-			else:
-				log.error("Failed to set SMP affinity of IRQ %s to '%s': %s" % (irq, affinity_hex, e))
-				return -1
+		res = irq_table.set(irq, sorted(affinity), restoring)
+		if res == irq_affinity.UNCHANGEABLE:
+			return -2
+		if res == irq_affinity.FAILED:
+			return -1
+		return 0
 
 	#
 	# "high-level" methods: apply tuning while saving original affinities
@@ -189,13 +203,14 @@ class IrqPlugin(hotplug.Plugin):
 			irqinfo (IrqInfo): IRQ that should be tuned
 			affinity (set): desired affinity
 		"""
-		original = self._get_irq_affinity(irqinfo.irq)
+		irq_table = self._get_irq_table()
+		original = self._get_irq_affinity(irqinfo.irq, irq_table)
 		if mode == "intersect":
 			# intersection of affinity and original, if that is empty fall back to configured affinity
 			affinity = affinity & original or affinity
 		if irqinfo.unchangeable or affinity == original:
 			return
-		res = self._set_irq_affinity(irqinfo.irq, affinity, False)
+		res = self._set_irq_affinity(irqinfo.irq, affinity, False, irq_table)
 		if res == 0:
 			if irqinfo.original_affinity is None:
 				irqinfo.original_affinity = original
@@ -210,7 +225,8 @@ class IrqPlugin(hotplug.Plugin):
 		"""
 		if irqinfo.unchangeable or irqinfo.original_affinity is None:
 			return
-		self._set_irq_affinity(irqinfo.irq, irqinfo.original_affinity, True)
+		self._set_irq_affinity(irqinfo.irq, irqinfo.original_affinity, True,
+				self._get_irq_table())
 		irqinfo.original_affinity = None
 
 	def _verify_irq_affinity(self, irqinfo, affinity, mode):
@@ -228,7 +244,7 @@ class IrqPlugin(hotplug.Plugin):
 		affinity_description = "IRQ %s affinity" % irqinfo.irq
 		desired_affinity = affinity
 		desired_affinity_string = self._cmd.cpulist2string(self._cmd.cpulist_pack(list(desired_affinity)))
-		current_affinity = self._get_irq_affinity(irqinfo.irq)
+		current_affinity = self._get_irq_affinity(irqinfo.irq, self._get_irq_table())
 		current_affinity_string = self._cmd.cpulist2string(self._cmd.cpulist_pack(list(current_affinity)))
 		if mode == "intersect":
 			# In intersect mode, we don't use a strict comparison; it's sufficient
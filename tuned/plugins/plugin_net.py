@@ -2,8 +2,12 @@ import errno
 from . import hotplug
 from .decorators import *
 import tuned.logs
+import tuned.monitors
 from tuned.utils.nettool import ethcard
 from tuned.utils.commands import commands
+from tuned.utils.command_service import CommandService
+from tuned.utils.ethtool_ioctl import EthtoolIoctl
+from tuned.utils.rtnetlink import RtNetlink
 import os
 import re
 import pyudev
@@ -11,6 +15,8 @@ import pyudev
 log = tuned.logs.get()
 
 WOL_VALUES = "pumbagsd"
+# command service cache key of the rtnetlink dump of all the links
+RTNETLINK_LINKS = "rtnetlink-links"
 
 class NetTuningPlugin(hotplug.Plugin):
 	"""
@@ -161,13 +167,19 @@ class NetTuningPlugin(hotplug.Plugin):
 	====
 	"""
 
+	parallel_apply = True
+
 	def __init__(self, *args, **kwargs):
 		super(NetTuningPlugin, self).__init__(*args, **kwargs)
 		self._load_smallest = 0.05
 		self._level_steps = 6
 		self._cmd = commands()
+		self._cmd_service = CommandService(self._cmd)
+		self._ethtool = EthtoolIoctl()
 		self._re_ip_link_show = {}
 		self._use_ip = True
+		self._rtnetlink = RtNetlink()
+		self._use_rtnetlink = True
 		self.re_not_virtual = re.compile('(?!.*/virtual/.*)')
 		# pyudev >= 0.21 check
 		if hasattr(pyudev.Device, "properties"):
@@ -199,14 +211,21 @@ class NetTuningPlugin(hotplug.Plugin):
 	def _hardware_events_cleanup(self):
 		self._hardware_inventory.unsubscribe(self)
 
+	def cleanup(self):
+		super(NetTuningPlugin, self).cleanup()
+		self._cmd_service.shutdown()
+		self._ethtool.close()
+		self._rtnetlink.close()
+
 	def _hardware_events_callback(self, event, device):
 		if self._device_is_supported(device):
 			super(NetTuningPlugin, self)._hardware_events_callback(event, device)
 
-	def _added_device_apply_tuning(self, instance, device_name):
+	def _added_devices_apply_tuning(self, instance, device_names):
 		if instance._load_monitor is not None:
-			instance._load_monitor.add_device(device_name)
-		super(NetTuningPlugin, self)._added_device_apply_tuning(instance, device_name)
+			for device_name in device_names:
+				instance._load_monitor.add_device(device_name)
+		super(NetTuningPlugin, self)._added_devices_apply_tuning(instance, device_names)
 
 	def _removed_device_unapply_tuning(self, instance, device_name):
 		if instance._load_monitor is not None:
@@ -267,6 +286,27 @@ class NetTuningPlugin(hotplug.Plugin):
 				if i:
 					instance._ifmap_orig[i] = device
 
+	# ethtool queries of the contexts which are not handled by the ioctls
+	_ETHTOOL_QUERIES = { "coalesce": "-c", "features": "-k", "pause": "-a" }
+
+	def _prefetch_device_parameters(self, instance, devices):
+		queries = [opt for context, opt in self._ETHTOOL_QUERIES.items()
+				if instance.options.get(context, None) is not None]
+		self._cmd_service.prefetch([["ethtool", opt, instance._get_curr_device(device)]
+				for device in devices for opt in queries])
+
+	def _execute_all_device_commands(self, instance, devices):
+		# the ethtool queries of all the devices run concurrently and each
+		# of them at most once per apply
+		with self._cmd_service.cycle():
+			self._prefetch_device_parameters(instance, devices)
+			super(NetTuningPlugin, self)._execute_all_device_commands(instance, devices)
+
+	def _verify_all_device_commands(self, instance, devices, ignore_missing):
+		with self._cmd_service.cycle():
+			self._prefetch_device_parameters(instance, devices)
+			return super(NetTuningPlugin, self)._verify_all_device_commands(instance, devices, ignore_missing)
+
 	def _instance_cleanup(self, instance):
 		if instance._load_monitor is not None:
 			self._monitors_repository.delete(instance._load_monitor)
@@ -372,22 +412,19 @@ class NetTuningPlugin(hotplug.Plugin):
 
 	def _init_stats_and_idle(self, instance, device):
 		max_speed = self._calc_speed(ethcard(instance._get_curr_device(device)).get_max_speed())
-		instance._stats[device] = { "new": 4 * [0], "max": 2 * [max_speed, 1] }
+		history = tuned.monitors.LoadHistory(4, max_init = 2 * [max_speed, 1])
+		# start from zero counters
+		history.append(4 * [0])
+		instance._stats[device] = { "history": history }
 		instance._idle[device] = { "level": 0, "read": 0, "write": 0 }
 
 	def _update_stats(self, instance, device, new_load):
-		# put new to old
-		instance._stats[device]["old"] = old_load = instance._stats[device]["new"]
-		instance._stats[device]["new"] = new_load
+		history = instance._stats[device]["history"]
+		history.append(new_load)
 
-		# load difference
-		diff = [new_old[0] - new_old[1] for new_old in zip(new_load, old_load)]
-		instance._stats[device]["diff"] = diff
-
-		# adapt maximum expected load if the difference is higer
-		old_max_load = instance._stats[device]["max"]
-		max_load = [max(pair) for pair in zip(old_max_load, diff)]
-		instance._stats[device]["max"] = max_load
+		# load difference and maximum expected load (adapted if the difference is higher)
+		diff = history.delta()
+		max_load = history.max_delta()
 
 		# read/write ratio
 		instance._stats[device]["read"] =  float(diff[0]) / float(max_load[0])
@@ -481,6 +518,7 @@ class NetTuningPlugin(hotplug.Plugin):
 
 		if not sim:
 			self._cmd.execute(["ethtool", "-s", instance._get_curr_device(device), "wol", value])
+			self._cmd_service.invalidate(instance._get_curr_device(device))
 		return value
 
 	@command_get("wake_on_lan")
@@ -488,7 +526,7 @@ class NetTuningPlugin(hotplug.Plugin):
 		value = None
 		try:
 			m = re.match(r".*Wake-on:\s*([" + WOL_VALUES + "]+).*",
-				self._cmd.execute(["ethtool", instance._get_curr_device(device)])[1], re.S)
+				self._cmd_service.execute(["ethtool", instance._get_curr_device(device)], cache = True)[1], re.S)
 			if m:
 				value = m.group(1)
 		except IOError:
@@ -537,6 +575,54 @@ class NetTuningPlugin(hotplug.Plugin):
 			args.append(device)
 		return self._call_ip_link(args)
 
+	def _get_links(self):
+		"""
+		Return the attributes of all the links dumped by rtnetlink, the
+		dump is shared by all the devices within the apply cycle. Return
+		None if rtnetlink is not usable.
+		"""
+		if not self._use_rtnetlink:
+			return None
+		try:
+			return self._cmd_service.cached([RTNETLINK_LINKS], self._rtnetlink.dump_links)
+		except EnvironmentError as e:
+			log.debug("rtnetlink is not available, falling back to ip: %s" % e)
+			self._use_rtnetlink = False
+			return None
+
+	def _set_link(self, device, attr, value):
+		self._cmd_service.invalidate(RTNETLINK_LINKS)
+		if self._use_rtnetlink:
+			try:
+				self._rtnetlink.set_link(device, **{attr: value})
+				return True
+			except EnvironmentError as e:
+				log.debug("Cannot set %s of device '%s' by rtnetlink, falling back to ip: %s" % (attr, device, e))
+		# there is inconsistency in "ip", where "txqueuelen" is set as it, but is shown as "qlen"
+		return self._call_ip_link(["set", "dev", device, attr, value]) is not None
+
+	def _get_link_attr(self, device, attr, ip_attr, ignore_missing):
+		links = self._get_links()
+		if links is not None and device in links:
+			value = links[device].get(attr)
+			if value is None and not ignore_missing:
+				log.info("Cannot get %s value for device '%s'" % (attr, device))
+			return value
+		out = self._ip_link_show(device)
+		if out is None:
+			if not ignore_missing:
+				log.info("Cannot get 'ip link show' result for %s value for device '%s'" % \
+					(attr, device))
+			return None
+		res = self._get_re_ip_link_show(ip_attr).search(out)
+		if res is None:
+			# We can theoretically get device without qlen (http://linux-ip.net/gl/ip-cref/ip-cref-node17.html)
+			if not ignore_missing:
+				log.info("Cannot get %s value from 'ip link show' result for device '%s'" % \
+					(attr, device))
+			return None
+		return res.group(1)
+
 	@command_set("txqueuelen", per_device=True)
 	def _set_txqueuelen(self, value, device, instance, sim, remove):
 		if value is None:
@@ -547,9 +633,7 @@ class NetTuningPlugin(hotplug.Plugin):
 			log.warning("txqueuelen value '%s' is not integer" % value)
 			return None
 		if not sim:
-			# there is inconsistency in "ip", where "txqueuelen" is set as it, but is shown as "qlen"
-			res = self._call_ip_link(["set", "dev", instance._get_curr_device(device), "txqueuelen", value])
-			if res is None:
+			if not self._set_link(instance._get_curr_device(device), "txqueuelen", value):
 				log.warning("Cannot set txqueuelen for device '%s'" % instance._get_curr_device(device))
 				return None
 		return value
@@ -564,20 +648,8 @@ class NetTuningPlugin(hotplug.Plugin):
 
 	@command_get("txqueuelen")
 	def _get_txqueuelen(self, device, instance, ignore_missing=False):
-		out = self._ip_link_show(instance._get_curr_device(device))
-		if out is None:
-			if not ignore_missing:
-				log.info("Cannot get 'ip link show' result for txqueuelen value for device '%s'" % \
-					instance._get_curr_device(device))
-			return None
-		res = self._get_re_ip_link_show("qlen").search(out)
-		if res is None:
-			# We can theoretically get device without qlen (http://linux-ip.net/gl/ip-cref/ip-cref-node17.html)
-			if not ignore_missing:
-				log.info("Cannot get txqueuelen value from 'ip link show' result for device '%s'" % \
-					instance._get_curr_device(device))
-			return None
-		return res.group(1)
+		return self._get_link_attr(instance._get_curr_device(device),
+				"txqueuelen", "qlen", ignore_missing)
 
 	@command_set("mtu", per_device=True)
 	def _set_mtu(self, value, device, instance, sim, remove):
@@ -589,28 +661,15 @@ class NetTuningPlugin(hotplug.Plugin):
 			log.warning("mtu value '%s' is not integer" % value)
 			return None
 		if not sim:
-			res = self._call_ip_link(["set", "dev", instance._get_curr_device(device), "mtu", value])
-			if res is None:
+			if not self._set_link(instance._get_curr_device(device), "mtu", value):
 				log.warning("Cannot set mtu for device '%s'" % instance._get_curr_device(device))
 				return None
 		return value
 
 	@command_get("mtu")
 	def _get_mtu(self, device, instance, ignore_missing=False):
-		out = self._ip_link_show(instance._get_curr_device(device))
-		if out is None:
-			if not ignore_missing:
-				log.info("Cannot get 'ip link show' result for mtu value for device '%s'" % \
-					instance._get_curr_device(device))
-			return None
-		res = self._get_re_ip_link_show("mtu").search(out)
-		if res is None:
-			# mtu value should be always present, but it's better to have a test
-			if not ignore_missing:
-				log.info("Cannot get mtu value from 'ip link show' result for device '%s'" % \
-					instance._get_curr_device(device))
-			return None
-		return res.group(1)
+		return self._get_link_attr(instance._get_curr_device(device),
+				"mtu", "mtu", ignore_missing)
 
 	# d is dict: {parameter: value}
 	def _check_parameters(self, context, d):
@@ -698,11 +757,39 @@ class NetTuningPlugin(hotplug.Plugin):
 			))
 			parameters.pop(param, None)
 
-	def _get_device_parameters(self, instance, context, device):
+	def _ethtool_ioctl_get(self, context, device):
+		try:
+			if context == "ring":
+				return self._ethtool.get_ring(device)
+			if context == "channels":
+				return self._ethtool.get_channels(device)
+		except (EnvironmentError, ValueError) as e:
+			log.debug("ethtool ioctl failed on device '%s', falling back to ethtool: %s" % (device, e))
+		return None
+
+	def _ethtool_ioctl_set(self, context, device, params):
+		try:
+			if context == "ring":
+				self._ethtool.set_ring(device, params)
+				return True
+			if context == "channels":
+				self._ethtool.set_channels(device, params)
+				return True
+		except (EnvironmentError, ValueError) as e:
+			log.debug("ethtool ioctl failed on device '%s', falling back to ethtool: %s" % (device, e))
+		return False
+
+	def _get_device_parameters(self, instance, context, device, names = None):
+		dev = instance._get_curr_device(device)
+		d = self._ethtool_ioctl_get(context, dev)
+		# the ioctl knows only the basic parameters, ethtool is needed
+		# for the others (e.g. rx-buf-len, tx-push)
+		if d is not None and set(names or []).issubset(d):
+			return d
 		context2opt = { "coalesce": "-c", "features": "-k", "pause": "-a", "ring": "-g", \
 				"channels": "-l"}
 		opt = context2opt[context]
-		ret, value = self._cmd.execute(["ethtool", opt, instance._get_curr_device(device)])
+		ret, value = self._cmd_service.execute(["ethtool", opt, dev], cache = True)
 		if ret != 0 or len(value) == 0:
 			return None
 		context2parser = { "coalesce": self._parse_device_parameters, \
@@ -735,9 +822,12 @@ class NetTuningPlugin(hotplug.Plugin):
 			context2opt = { "coalesce": "-C", "features": "-K", "pause": "-A", "ring": "-G", \
                                 "channels": "-L"}
 			opt = context2opt[context]
-			# ignore ethtool return code 80, it means parameter is already set
-			self._cmd.execute(["ethtool", opt, instance._get_curr_device(device)] + \
-				self._cmd.dict2list(d), no_errors = [80])
+			dev = instance._get_curr_device(device)
+			if not self._ethtool_ioctl_set(context, dev, d):
+				# ignore ethtool return code 80, it means parameter is already set
+				self._cmd.execute(["ethtool", opt, dev] + \
+					self._cmd.dict2list(d), no_errors = [80])
+			self._cmd_service.invalidate(dev)
 		return d
 
 	def _custom_parameters(self, context, start, value, device, verify, instance):
@@ -745,7 +835,11 @@ class NetTuningPlugin(hotplug.Plugin):
 				command_name = context,
 				device_name = device)
 		if start:
-			params_current = self._get_device_parameters(instance, context, device)
+			params_requested = None
+			if value:
+				params_requested = self._parse_config_parameters(value, context)
+			params_current = self._get_device_parameters(instance, context,
+					device, names = params_requested)
 			if params_current is None or len(params_current) == 0:
 				return False
 			params_set = self._set_device_parameters(instance, context,
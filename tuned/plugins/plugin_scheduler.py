@@ -18,6 +18,11 @@ import select
 import tuned.consts as consts
 import procfs
 from tuned.utils.commands import commands
+from tuned.utils.process_snapshot import ProcessSnapshot
+from tuned.utils.rule_matcher import RuleMatcher
+from tuned.utils.cgroup2_cpuset import CgroupV2Cpuset
+from tuned.utils.cpu_set import CpuSet
+from tuned.utils.irq_affinity import IrqAffinityTable, DEFAULT_IRQ
 import errno
 import os
 import collections
@@ -229,7 +234,10 @@ class SchedulerPlugin(base.Plugin):
 	rule. Rules are sorted based on priority. This is needed for
 	inheritence to be able to reorder previously defined rules. Equal
 	`__rule_prio__` rules should be processed in the order they were
-	defined. However, this is Python interpreter dependant. To disable
+	defined. However, this is Python interpreter dependant. If more
+	rules match a process, the rule with the highest `__rule_prio__`
+	wins, both for the processes running when the profile is applied
+	and for the processes created later (with `runtime=1`). To disable
 	an inherited rule for `__groupname__` use:
 
 	[subs="quotes"]
@@ -406,6 +414,30 @@ class SchedulerPlugin(base.Plugin):
 	with hierarchy-ID 8 and controller-list blkio.
 	====
 
+	On systems with the cgroups v2 unified hierarchy, the
+	[option]`cgroup_v2_cpuset` option set to `1` makes the
+	[option]`isolated_cores` option confine the tasks by cpusets instead
+	of changing the affinity of every task. The housekeeping CPUs are
+	written to the `cpuset.cpus` of every top level cgroup under
+	[option]`cgroup_v2_mount_point` (`/sys/fs/cgroup` by default) and
+	the `cpuset` controller is enabled for them if needed. Only the
+	tasks of the root cgroup, e.g. the kernel threads, have their
+	affinity set one by one. The original cpusets are restored when the
+	profile is unapplied. The option is ignored if the
+	[option]`cgroup_for_isolated_cores` option is set, and the affinity
+	of all the tasks is set one by one if the [option]`ps_whitelist`,
+	[option]`ps_blacklist` or [option]`cgroup_ps_blacklist` option is
+	set, because the cpusets apply to all the tasks of the cgroups.
+
+	.Isolating CPUs using cgroups v2 cpusets
+	====
+	----
+	[scheduler]
+	isolated_cores=2-3
+	cgroup_v2_cpuset=1
+	----
+	====
+
 	Kernels 5.13 and newer moved some `sched_` and `numa_balancing_` kernel run-time
 	parameters from `/proc/sys/kernel`, managed by the `sysctl` utility, to
 	`debugfs`, typically mounted under `/sys/kernel/debug`.  TuneD provides an
@@ -471,6 +503,8 @@ class SchedulerPlugin(base.Plugin):
 		self._kthread_process = True
 		self._cgroup_ps_blacklist_re = ""
 		self._perf_available = True
+		# process snapshot shared by the process table scans of one apply
+		self._ps_snapshot = None
 
 		try:
 			self._cpus = perf.cpu_map()
@@ -485,6 +519,8 @@ class SchedulerPlugin(base.Plugin):
 		self._irq_process = True
 		self._irq_storage_key = self._storage_key(
 				command_name = "irq")
+		self._cgroup_v2_storage_key = self._storage_key(
+				command_name = "cgroup_v2")
 		self._evlist = None
 		try:
 			self._scheduler_utils = SchedulerUtils()
@@ -524,6 +560,15 @@ class SchedulerPlugin(base.Plugin):
 
 		self._cgroups_original_affinity = dict()
 
+		self._cgroup_v2 = CgroupV2Cpuset(self._variables.expand(
+			instance.options["cgroup_v2_mount_point"]))
+		self._cgroup_v2_cpuset = self._cmd.get_bool(self._variables.expand(
+			instance.options["cgroup_v2_cpuset"])) == "1"
+		cgroup_v2_original = self._storage.get(self._cgroup_v2_storage_key)
+		if cgroup_v2_original is not None:
+			log.info("recovering cgroup v2 cpusets from previous run")
+			self._cgroup_v2_restore_affinity()
+
 		# calculated by isolated_cores setter
 		self._affinity = None
 
@@ -582,6 +627,8 @@ class SchedulerPlugin(base.Plugin):
 			"cgroup_groups_init": True,
 			"cgroup_for_isolated_cores": None,
 			"cgroup_ps_blacklist": None,
+			"cgroup_v2_cpuset": False,
+			"cgroup_v2_mount_point": consts.DEF_CGROUP_V2_MOUNT_POINT,
 			"ps_whitelist": None,
 			"ps_blacklist": None,
 			"kthread_process": True,
@@ -605,38 +652,30 @@ class SchedulerPlugin(base.Plugin):
 	def _sanitize_cgroup_path(self, value):
 		return str(value).replace(".", "/") if value is not None else None
 
+	# The cmdline has the same format as in the process snapshot, it is
+	# compared with the cmdline stored in the rollback database.
 	# Raises OSError, IOError
 	def _get_cmdline(self, process):
-		if not isinstance(process, procfs.process):
-			pid = process
-			process = procfs.process(pid)
-		cmdline = procfs.process_cmdline(process)
-		if self._is_kthread(process):
-			cmdline = "[" + cmdline + "]"
-		return cmdline
+		if isinstance(process, procfs.process):
+			process = process.pid
+		return ProcessSnapshot().cmdline(process)
+
+	# The snapshot is shared by all the process table scans of one
+	# apply, otherwise a new snapshot is taken for every scan.
+	def _get_process_snapshot(self):
+		if self._ps_snapshot is not None:
+			return self._ps_snapshot
+		return ProcessSnapshot()
 
 	# Raises OSError, IOError
 	def get_processes(self):
-		ps = procfs.pidstats()
-		ps.reload_threads()
 		processes = {}
-		for proc in ps.values():
-			try:
-				if not self._kthread_process and self._is_kthread(proc):
-					continue
-				cmd = self._get_cmdline(proc)
-				pid = proc["pid"]
-				processes[pid] = cmd
-				if "threads" in proc:
-					for pid in proc["threads"].keys():
-						cmd = self._get_cmdline(proc)
-						processes[pid] = cmd
-			except (OSError, IOError) as e:
-				if e.errno == errno.ENOENT \
-						or e.errno == errno.ESRCH:
-					continue
-				else:
-					raise
+		for proc in self._get_process_snapshot().processes:
+			if not self._kthread_process and proc.kthread:
+				continue
+			processes[proc.pid] = proc.cmdline
+			for thread in proc.threads:
+				processes[thread.tid] = proc.cmdline
 		return processes
 
 	# Raises OSError
@@ -685,7 +724,11 @@ class SchedulerPlugin(base.Plugin):
 	def _process_in_blacklisted_cgroup(self, process):
 		if self._cgroup_ps_blacklist_re == "":
 			return False
-		return re.search(self._cgroup_ps_blacklist_re, self._get_stat_cgroup(process)) is not None
+		return self._cgroup_blacklisted(self._get_stat_cgroup(process))
+
+	def _cgroup_blacklisted(self, cgroup):
+		return self._cgroup_ps_blacklist_re != "" \
+				and re.search(self._cgroup_ps_blacklist_re, cgroup) is not None
 
 	# Returns True if we can ignore a failed affinity change of
 	# a process with the given PID and therefore not report it as an error.
@@ -797,7 +840,8 @@ class SchedulerPlugin(base.Plugin):
 		is_cgroup = not isinstance(cgroup, list) and len(cgroup) > 0
 		return is_cgroup, cgroup
 
-	def _tune_process_affinity(self, pid, affinity, intersect = False):
+	# cgroup is the cgroup of the task from the process snapshot
+	def _tune_process_affinity(self, pid, affinity, intersect = False, cgroup = None):
 		cont = True
 		if affinity is None:
 			return cont
@@ -812,7 +856,7 @@ class SchedulerPlugin(base.Plugin):
 					affinity = self._get_intersect_affinity(
 							prev_affinity, affinity,
 							affinity)
-				self._set_affinity(pid, affinity)
+				self._set_affinity(pid, affinity, cgroup)
 			self._store_orig_process_affinity(pid,
 					prev_affinity, is_cgroup)
 		except (SystemError, OSError) as e:
@@ -954,6 +998,40 @@ class SchedulerPlugin(base.Plugin):
 		for cg in self._cgroups_original_affinity.items():
 			self._cgroup_set_affinity_one(cg[0], cg[1])
 
+	# Confine the top level cgroups of the cgroups v2 hierarchy to the
+	# affinity. Returns the PIDs of the root cgroup which have to be tuned
+	# one by one or None if all the tasks have to be tuned one by one.
+	def _cgroup_v2_set_affinity(self, affinity):
+		if self._ps_whitelist != ".*" or self._ps_blacklist != "" \
+				or self._cgroup_ps_blacklist_re != "":
+			log.warning("'cgroup_v2_cpuset' cannot be combined with 'ps_whitelist', 'ps_blacklist' " \
+				"or 'cgroup_ps_blacklist', setting the affinity of the tasks one by one")
+			return None
+		if not self._cgroup_v2.available():
+			log.warning("cpuset controller of cgroups v2 is not available, setting the affinity " \
+				"of the tasks one by one")
+			return None
+		pids = self._cgroup_v2.root_pids()
+		if pids is None:
+			return None
+		original = self._cgroup_v2.backup()
+		if original is None:
+			return None
+		# stored before any change, so a crash in the middle can be rolled back
+		self._storage.set(self._cgroup_v2_storage_key, original)
+		if not self._cgroup_v2.apply(original, self._cmd.cpulist2string(affinity)):
+			self._storage.unset(self._cgroup_v2_storage_key)
+			return None
+		return pids
+
+	def _cgroup_v2_restore_affinity(self):
+		original = self._storage.get(self._cgroup_v2_storage_key)
+		if original is None:
+			return
+		log.debug("Restoring cgroup v2 cpusets")
+		self._cgroup_v2.restore(original)
+		self._storage.unset(self._cgroup_v2_storage_key)
+
 	def _instance_apply_static(self, instance):
 		# need to get "cgroup_mount_point_init", "cgroup_mount_point", "cgroup_groups_init",
 		# "cgroup", and initialize mount point and cgroups before super class implementation call
@@ -970,44 +1048,44 @@ class SchedulerPlugin(base.Plugin):
 		if self._cgroup_groups_init or self._cgroup_mount_point_init:
 			self._cgroup_initialize_groups()
 
-		super(SchedulerPlugin, self)._instance_apply_static(instance)
-
-		self._cgroup_set_affinity()
+		# isolated_cores and the group rules share one process table scan
+		self._ps_snapshot = ProcessSnapshot()
 		try:
-			ps = self.get_processes()
-		except (OSError, IOError) as e:
-			log.error("error applying tuning, cannot get information about running processes: %s"
-					% e)
-			return
+			super(SchedulerPlugin, self)._instance_apply_static(instance)
+
+			self._cgroup_set_affinity()
+			try:
+				ps = self.get_processes()
+			except (OSError, IOError) as e:
+				log.error("error applying tuning, cannot get information about running processes: %s"
+						% e)
+				return
+		finally:
+			self._ps_snapshot = None
 		sched_cfg = [(option, str(value).split(":", 4)) for option, value in instance._scheduler.items()]
 		buf = [(option, self._convert_sched_cfg(vals))
 				for option, vals in sched_cfg
 				if re.match(r"group\.", option)
 				and len(vals) == 5]
 		sched_cfg = sorted(buf, key=lambda option_vals: option_vals[1][0])
-		sched_all = dict()
-		# for runtime tuning
-		instance._sched_lookup = {}
+		rules = []
 		for option, (rule_prio, scheduler, priority, affinity, regex) \
 				in sched_cfg:
 			try:
-				r = re.compile(regex)
+				re.compile(regex)
 			except re.error as e:
 				log.error("error compiling regular expression: '%s'" % str(regex))
 				continue
-			processes = [(pid, cmd) for pid, cmd in ps.items() if re.search(r, cmd) is not None]
-			#cmd - process name, option - group name
-			sched = dict([(pid, (cmd, option, scheduler, priority, affinity, regex))
-					for pid, cmd in processes])
-			sched_all.update(sched)
-			# make any contained regexes non-capturing: replace "(" with "(?:",
-			# unless the "(" is preceded by "\" or followed by "?"
-			regex = re.sub(r"(?<!\\)\((?!\?)", "(?:", str(regex))
-			instance._sched_lookup[regex] = [scheduler, priority, affinity]
-		for pid, (cmd, option, scheduler, priority, affinity, regex) \
-				in sched_all.items():
-			self._tune_process(pid, cmd, scheduler,
-					priority, affinity)
+			rules.append((regex, (scheduler, priority, affinity)))
+		# the rule with the highest rule priority wins, the matcher is
+		# used for runtime tuning too
+		instance._sched_rules = RuleMatcher(rules)
+		for pid, cmd in ps.items():
+			v = instance._sched_rules.match(cmd)
+			if v is not None:
+				(scheduler, priority, affinity) = v
+				self._tune_process(pid, cmd, scheduler,
+						priority, affinity)
 		self._storage.set(self._scheduler_storage_key,
 				self._scheduler_original)
 		if self._daemon and instance._runtime_tuning:
@@ -1061,6 +1139,7 @@ class SchedulerPlugin(base.Plugin):
 			instance._terminate.set()
 			instance._thread.join()
 		self._restore_ps_affinity()
+		self._cgroup_v2_restore_affinity()
 		self._cgroup_restore_affinity()
 		self._cgroup_cleanup_tasks()
 		if self._cgroup_groups_init or self._cgroup_mount_point_init:
@@ -1101,11 +1180,12 @@ class SchedulerPlugin(base.Plugin):
 		ret2 = self._cgroup_verify_affinity()
 		return ret1 and ret2
 
-	def _add_pid(self, instance, pid, r):
+	def _add_pid(self, instance, pid):
+		"""Tune the new process, return True if the rollback database changed."""
 		try:
 			proc = procfs.process(pid)
 			if not self._kthread_process and self._is_kthread(proc):
-				return
+				return False
 			cmd = self._get_cmdline(pid)
 		except (OSError, IOError) as e:
 			if e.errno == errno.ENOENT \
@@ -1115,25 +1195,77 @@ class SchedulerPlugin(base.Plugin):
 			else:
 				log.error("Failed to get cmdline of PID %d: %s"
 						% (pid, e))
-			return
-		v = self._cmd.re_lookup(instance._sched_lookup, cmd, r)
+			return False
+		v = instance._sched_rules.match(cmd)
 		if v is not None and not pid in self._scheduler_original:
 			log.debug("tuning new process '%s' with PID '%d' by '%s'" % (cmd, pid, str(v)))
 			(sched, prio, affinity) = v
 			self._tune_process(pid, cmd, sched, prio,
 					affinity)
-			self._storage.set(self._scheduler_storage_key,
-					self._scheduler_original)
+			return True
+		return False
 
 	def _remove_pid(self, instance, pid):
+		"""Forget the exited process, return True if the rollback database changed."""
 		if pid in self._scheduler_original:
 			del self._scheduler_original[pid]
 			log.debug("removed PID %d from the rollback database" % pid)
-			self._storage.set(self._scheduler_storage_key,
+			return True
+		return False
+
+	def _drain_events(self, instance):
+		"""
+		Read the pending perf events of all CPUs (at most
+		SCHED_EVENTS_BATCH_SIZE of them).
+
+		Return:
+		OrderedDict -- {tid: (exited, alive)}, exited is True if the task
+		exited in the batch, alive is True if its last event is a fork or
+		exec, e.g. the exit cancels the preceding exec and the fork after
+		the exit means a reused tid
+		"""
+		tasks = collections.OrderedDict()
+		count = 0
+		read_events = True
+		while read_events and count < consts.SCHED_EVENTS_BATCH_SIZE:
+			read_events = False
+			for cpu in self._cpus:
+				event = instance._evlist.read_on_cpu(cpu)
+				if not event:
+					continue
+				read_events = True
+				count += 1
+				if isinstance(event, perf.comm_event) or (
+					self._perf_process_fork_value
+					and isinstance(event, perf.task_event)
+					and event.type == perf.RECORD_FORK
+				):
+					alive = True
+				elif isinstance(event, perf.task_event) and event.type == perf.RECORD_EXIT:
+					alive = False
+				else:
+					continue
+				tid = int(event.tid)
+				exited, _ = tasks.pop(tid, (False, False))
+				tasks[tid] = (exited or not alive, alive)
+		return tasks
+
+	def _process_tasks(self, instance, tasks):
+		changed = False
+		for tid, (exited, alive) in tasks.items():
+			# the original parameters of the exited task must be
+			# dropped before the task with the reused tid is added
+			if exited:
+				changed = self._remove_pid(instance, tid) or changed
+			if alive:
+				changed = self._add_pid(instance, tid) or changed
+		if changed:
+			# the rollback database changes with every process, it is
+			# persisted in batches
+			self._storage.set_deferred(self._scheduler_storage_key,
 					self._scheduler_original)
 
 	def _thread_code(self, instance):
-		r = self._cmd.re_lookup_compile(instance._sched_lookup)
 		poll = select.poll()
 		# Store the file objects in a local variable so that they don't
 		# go out of scope too soon. This is a workaround for
@@ -1144,21 +1276,10 @@ class SchedulerPlugin(base.Plugin):
 		while not instance._terminate.is_set():
 			# timeout to poll in milliseconds
 			if len(poll.poll(self._sleep_interval * 1000)) > 0 and not instance._terminate.is_set():
-				read_events = True
-				while read_events:
-					read_events = False
-					for cpu in self._cpus:
-						event = instance._evlist.read_on_cpu(cpu)
-						if event:
-							read_events = True
-							if isinstance(event, perf.comm_event) or (
-								self._perf_process_fork_value
-								and isinstance(event, perf.task_event)
-								and event.type == perf.RECORD_FORK
-							):
-								self._add_pid(instance, int(event.tid), r)
-							elif isinstance(event, perf.task_event) and event.type == perf.RECORD_EXIT:
-								self._remove_pid(instance, int(event.tid))
+				tasks = self._drain_events(instance)
+				while tasks and not instance._terminate.is_set():
+					self._process_tasks(instance, tasks)
+					tasks = self._drain_events(instance)
 
 	@command_custom("cgroup_ps_blacklist", per_device = False)
 	def _cgroup_ps_blacklist(self, enabling, value, verify, ignore_missing, instance):
@@ -1228,9 +1349,15 @@ class SchedulerPlugin(base.Plugin):
 		log.debug("Read affinity '%s' of PID %d" % (res, pid))
 		return res
 
-	def _set_affinity(self, pid, affinity):
+	# if the cgroup of the task is not known from the process snapshot,
+	# it is read from /proc
+	def _set_affinity(self, pid, affinity, cgroup = None):
 		process = procfs.process(pid)
-		if self._process_in_blacklisted_cgroup(process):
+		if cgroup is not None:
+			blacklisted = self._cgroup_blacklisted(cgroup)
+		else:
+			blacklisted = self._process_in_blacklisted_cgroup(process)
+		if blacklisted:
 			log.debug("Not setting CPU affinity of PID %d, the task belongs to a blacklisted cgroup." % pid)
 			return
 		log.debug("Setting CPU affinity of PID %d to '%s'." % (pid, affinity))
@@ -1250,38 +1377,26 @@ class SchedulerPlugin(base.Plugin):
 			return list(aff)
 		return affinity3
 
+	# objs are ProcessInfo objects of the process snapshot
 	def _set_all_obj_affinity(self, objs, affinity, threads = False):
 		psl = objs
 		if not self._kthread_process:
-			psl = [v for v in psl if not self._is_kthread(v)]
+			psl = [v for v in psl if not v.kthread]
 		psl = [v for v in psl if re.search(self._ps_whitelist,
-				self._get_stat_comm(v)) is not None]
+				v.comm) is not None]
 		if self._ps_blacklist != "":
 			psl = [v for v in psl if re.search(self._ps_blacklist,
-					self._get_stat_comm(v)) is None]
-		psd = dict([(v.pid, v) for v in psl])
-		for pid in psd:
-			try:
-				cmd = self._get_cmdline(psd[pid])
-			except (OSError, IOError) as e:
-				if e.errno == errno.ENOENT \
-						or e.errno == errno.ESRCH:
-					log.debug("Failed to get cmdline of PID %d, the task vanished."
-							% pid)
-				else:
-					log.error("Refusing to set affinity of PID %d, failed to get its cmdline: %s"
-							% (pid, e))
-				continue
-			cont = self._tune_process_affinity(pid, affinity,
-					intersect = True)
+					v.comm) is None]
+		for task in psl:
+			cont = self._tune_process_affinity(task.tid, affinity,
+					intersect = True, cgroup = task.cgroup)
 			if not cont:
 				continue
-			if pid in self._scheduler_original:
-				self._scheduler_original[pid].cmdline = cmd
+			if task.tid in self._scheduler_original:
+				self._scheduler_original[task.tid].cmdline = task.cmdline
 			# process threads
-			if not threads and "threads" in psd[pid]:
-				self._set_all_obj_affinity(
-						psd[pid]["threads"].values(),
+			if not threads and task.threads:
+				self._set_all_obj_affinity(task.threads,
 						affinity, True)
 
 	def _get_stat_cgroup(self, o):
@@ -1290,98 +1405,56 @@ class SchedulerPlugin(base.Plugin):
 		except (OSError, IOError, KeyError):
 			return ""
 
-	def _get_stat_comm(self, o):
-		try:
-			return o["stat"]["comm"]
-		except (OSError, IOError, KeyError):
-			return ""
-
-	def _set_ps_affinity(self, affinity):
+	# pids limits the tuning to the given processes and their threads
+	def _set_ps_affinity(self, affinity, pids = None):
 		try:
-			ps = procfs.pidstats()
-			ps.reload_threads()
-			self._set_all_obj_affinity(ps.values(), affinity, False)
+			ps = self._get_process_snapshot().processes
+			if pids is not None:
+				ps = [p for p in ps if p.pid in pids]
+			self._set_all_obj_affinity(ps, affinity, False)
 		except (OSError, IOError) as e:
 			log.error("error applying tuning, cannot get information about running processes: %s"
 					% e)
 
-	# Returns 0 on success, -2 if changing the affinity is not
-	# supported, -1 if some other error occurs.
-	def _set_irq_affinity(self, irq, affinity, restoring):
-		try:
-			affinity_hex = self._cmd.cpulist2hex(affinity)
-			log.debug("Setting SMP affinity of IRQ %s to '%s'"
-					% (irq, affinity_hex))
-			filename = "/proc/irq/%s/smp_affinity" % irq
-			with open(filename, "w") as f:
-				f.write(affinity_hex)
-			return 0
-		except (OSError, IOError) as e:
-			# EIO is returned by
-			# kernel/irq/proc.c:write_irq_affinity() if changing
-			# the affinity is not supported
-			# (at least on kernels 3.10 and 4.18)
-			if hasattr(e, "errno") and e.errno == errno.EIO \
-					and not restoring:
-				log.debug("Setting SMP affinity of IRQ %s is not supported"
-						% irq)
-				return -2
-			else:
-				log.error("Failed to set SMP affinity of IRQ %s to '%s': %s"
-						% (irq, affinity_hex, e))
-				return -1
-
-	def _set_default_irq_affinity(self, affinity):
-		try:
-			affinity_hex = self._cmd.cpulist2hex(affinity)
-			log.debug("Setting default SMP IRQ affinity to '%s'"
-					% affinity_hex)
-			with open("/proc/irq/default_smp_affinity", "w") as f:
-				f.write(affinity_hex)
-		except (OSError, IOError) as e:
-			log.error("Failed to set default SMP IRQ affinity to '%s': %s"
-					% (affinity_hex, e))
-
 	def _set_all_irq_affinity(self, affinity):
 		irq_original = IRQAffinities()
-		irqs = procfs.interrupts()
-		for irq in irqs.keys():
-			try:
-				prev_affinity = irqs[irq]["affinity"]
-				log.debug("Read affinity of IRQ '%s': '%s'"
-						% (irq, prev_affinity))
-			except KeyError:
-				continue
-			_affinity = self._get_intersect_affinity(prev_affinity, affinity, affinity)
-			if set(_affinity) == set(prev_affinity):
-				continue
-			res = self._set_irq_affinity(irq, _affinity, False)
-			if res == 0:
-				irq_original.irqs[irq] = prev_affinity
-			elif res == -2:
-				irq_original.unchangeable.append(irq)
+		irq_table = IrqAffinityTable().load()
+		cpus = self._cmd.cpuset(affinity)
+		prev_affinities = {}
+		targets = collections.OrderedDict()
+		for irq in irq_table.irqs():
+			prev_affinity = irq_table.get(irq)
+			prev_affinities[irq] = prev_affinity
+			targets[irq] = prev_affinity & cpus or cpus
+		stats = irq_table.apply(targets)
+		for irq in stats.changed:
+			irq_original.irqs[irq] = list(prev_affinities[irq])
+		irq_original.unchangeable.extend(stats.unchangeable)
+		log.debug("IRQ affinities: %s" % stats)
 
 		# default affinity
-		prev_affinity_hex = self._cmd.read_file("/proc/irq/default_smp_affinity")
-		prev_affinity = self._cmd.hex2cpulist(prev_affinity_hex)
+		prev_affinity = irq_table.get(DEFAULT_IRQ)
+		if prev_affinity is None:
+			prev_affinity = CpuSet()
 		if self._default_irq_smp_affinity_value == "calc":
-			_affinity = self._get_intersect_affinity(prev_affinity, affinity, affinity)
+			_affinity = prev_affinity & cpus or cpus
 		elif self._default_irq_smp_affinity_value != "ignore":
 			_affinity = self._default_irq_smp_affinity_value
 		if self._default_irq_smp_affinity_value != "ignore":
-			self._set_default_irq_affinity(_affinity)
-			irq_original.default = prev_affinity
+			irq_table.set(DEFAULT_IRQ, _affinity)
+			irq_original.default = list(prev_affinity)
 		self._storage.set(self._irq_storage_key, irq_original)
 
 	def _restore_all_irq_affinity(self):
 		irq_original = self._storage.get(self._irq_storage_key, None)
 		if irq_original is None:
 			return
-		for irq, affinity in irq_original.irqs.items():
-			self._set_irq_affinity(irq, affinity, True)
-		if self._default_irq_smp_affinity_value != "ignore":
-			affinity = irq_original.default
-			self._set_default_irq_affinity(affinity)
+		irq_table = IrqAffinityTable().load()
+		stats = irq_table.apply(irq_original.irqs, restoring = True)
+		log.debug("Restored IRQ affinities: %s" % stats)
+		if self._default_irq_smp_affinity_value != "ignore" \
+				and irq_original.default is not None:
+			irq_table.set(DEFAULT_IRQ, irq_original.default, restoring = True)
 		self._storage.unset(self._irq_storage_key)
 
 	def _verify_irq_affinity(self, irq_description, correct_affinity,
@@ -1398,29 +1471,24 @@ class SchedulerPlugin(base.Plugin):
 
 	def _verify_all_irq_affinity(self, correct_affinity, ignore_missing):
 		irq_original = self._storage.get(self._irq_storage_key, None)
-		irqs = procfs.interrupts()
+		unchangeable = set(irq_original.unchangeable) if irq_original is not None else set()
+		irq_table = IrqAffinityTable().load()
 		res = True
-		for irq in irqs.keys():
-			if irq in irq_original.unchangeable and ignore_missing:
+		for irq in irq_table.irqs():
+			if irq in unchangeable and ignore_missing:
 				description = "IRQ %s does not support changing SMP affinity" % irq
 				log.info(consts.STR_VERIFY_PROFILE_VALUE_MISSING % description)
 				continue
-			try:
-				current_affinity = irqs[irq]["affinity"]
-				log.debug("Read SMP affinity of IRQ '%s': '%s'"
-						% (irq, current_affinity))
-				irq_description = "SMP affinity of IRQ %s" % irq
-				if not self._verify_irq_affinity(
-						irq_description,
-						correct_affinity,
-						current_affinity):
-					res = False
-			except KeyError:
-				continue
-
-		current_affinity_hex = self._cmd.read_file(
-				"/proc/irq/default_smp_affinity")
-		current_affinity = self._cmd.hex2cpulist(current_affinity_hex)
+			current_affinity = list(irq_table.get(irq))
+			irq_description = "SMP affinity of IRQ %s" % irq
+			if not self._verify_irq_affinity(
+					irq_description,
+					correct_affinity,
+					current_affinity):
+				res = False
+
+		current_affinity = irq_table.get(DEFAULT_IRQ)
+		current_affinity = list(current_affinity) if current_affinity is not None else []
 		if self._default_irq_smp_affinity_value != "ignore" and not self._verify_irq_affinity("default IRQ SMP affinity",
 				current_affinity, correct_affinity if self._default_irq_smp_affinity_value == "calc" else
 				self._default_irq_smp_affinity_value):
@@ -1449,12 +1517,15 @@ class SchedulerPlugin(base.Plugin):
 				return self._verify_all_irq_affinity(affinity, ignore_missing)
 			return True
 		elif enabling:
+			pids = None
 			if self._cgroup:
 				self._cgroup_set_affinity()
 				ps_affinity = "cgroup.%s" % self._cgroup
 			else:
 				ps_affinity = affinity
-			self._set_ps_affinity(ps_affinity)
+				if self._cgroup_v2_cpuset:
+					pids = self._cgroup_v2_set_affinity(affinity)
+			self._set_ps_affinity(ps_affinity, pids)
 			if self._irq_process:
 				self._set_all_irq_affinity(affinity)
 		else:
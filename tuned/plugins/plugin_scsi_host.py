@@ -29,6 +29,8 @@ class SCSIHostPlugin(hotplug.Plugin):
 	====
 	"""
 
+	parallel_apply = True
+
 	def __init__(self, *args, **kwargs):
 		super(SCSIHostPlugin, self).__init__(*args, **kwargs)
 
@@ -61,8 +63,8 @@ class SCSIHostPlugin(hotplug.Plugin):
 		if self._device_is_supported(device):
 			super(SCSIHostPlugin, self)._hardware_events_callback(event, device)
 
-	def _added_device_apply_tuning(self, instance, device_name):
-		super(SCSIHostPlugin, self)._added_device_apply_tuning(instance, device_name)
+	def _added_devices_apply_tuning(self, instance, device_names):
+		super(SCSIHostPlugin, self)._added_devices_apply_tuning(instance, device_names)
 
 	def _removed_device_unapply_tuning(self, instance, device_name):
 		super(SCSIHostPlugin, self)._removed_device_unapply_tuning(instance, device_name)
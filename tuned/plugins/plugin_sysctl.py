@@ -100,6 +100,39 @@ class SysctlPlugin(base.Plugin):
 		for option, value in list(instance._sysctl_original.items()):
 			self._write_sysctl(option, value)
 
+	def _instance_retune_static(self, instance, options, changed):
+		for option in changed:
+			original_value = instance._sysctl_original.pop(option, None)
+			restore = original_value is not None
+			if not restore:
+				original_value = self._read_sysctl(option)
+			new_value = None
+			value = options.get(option, None)
+			if value is not None:
+				if original_value is None:
+					log.error("sysctl option %s will not be set, failed to read the original value."
+							% option)
+				else:
+					new_value = self._variables.expand(
+							self._cmd.unquote(value))
+					new_value = self._process_assignment_modifiers(
+							new_value, original_value)
+			if new_value is not None:
+				instance._sysctl_original[option] = original_value
+				self._write_sysctl(option, new_value)
+			elif restore:
+				self._write_sysctl(option, original_value)
+		instance.options = options
+		instance._sysctl = options
+
+		storage_key = self._storage_key(instance.name)
+		self._storage.set(storage_key, instance._sysctl_original)
+
+		if self._global_cfg.get_bool(consts.CFG_REAPPLY_SYSCTL, consts.CFG_DEF_REAPPLY_SYSCTL):
+			log.info("reapplying system sysctl")
+			self._apply_system_sysctl(instance._sysctl)
+		return True
+
 	def _apply_system_sysctl(self, instance_sysctl):
 		files = {}
 		for d in SYSCTL_CONFIG_DIRS:
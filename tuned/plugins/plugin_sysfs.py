@@ -74,6 +74,35 @@ class SysfsPlugin(base.Plugin):
 		for key, value in list(instance._sysfs_original.items()):
 			self._write_sysfs(key, value)
 
+	def _instance_retune_static(self, instance, options, changed):
+		sysfs = dict([(os.path.normpath(key_value[0]), key_value[1]) for key_value in list(options.items())])
+		changed = [os.path.normpath(key) for key in changed]
+		removed = [key for key in changed if key not in sysfs]
+		if removed:
+			# files still matched by other keys are rewritten below or
+			# keep their value
+			kept = set()
+			for key in sysfs:
+				kept.update(glob.glob(key))
+			for key in removed:
+				for f in glob.iglob(key):
+					if f in instance._sysfs_original and f not in kept:
+						self._write_sysfs(f, instance._sysfs_original.pop(f))
+		for key in changed:
+			if key not in sysfs:
+				continue
+			v = self._variables.expand(sysfs[key])
+			for f in glob.iglob(key):
+				if self._check_sysfs(f):
+					if f not in instance._sysfs_original:
+						instance._sysfs_original[f] = self._read_sysfs(f)
+					self._write_sysfs(f, v)
+				else:
+					log.error("rejecting write to '%s' (not inside /sys)" % f)
+		instance.options = options
+		instance._sysfs = sysfs
+		return True
+
 	def _check_sysfs(self, sysfs_file):
 		return re.match(r"^/sys/.*", sysfs_file)
 
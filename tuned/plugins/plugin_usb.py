@@ -26,6 +26,8 @@ class USBPlugin(base.Plugin):
 	====
 	"""
 
+	parallel_apply = True
+
 	def _init_devices(self):
 		self._devices_supported = True
 		self._free_devices = set()
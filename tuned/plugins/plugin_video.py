@@ -44,6 +44,8 @@ class VideoPlugin(base.Plugin):
 	but will trade off color accuracy.
 	"""
 
+	parallel_apply = True
+
 	def __init__(self, *args, **kwargs):
 		super(VideoPlugin, self).__init__(*args, **kwargs)
 
@@ -0,0 +1,139 @@
+import collections
+import hashlib
+import os
+import pickle
+import threading
+import tuned.consts as consts
+import tuned.logs
+from tuned.version import TUNED_VERSION_STR
+
+log = tuned.logs.get()
+
+__all__ = ["CompiledProfile", "CompiledProfileCache"]
+
+def fingerprint(file_name):
+	"""
+	Return the fingerprint of the file: path, mtime, size and hash of
+	the content, or None if the file cannot be read.
+	"""
+	try:
+		with open(file_name, "rb") as f:
+			st = os.fstat(f.fileno())
+			digest = hashlib.sha256(f.read()).hexdigest()
+	except (IOError, OSError):
+		return None
+	return (file_name, st.st_mtime_ns, st.st_size, digest)
+
+class CompiledProfile(object):
+	"""
+	Record of a profile load: the profile lookups in the load order, the
+	include options with their expanded values, the fingerprints of the
+	loaded files and the merged profile.
+	"""
+
+	__slots__ = ["lookups", "includes", "files", "profile"]
+
+	def __init__(self):
+		self.lookups = []
+		self.includes = []
+		self.files = []
+		self.profile = None
+
+	def add_lookup(self, name, file_name):
+		self.lookups.append((name, file_name))
+
+	def add_include(self, value, expanded):
+		self.includes.append((value, expanded))
+
+	def add_file(self, file_name):
+		self.files.append(fingerprint(file_name))
+
+class CompiledProfileCache(object):
+	"""
+	On-disk cache of the merged profiles.
+
+	The cached profile is used only if the profiles resolve to the same
+	files, the files have the same fingerprints and the include options
+	expand to the same values. The variables and functions in the merged
+	profile are expanded on every load, the cache only saves the parsing
+	and merging of the profile files.
+	"""
+
+	def __init__(self, file_name = consts.PROFILE_CACHE_FILE, size = consts.PROFILE_CACHE_SIZE):
+		self._file_name = file_name
+		self._size = size
+		self._entries = None
+		self._lock = threading.Lock()
+
+	def _key(self, profile_names, locator):
+		return (tuple(profile_names), tuple(locator.load_directories))
+
+	def _load(self):
+		if self._entries is not None:
+			return
+		self._entries = collections.OrderedDict()
+		try:
+			with open(self._file_name, "rb") as f:
+				data = pickle.load(f)
+		except (IOError, OSError):
+			return
+		except Exception as e:
+			log.debug("ignoring invalid profile cache '%s': %s" % (self._file_name, e))
+			return
+		if isinstance(data, dict) and data.get("version") == TUNED_VERSION_STR:
+			self._entries.update(data.get("entries", {}))
+
+	def _save(self):
+		data = {"version": TUNED_VERSION_STR, "entries": self._entries}
+		tmp_file_name = self._file_name + consts.TMP_FILE_SUFFIX
+		try:
+			with open(tmp_file_name, "wb") as f:
+				pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+			os.rename(tmp_file_name, self._file_name)
+		except (IOError, OSError) as e:
+			log.debug("cannot write profile cache '%s': %s" % (self._file_name, e))
+
+	def _is_valid(self, compiled, locator, variables):
+		processed_files = []
+		for name, file_name in compiled.lookups:
+			if locator.get_config(name, processed_files) != file_name:
+				return False
+			if file_name:
+				processed_files.append(file_name)
+		for value, expanded in compiled.includes:
+			if variables.expand(value) != expanded:
+				return False
+		for fp in compiled.files:
+			if fp is None or fingerprint(fp[0]) != fp:
+				return False
+		return True
+
+	def get(self, profile_names, locator, variables):
+		"""Return the cached merged profile or None."""
+		key = self._key(profile_names, locator)
+		with self._lock:
+			self._load()
+			compiled = self._entries.get(key)
+		if compiled is None or not self._is_valid(compiled, locator, variables):
+			return None
+		try:
+			profile = pickle.loads(compiled.profile)
+		except Exception as e:
+			log.debug("ignoring invalid cached profile '%s': %s" % (" ".join(profile_names), e))
+			return None
+		with self._lock:
+			if key in self._entries:
+				self._entries.move_to_end(key)
+		log.debug("using cached profile '%s'" % " ".join(profile_names))
+		return profile
+
+	def put(self, profile_names, locator, compiled, profile):
+		compiled.profile = pickle.dumps(profile, pickle.HIGHEST_PROTOCOL)
+		key = self._key(profile_names, locator)
+		with self._lock:
+			self._load()
+			self._entries[key] = compiled
+			self._entries.move_to_end(key)
+			while len(self._entries) > self._size:
+				self._entries.popitem(last = False)
+			self._save()
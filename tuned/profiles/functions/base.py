@@ -4,10 +4,23 @@ from tuned.utils.commands import commands
 
 log = tuned.logs.get()
 
+# purity classes of the functions, they define how long the results
+# of the functions are cached by the repository
+# the result depends only on the arguments, it is cached until the exit
+PURE = "pure"
+# the result depends on the system (e.g. the CPU topology), it is cached
+# until the next profile load
+STABLE = "stable"
+# the result may differ in every call or the function has side effects,
+# it is never cached
+VOLATILE = "volatile"
+
 class Function(object):
 	"""
 	Built-in function
 	"""
+	purity = VOLATILE
+
 	def __init__(self, name, nargs_max, nargs_min = None):
 		self._name = name
 		self._nargs_max = nargs_max
@@ -12,6 +12,8 @@ class assertion(base.Function):
 	it logs text from argument 1 and  throws InvalidProfileException. This
 	exception will abort profile loading.
 	"""
+	purity = base.PURE
+
 	def __init__(self):
 		# 3 arguments
 		super(assertion, self).__init__("assertion", 3, 3)
@@ -12,6 +12,8 @@ class assertion_non_equal(base.Function):
 	it logs text from argument 1 and  throws InvalidProfileException. This
 	exception will abort profile loading.
 	"""
+	purity = base.PURE
+
 	def __init__(self):
 		# 3 arguments
 		super(assertion_non_equal, self).__init__("assertion_non_equal", 3, 3)
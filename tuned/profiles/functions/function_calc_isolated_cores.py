@@ -14,6 +14,8 @@ class calc_isolated_cores(base.Function):
 	cores per socket reserve for housekeeping. If not specified, 1 core
 	per socket is reserved for housekeeping and the rest is isolated.
 	"""
+	purity = base.STABLE
+
 	def __init__(self):
 		# max 1 argument
 		super(calc_isolated_cores, self).__init__("calc_isolated_cores", 1)
@@ -8,6 +8,8 @@ class check_net_queue_count(base.Function):
 	Checks whether the user has specified a queue count for net devices. If
         not, return the number of housekeeping CPUs.
 	"""
+	purity = base.STABLE
+
 	def __init__(self):
 		# 1 argument
 		super(check_net_queue_count, self).__init__("check_net_queue_count", 1, 1)
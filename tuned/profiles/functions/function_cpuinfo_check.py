@@ -14,6 +14,8 @@ class cpuinfo_check(base.Function):
 	regex matches it expands to STR_FALLBACK. If there is no fallback,
 	it expands to empty string.
 	"""
+	purity = base.STABLE
+
 	def __init__(self):
 		# unlimited number of arguments, min 2 arguments
 		super(cpuinfo_check, self).__init__("cpuinfo_check", 0, 2)
@@ -7,6 +7,8 @@ class cpulist2devs(base.Function):
 	"""
 	Conversion function: converts CPU list to device strings
 	"""
+	purity = base.PURE
+
 	def __init__(self):
 		# arbitrary number of arguments
 		super(cpulist2devs, self).__init__("cpulist2devs", 0)
@@ -9,6 +9,8 @@ class cpulist2hex(base.Function):
 	"""
 	Conversion function: converts CPU list to hexadecimal CPU mask
 	"""
+	purity = base.PURE
+
 	def __init__(self):
 		# arbitrary number of arguments
 		super(cpulist2hex, self).__init__("cpulist2hex", 0)
@@ -9,6 +9,8 @@ class cpulist2hex_invert(base.Function):
 	"""
 	Converts CPU list to hexadecimal CPU mask and inverts it
 	"""
+	purity = base.STABLE
+
 	def __init__(self):
 		# arbitrary number of arguments
 		super(cpulist2hex_invert, self).__init__("cpulist2hex_invert", 0)
@@ -12,6 +12,8 @@ class cpulist_invert(base.Function):
 	e.g. system with 4 CPUs (0-3), the inversion of list "0,2,3" will be
 	"1"
 	"""
+	purity = base.STABLE
+
 	def __init__(self):
 		# arbitrary number of arguments
 		super(cpulist_invert, self).__init__("cpulist_invert", 0)
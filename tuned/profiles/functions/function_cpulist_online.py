@@ -10,6 +10,8 @@ class cpulist_online(base.Function):
 	Checks whether CPUs from list are online, returns list containing
 	only online CPUs
 	"""
+	purity = base.STABLE
+
 	def __init__(self):
 		# arbitrary number of arguments
 		super(cpulist_online, self).__init__("cpulist_online", 0)
@@ -10,6 +10,8 @@ class cpulist_present(base.Function):
 	Checks whether CPUs from list are present, returns list containing
 	only present CPUs
 	"""
+	purity = base.STABLE
+
 	def __init__(self):
 		# arbitrary number of arguments
 		super(cpulist_present, self).__init__("cpulist_present", 0)
@@ -9,6 +9,8 @@ class hex2cpulist(base.Function):
 	"""
 	Conversion function: converts hexadecimal CPU mask to CPU list
 	"""
+	purity = base.PURE
+
 	def __init__(self):
 		# 1 argument
 		super(hex2cpulist, self).__init__("hex2cpulist", 1, 1)
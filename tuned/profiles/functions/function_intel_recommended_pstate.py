@@ -25,6 +25,8 @@ class intel_recommended_pstate(base.Function):
     and tested with RHEL-7.4. From IceLake generation, intel 
     has fixed these issues. 
     """
+    purity = base.STABLE
+
     def __init__(self):
         super(intel_recommended_pstate, self).__init__("intel_recommended_pstate", 0)
 
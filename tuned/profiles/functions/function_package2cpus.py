@@ -14,6 +14,8 @@ class package2cpus(base.Function):
 	"""
 	Provides cpu device list for a package (socket)
 	"""
+	purity = base.STABLE
+
 
 	def __init__(self):
 		super(package2cpus, self).__init__("package2cpus", 0)
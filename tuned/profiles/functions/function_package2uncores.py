@@ -14,6 +14,8 @@ class package2uncores(base.Function):
 	"""
 	Provides uncore device list for a package (socket)
 	"""
+	purity = base.STABLE
+
 
 	def __init__(self):
 		super(package2uncores, self).__init__("package2uncores", 0)
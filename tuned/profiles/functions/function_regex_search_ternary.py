@@ -8,6 +8,8 @@ class regex_search_ternary(base.Function):
 	If REGEX matches STR1 (re.search is used), STR2 is returned,
 	otherwise STR3 is returned
 	"""
+	purity = base.PURE
+
 	def __init__(self):
 		# 4 arguments
 		super(regex_search_ternary, self).__init__("regex_search_ternary", 4, 4)
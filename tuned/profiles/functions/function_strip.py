@@ -7,6 +7,8 @@ class strip(base.Function):
 	"""
 	Makes string from all arguments and strip it
 	"""
+	purity = base.PURE
+
 	def __init__(self):
 		# unlimited number of arguments, min 1 argument
 		super(strip, self).__init__("strip", 0, 1)
@@ -9,6 +9,8 @@ class virt_check(base.Function):
 	If running inside VM expands to argument 1, otherwise expands to
 	argument 2 (even on error).
 	"""
+	purity = base.STABLE
+
 	def __init__(self):
 		# 2 arguments
 		super(virt_check, self).__init__("virt_check", 2, 2)
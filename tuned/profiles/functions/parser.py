@@ -1,4 +1,5 @@
 import re
+import functools
 import tuned.logs
 from tuned.utils.commands import commands
 
@@ -6,81 +7,130 @@ log = tuned.logs.get()
 
 cmd = commands()
 
-class Parser():
+# maximal number of parsed strings in the cache
+PARSE_CACHE_SIZE = 1024
+
+_split_args_re = re.compile(r'(?<!\\):')
+_unescape_re = re.compile(r'\\(\${f:.*})')
+
+class Node(object):
 	"""
-	Parser used for expanding strings containing functions.
+	The ${...} expression. The parts are the literal strings and the
+	nested expressions between '${' and '}'. The escaped expression
+	(i.e. \\${...}) is not expanded, but the expressions nested in it are.
 	"""
 
-	def __init__(self, repository):
-		self._repository = repository
+	__slots__ = ["escaped", "parts"]
 
-	def _parse_init(self, s = ""):
-		self._cnt = 0
-		self._str = s
-		self._len = len(s)
-		self._stack = []
-		self._esc = False
+	def __init__(self, escaped):
+		self.escaped = escaped
+		self.parts = []
 
-	def _curr_char(self):
-		return self._str[self._cnt] if self._cnt < self._len else ""
+def _append(parts, s):
+	if s:
+		if parts and not isinstance(parts[-1], Node):
+			parts[-1] += s
+		else:
+			parts.append(s)
 
-	def _curr_substr(self, _len):
-		return self._str[self._cnt:self._cnt + _len]
+@functools.lru_cache(maxsize = PARSE_CACHE_SIZE)
+def _parse(s):
+	"""
+	Tokenize the string in a single pass, return the tuple of the top
+	level parts and the list of syntax errors. The result is shared by
+	all the callers and must not be modified.
+	"""
+	errors = []
+	root = []
+	stack = []
+	parts = root
+	start = 0
+	pos = 0
+	length = len(s)
+	while pos < length:
+		c = s[pos]
+		if c == "}":
+			_append(parts, s[start:pos])
+			if not stack:
+				errors.append("invalid variable syntax, non pair '}' in: '%s'" % s)
+				# the rest of the string is not processed
+				_append(parts, s[pos:])
+				start = length
+				break
+			node = stack.pop()
+			parts = stack[-1].parts if stack else root
+			parts.append(node)
+			start = pos + 1
+		elif c == "$" and s.startswith("{", pos + 1):
+			_append(parts, s[start:pos])
+			node = Node(pos > 0 and s[pos - 1] == "\\")
+			stack.append(node)
+			parts = node.parts
+			pos += 1
+			start = pos + 1
+		pos += 1
+	_append(parts, s[start:])
+	if stack:
+		errors.append("invalid variable syntax, non pair '{' in: '%s'" % s)
+		# the unclosed expressions are literals, only the expressions
+		# nested in them are expanded
+		while stack:
+			node = stack.pop()
+			parts = stack[-1].parts if stack else root
+			_append(parts, "${")
+			for part in node.parts:
+				if isinstance(part, Node):
+					parts.append(part)
+				else:
+					_append(parts, part)
+	return tuple(root), tuple(errors)
 
-	def _push_pos(self, esc):
-		self._stack.append((esc, self._cnt))
+class Parser():
+	"""
+	Parser used for expanding strings containing functions.
+	"""
 
-	def _sub(self, a, b, s):
-		self._str = self._str[:a] + s + self._str[b + 1:]
-		self._len = len(self._str)
-		self._cnt += len(s) - (b - a + 1)
-		if self._cnt < 0:
-			self._cnt = 0
+	def __init__(self, repository):
+		self._repository = repository
 
-	def _process_func(self, _from):
-		sl = re.split(r'(?<!\\):', self._str[_from:self._cnt])
+	def _process_func(self, s):
+		sl = _split_args_re.split(s)
 		if sl[0] != "${f":
-			return
+			return None
 		sl = [str(v).replace(r"\:", ":") for v in sl]
 		if not re.match(r'\w+$', sl[1]):
 			log.error("invalid function name '%s'" % sl[1])
-			return
+			return None
 		try:
 			f = self._repository.load_func(sl[1])
 		except ImportError:
 			log.error("function '%s' not implemented" % sl[1])
-			return
-		s = f.execute(sl[2:])
-		log.debug("${f:%s} expands to: '%s'" % (":".join(sl[1:]), s))
-		if s is None:
-			return
-		self._sub(_from, self._cnt, s)
+			return None
+		res = self._repository.execute(f, sl[2:])
+		log.debug("${f:%s} expands to: '%s'" % (":".join(sl[1:]), res))
+		return res
+
+	def _evaluate(self, parts):
+		# the nested expressions are evaluated first, their results
+		# are not parsed again
+		l = []
+		for part in parts:
+			if not isinstance(part, Node):
+				l.append(part)
+				continue
+			s = "${" + self._evaluate(part.parts)
+			res = None if part.escaped else self._process_func(s)
+			l.append(s + "}" if res is None else res)
+		return "".join(l)
 
 	def _process(self, s):
-		self._parse_init(s)
-		while self._cnt < self._len:
-			if self._curr_char() == "}":
-				try:
-					si = self._stack.pop()
-				except IndexError:
-					log.error("invalid variable syntax, non pair '}' in: '%s'" % s)
-					return self._str
-				# if not escaped
-				if not si[0]:
-					self._process_func(si[1])
-			elif self._curr_substr(2) == "${":
-				self._push_pos(self._esc)
-			if self._curr_char() == "\\":
-				self._esc = True
-			else:
-				self._esc = False
-			self._cnt += 1
-		if len(self._stack):
-			log.error("invalid variable syntax, non pair '{' in: '%s'" % s)
-		return self._str
+		parts, errors = _parse(s)
+		for error in errors:
+			log.error(error)
+		return self._evaluate(parts)
 
 	def expand(self, s):
 		if s is None or s == "":
 			return s
 		# expand functions and convert all \${f:*} to ${f:*} (unescape)
-		return re.sub(r'\\(\${f:.*})', r'\1', self._process(s))
+		return _unescape_re.sub(r'\1', self._process(s))
@@ -1,20 +1,30 @@
+import threading
 from tuned.utils.class_loader import ClassLoader
 from tuned.profiles.functions.parser import Parser
-from tuned.profiles.functions.base import Function
+from tuned.profiles.functions.base import Function, PURE, STABLE
 import tuned.logs
 import tuned.consts as consts
 
 log = tuned.logs.get()
 
+# maximal number of cached results per purity class
+FUNCTION_CACHE_SIZE = 1024
+
 class Repository(ClassLoader):
 	"""
 	Repository of functions used within TuneD profiles.
 	The functions are loaded lazily (when first used).
+
+	The results of the functions are cached according to the purity
+	of the functions (see base.PURE, base.STABLE, base.VOLATILE).
 	"""
 
 	def __init__(self):
 		super(Repository, self).__init__()
 		self._functions = {}
+		self._cache = {PURE: {}, STABLE: {}}
+		# the functions may be expanded by the instances applied concurrently
+		self._lock = threading.Lock()
 
 	@property
 	def functions(self):
@@ -35,9 +45,10 @@ class Repository(ClassLoader):
 	# load a function from its file and return it
 	# if it is already loaded, just return it, it is not loaded again
 	def load_func(self, function_name):
-		if not function_name in self._functions:
-			return self.create(function_name)
-		return self._functions[function_name]
+		with self._lock:
+			if not function_name in self._functions:
+				return self.create(function_name)
+			return self._functions[function_name]
 
 	def delete(self, function):
 		assert isinstance(function, self._interface)
@@ -46,5 +57,31 @@ class Repository(ClassLoader):
 			if v == function:
 				del self._functions[k]
 
+	def execute(self, function, args):
+		"""Execute the function or return its cached result."""
+		cache = self._cache.get(function.purity)
+		if cache is None:
+			return function.execute(args)
+		key = (function._name, tuple(args))
+		with self._lock:
+			try:
+				return cache[key]
+			except KeyError:
+				pass
+		res = function.execute(args)
+		with self._lock:
+			if len(cache) >= FUNCTION_CACHE_SIZE:
+				cache.clear()
+			cache[key] = res
+		return res
+
+	def new_cycle(self):
+		"""
+		Start a new load cycle, the results of the stable functions
+		are dropped.
+		"""
+		with self._lock:
+			self._cache[STABLE] = {}
+
 	def expand(self, s):
 		return Parser(self).expand(s)
@@ -1,5 +1,6 @@
 import tuned.profiles.profile
 import tuned.profiles.variables
+from tuned.profiles.cache import CompiledProfile
 from tuned.utils.config_parser import ConfigParser, Error
 import tuned.consts as consts
 import os.path
@@ -15,14 +16,15 @@ class Loader(object):
 	Profiles loader.
 	"""
 
-	__slots__ = ["_profile_locator", "_profile_merger", "_profile_factory", "_global_config", "_variables"]
+	__slots__ = ["_profile_locator", "_profile_merger", "_profile_factory", "_global_config", "_variables", "_profile_cache"]
 
-	def __init__(self, profile_locator, profile_factory, profile_merger, global_config, variables):
+	def __init__(self, profile_locator, profile_factory, profile_merger, global_config, variables, profile_cache = None):
 		self._profile_locator = profile_locator
 		self._profile_factory = profile_factory
 		self._profile_merger = profile_merger
 		self._global_config = global_config
 		self._variables = variables
+		self._profile_cache = profile_cache
 
 	def _create_profile(self, profile_name, config):
 		return tuned.profiles.profile.Profile(profile_name, config)
@@ -42,16 +44,13 @@ class Loader(object):
 		profile_names = list(filter(self.safe_name, profile_names))
 		if len(profile_names) == 0:
 			raise InvalidProfileException("No profile or invalid profiles were specified.")
+		self._variables.new_cycle()
 
 		if len(profile_names) > 1:
 			log.info("loading profiles: %s" % ", ".join(profile_names))
 		else:
 			log.info("loading profile: %s" % profile_names[0])
-		profiles = []
-		processed_files = []
-		self._load_profile(profile_names, profiles, processed_files)
-
-		final_profile = self._profile_merger.merge(profiles)
+		final_profile = self._load_merged(profile_names)
 		final_profile.name = " ".join(profile_names)
 		self._variables.add_from_cfg(final_profile.variables)
 		# FIXME hack, do all variable expansions in one place
@@ -68,20 +67,48 @@ class Loader(object):
 			profile.units[unit].cpuinfo_regex = self._variables.expand(profile.units[unit].cpuinfo_regex)
 			profile.units[unit].uname_regex = self._variables.expand(profile.units[unit].uname_regex)
 
-	def _load_profile(self, profile_names, profiles, processed_files):
+	def _load_merged(self, profile_names):
+		"""
+		Load and merge the profiles, use the compiled profile cache if
+		it is enabled and the cached profile is still valid.
+		"""
+		if self._profile_cache is None:
+			profiles = []
+			self._load_profile(profile_names, profiles, [])
+			return self._profile_merger.merge(profiles)
+
+		profile = self._profile_cache.get(profile_names, self._profile_locator, self._variables)
+		if profile is not None:
+			return profile
+		profiles = []
+		compiled = CompiledProfile()
+		self._load_profile(profile_names, profiles, [], compiled)
+		profile = self._profile_merger.merge(profiles)
+		self._profile_cache.put(profile_names, self._profile_locator, compiled, profile)
+		return profile
+
+	def _load_profile(self, profile_names, profiles, processed_files, compiled = None):
 		for name in profile_names:
 			filename = self._profile_locator.get_config(name, processed_files)
+			if compiled is not None:
+				compiled.add_lookup(name, filename)
 			if filename == "":
 				continue
 			if filename is None:
 				raise InvalidProfileException("Cannot find profile '%s' in '%s'." % (name, list(reversed(self._profile_locator._load_directories))))
 			processed_files.append(filename)
 
+			if compiled is not None:
+				compiled.add_file(filename)
 			config = self._load_config_data(filename)
 			profile = self._profile_factory.create(name, config)
 			if "include" in profile.options:
-				include_names = re.split(r"\s*[,;]\s*", self._variables.expand(profile.options.pop("include")))
-				self._load_profile(include_names, profiles, processed_files)
+				include = profile.options.pop("include")
+				expanded = self._variables.expand(include)
+				if compiled is not None:
+					compiled.add_include(include, expanded)
+				include_names = re.split(r"\s*[,;]\s*", expanded)
+				self._load_profile(include_names, profiles, processed_files, compiled)
 
 			profiles.append(profile)
 
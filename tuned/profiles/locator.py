@@ -1,6 +1,15 @@
 import os
+import stat
+import threading
 import tuned.consts as consts
+import tuned.logs
 from tuned.utils.config_parser import ConfigParser, Error
+try:
+	import pyinotify
+except ImportError:
+	pyinotify = None
+
+log = tuned.logs.get()
 
 class Locator(object):
 	"""
@@ -54,6 +63,9 @@ class Locator(object):
 		config_file = self.get_config(profile_name)
 		if config_file is None:
 			return None
+		return self._parse_config_file(config_file)
+
+	def _parse_config_file(self, config_file):
 		try:
 			config = ConfigParser(delimiters=('='), inline_comment_prefixes=('#'), allow_no_value=True, strict=False)
 			config.optionxform = str
@@ -63,6 +75,21 @@ class Locator(object):
 		except (IOError, OSError, Error) as e:
 			return None
 
+	def _main_options(self, config):
+		if config is None:
+			return None
+		if consts.PLUGIN_MAIN_UNIT_NAME not in config.sections():
+			return {}
+		return dict((option, config.get(consts.PLUGIN_MAIN_UNIT_NAME, option, raw=True))
+				for option in config.options(consts.PLUGIN_MAIN_UNIT_NAME))
+
+	def _get_main_options(self, profile_name):
+		"""
+		Return dict of the options in the main section of the profile,
+		None if the profile does not exist or cannot be parsed.
+		"""
+		return self._main_options(self.parse_config(profile_name))
+
 	# Get profile attributes (e.g. summary, description), attrs is list of requested attributes,
 	# if it is not list it is converted to list, defvals is list of default values to return if
 	# attribute is not found, it is also converted to list if it is not list.
@@ -83,17 +110,16 @@ class Locator(object):
 		# Extend defvals if needed, last value is used for extension
 		if defvals_len < attrs_len:
 			defvals = defvals + ([defvals[-1]] * (attrs_len - defvals_len))
-		config = self.parse_config(profile_name)
-		if config is None:
+		options = self._get_main_options(profile_name)
+		if options is None:
 			return [False, "", "", ""]
-		main_unit_in_config = consts.PLUGIN_MAIN_UNIT_NAME in config.sections()
 		vals = [True, profile_name]
 		for (attr, defval) in zip(attrs, defvals):
 			if attr == "" or attr is None:
 				vals[0] = False
 				vals = vals + [""]
-			elif main_unit_in_config and attr in config.options(consts.PLUGIN_MAIN_UNIT_NAME):
-				vals = vals + [config.get(consts.PLUGIN_MAIN_UNIT_NAME, attr, raw=True)]
+			elif attr in options:
+				vals = vals + [options[attr]]
 			else:
 				vals = vals + [defval]
 		return vals
@@ -115,3 +141,225 @@ class Locator(object):
 
 	def get_known_names_summary(self):
 		return [(profile, self.get_profile_attrs(profile, [consts.PROFILE_ATTR_SUMMARY], [""])[2]) for profile in sorted(self.list_profiles())]
+
+class _ProfileEntry(object):
+	"""
+	Indexed profile: the config file, its stat and the options of its
+	main section (parsed on the first use).
+	"""
+
+	__slots__ = ["config_file", "stat", "options", "parsed"]
+
+	def __init__(self, config_file, st):
+		self.config_file = config_file
+		self.stat = st
+		self.options = None
+		self.parsed = False
+
+if pyinotify is not None:
+	class _IndexEventHandler(pyinotify.ProcessEvent):
+		def __init__(self, locator):
+			super(_IndexEventHandler, self).__init__()
+			self._locator = locator
+
+		def process_default(self, event):
+			if event.mask & pyinotify.IN_Q_OVERFLOW:
+				self._locator._invalidate(None)
+			else:
+				self._locator._invalidate(event.pathname)
+
+class IndexedLocator(Locator):
+	"""
+	Profiles locator keeping an index of the profiles in the load
+	directories, so listing the profiles and querying their attributes
+	do not scan and parse the profile files again.
+
+	The index is invalidated by inotify watches of the load directories.
+	Without pyinotify or if some of the load directories cannot be
+	watched, the profiles are looked up as by Locator and only the
+	options of the profile files changed since their last parsing
+	(checked by stat()) are parsed again.
+	"""
+
+	__slots__ = ["_index", "_dirty", "_lock", "_notifier", "_files"]
+
+	def __init__(self, load_directories):
+		super(IndexedLocator, self).__init__(load_directories)
+		# dir_name -> {profile_name: _ProfileEntry}, missing if the
+		# directory has to be scanned again
+		self._index = {}
+		# (dir_name, profile_name) to check again
+		self._dirty = set()
+		self._lock = threading.RLock()
+		self._notifier = None
+		# config_file -> _ProfileEntry, used when the index is not watched
+		self._files = {}
+		self._init_watches()
+
+	def _init_watches(self):
+		if pyinotify is None:
+			log.debug("pyinotify is not available, the profile index is checked by stat()")
+			return
+		mask = pyinotify.IN_CREATE | pyinotify.IN_DELETE | pyinotify.IN_MOVED_FROM \
+				| pyinotify.IN_MOVED_TO | pyinotify.IN_CLOSE_WRITE | pyinotify.IN_MODIFY \
+				| pyinotify.IN_ATTRIB | pyinotify.IN_DELETE_SELF | pyinotify.IN_MOVE_SELF
+		watch_manager = pyinotify.WatchManager()
+		notifier = pyinotify.Notifier(watch_manager, _IndexEventHandler(self), timeout = 0)
+		for dir_name in self._load_directories:
+			wds = {}
+			if os.path.isdir(dir_name):
+				wds = watch_manager.add_watch(dir_name, mask, rec = True, auto_add = True, quiet = True)
+			if not wds or any(wd < 0 for wd in wds.values()):
+				log.debug("cannot watch profile directory '%s', the profile index is checked by stat()" % dir_name)
+				notifier.stop()
+				return
+		self._notifier = notifier
+
+	def close(self):
+		with self._lock:
+			if self._notifier is not None:
+				self._notifier.stop()
+				self._notifier = None
+
+	def _invalidate(self, path):
+		"""Invalidate the index entries affected by a change of the path."""
+		for dir_name in self._load_directories:
+			dir_path = os.path.normpath(dir_name)
+			if path is None:
+				self._index.pop(dir_name, None)
+			elif path == dir_path:
+				# the directory itself was removed or moved, its watch is lost
+				self._dirty.add((dir_name, None))
+			elif path.startswith(dir_path + os.sep):
+				profile_name = path[len(dir_path) + 1:].split(os.sep, 1)[0]
+				self._dirty.add((dir_name, profile_name))
+
+	def _scan_profile(self, dir_name, profile_name, entry):
+		config_file = self._get_config_filename(dir_name, profile_name)
+		try:
+			st = os.stat(config_file)
+		except OSError:
+			return None
+		if not stat.S_ISREG(st.st_mode):
+			return None
+		key = (st.st_ino, st.st_mtime_ns, st.st_size)
+		if entry is not None and entry.stat == key:
+			return entry
+		return _ProfileEntry(config_file, key)
+
+	def _scan_dir(self, dir_name, entries):
+		profiles = {}
+		try:
+			names = os.listdir(dir_name)
+		except OSError:
+			return profiles
+		for profile_name in names:
+			entry = self._scan_profile(dir_name, profile_name, entries.get(profile_name))
+			if entry is not None:
+				profiles[profile_name] = entry
+		return profiles
+
+	def _refresh(self):
+		"""
+		Update the index, return False if the index is not watched and
+		the lookups have to be done by Locator.
+		"""
+		if self._notifier is None:
+			return False
+		if self._notifier.check_events():
+			self._notifier.read_events()
+			self._notifier.process_events()
+		if any(profile_name is None for dir_name, profile_name in self._dirty):
+			log.debug("profile directory watch lost, the profile index is checked by stat()")
+			self._notifier.stop()
+			self._notifier = None
+			self._dirty.clear()
+			self._index.clear()
+			return False
+		for dir_name in self._load_directories:
+			if dir_name not in self._index:
+				self._index[dir_name] = self._scan_dir(dir_name, {})
+		for dir_name, profile_name in self._dirty:
+			profiles = self._index.get(dir_name)
+			if profiles is None:
+				continue
+			entry = self._scan_profile(dir_name, profile_name, None)
+			if entry is None:
+				profiles.pop(profile_name, None)
+			else:
+				profiles[profile_name] = entry
+		self._dirty.clear()
+		return True
+
+	def _find(self, profile_name, skip_files = None):
+		"""
+		Return (config_file, entry) of the profile with the same lookup
+		rules as Locator.get_config().
+		"""
+		ret = None
+		conditional_load = profile_name[0:1] == "-"
+		if conditional_load:
+			profile_name = profile_name[1:]
+		# basename is protection not to get out of the path
+		profile_name = os.path.basename(profile_name)
+		for dir_name in reversed(self._load_directories):
+			config_file = self._get_config_filename(dir_name, profile_name)
+
+			if skip_files is not None and config_file in skip_files:
+				ret = ""
+				continue
+
+			entry = self._index[dir_name].get(profile_name)
+			if entry is not None:
+				return config_file, entry
+
+		if conditional_load and ret is None:
+			ret = ""
+
+		return ret, None
+
+	def get_config(self, profile_name, skip_files=None):
+		with self._lock:
+			if not self._refresh():
+				return super(IndexedLocator, self).get_config(profile_name, skip_files)
+			return self._find(profile_name, skip_files)[0]
+
+	def _find_file(self, profile_name):
+		"""
+		Return (config_file, entry) of the profile looked up by Locator,
+		the entry is reused while the stat() of the file is the same.
+		"""
+		config_file = super(IndexedLocator, self).get_config(profile_name)
+		if config_file is None:
+			return None, None
+		dir_name, profile_name = os.path.split(os.path.dirname(config_file))
+		entry = self._scan_profile(dir_name, profile_name, self._files.get(config_file))
+		if entry is None:
+			self._files.pop(config_file, None)
+		else:
+			self._files[config_file] = entry
+		return config_file, entry
+
+	def _get_main_options(self, profile_name):
+		if not self.check_profile_name_format(profile_name):
+			return None
+		with self._lock:
+			if self._refresh():
+				config_file, entry = self._find(profile_name)
+			else:
+				config_file, entry = self._find_file(profile_name)
+			if entry is None:
+				return None
+			if not entry.parsed:
+				entry.options = self._main_options(self._parse_config_file(config_file))
+				entry.parsed = True
+			return entry.options
+
+	def list_profiles(self):
+		with self._lock:
+			if not self._refresh():
+				return super(IndexedLocator, self).list_profiles()
+			profiles = set()
+			for profiles_dir in self._index.values():
+				profiles.update(profiles_dir)
+			return profiles
@@ -57,6 +57,8 @@ class Merger(object):
 					profile_a.units[unit_name].script_pre = unit.script_pre
 				if unit.script_post is not None:
 					profile_a.units[unit_name].script_post = unit.script_post
+				if unit.update_interval is not None:
+					profile_a.units[unit_name].update_interval = unit.update_interval
 				if unit.drop is not None:
 					for option in unit.drop:
 						profile_a.units[unit_name].options.pop(option, None)
@@ -7,7 +7,7 @@ class Unit(object):
 	"""
 
 	__slots__ = [ "_name", "_priority", "_type", "_enabled", "_replace", "_prepend", "_drop", "_devices", "_devices_udev_regex", \
-		"_cpuinfo_regex", "_uname_regex", "_script_pre", "_script_post", "_options" ]
+		"_cpuinfo_regex", "_uname_regex", "_script_pre", "_script_post", "_update_interval", "_options" ]
 
 	def __init__(self, name, config):
 		self._name = name
@@ -25,6 +25,7 @@ class Unit(object):
 		self._uname_regex = config.pop("uname_regex", None)
 		self._script_pre = config.pop("script_pre", None)
 		self._script_post = config.pop("script_post", None)
+		self._update_interval = config.pop("update_interval", None)
 		self._options = collections.OrderedDict(config)
 
 	@property
@@ -119,6 +120,14 @@ class Unit(object):
 	def script_post(self, value):
 		self._script_post = value
 
+	@property
+	def update_interval(self):
+		return self._update_interval
+
+	@update_interval.setter
+	def update_interval(self, value):
+		self._update_interval = value
+
 	@property
 	def options(self):
 		return self._options
@@ -1,5 +1,6 @@
 import os
 import re
+import threading
 import tuned.logs
 import tuned.consts as consts
 from tuned.profiles import functions
@@ -8,6 +9,9 @@ from tuned.utils.config_parser import ConfigParser, Error
 
 log = tuned.logs.get()
 
+# maximal number of memoized expansions
+EXPAND_CACHE_SIZE = 4096
+
 class Variables():
 	"""
 	Storage and processing of variables used in profiles
@@ -18,6 +22,13 @@ class Variables():
 		self._lookup_re = {}
 		self._lookup_env = {}
 		self._functions = functions.Repository()
+		# (compiled lookup regex, replacements indexed by group number - 1),
+		# None if it has to be compiled again
+		self._lookup = None
+		# memoized expansions of the strings without functions
+		self._expand_cache = {}
+		# the variables may be expanded by the instances applied concurrently
+		self._lock = threading.Lock()
 
 	def _add_env_prefix(self, s, prefix):
 		if s.find(prefix) == 0:
@@ -37,8 +48,11 @@ class Variables():
 		v = self.expand(value)
 		# variables referenced by ${VAR}, $ can be escaped by two $,
 		# i.e. the following will not expand: $${VAR}
-		self._lookup_re[r'(?<!\\)\${' + re.escape(s) + r'}'] = v
-		self._lookup_env[self._add_env_prefix(s, consts.ENV_PREFIX)] = v
+		with self._lock:
+			self._lookup_re[r'(?<!\\)\${' + re.escape(s) + r'}'] = v
+			self._lookup_env[self._add_env_prefix(s, consts.ENV_PREFIX)] = v
+			self._lookup = None
+			self._expand_cache = {}
 
 	def add_from_file(self, filename):
 		if not os.path.exists(filename):
@@ -63,17 +77,46 @@ class Variables():
 			else:
 				self.add_variable(item, cfg[item])
 
+	def _get_lookup(self):
+		with self._lock:
+			if self._lookup is None:
+				self._lookup = (self._cmd.re_lookup_compile(self._lookup_re), list(self._lookup_re.values()))
+			return self._lookup
+
 	# expand static variables (no functions)
 	def expand_static(self, value):
-		return re.sub(r'\\(\${\w+})', r'\1', self._cmd.multiple_re_replace(self._lookup_re, value))
+		if len(self._lookup_re) > 0:
+			r, values = self._get_lookup()
+			value = r.sub(lambda mo: values[mo.lastindex - 1], value)
+		return re.sub(r'\\(\${\w+})', r'\1', value)
 
 	def expand(self, value):
 		if value is None:
 			return None
+		value = str(value)
+		with self._lock:
+			expand_cache = self._expand_cache
+			res = expand_cache.get(value)
+		if res is not None:
+			return res
 		# expand variables and convert all \${VAR} to ${VAR} (unescape)
-		s = self.expand_static(str(value))
+		s = self.expand_static(value)
 		# expand built-in functions
-		return self._functions.expand(s)
+		res = self._functions.expand(s)
+		# the function results may change, e.g. with the hardware
+		if "${f:" not in s:
+			with self._lock:
+				if len(expand_cache) >= EXPAND_CACHE_SIZE:
+					expand_cache.clear()
+				expand_cache[value] = res
+		return res
+
+	def new_cycle(self):
+		"""
+		Start a new profile load, the results of the functions depending
+		on the system are evaluated again.
+		"""
+		self._functions.new_cycle()
 
 	def get_env(self):
 		return self._lookup_env
@@ -1,3 +1,4 @@
 from tuned.storage.storage import Storage
 from tuned.storage.factory import Factory
 from tuned.storage.pickle_provider import PickleProvider
+from tuned.storage.journal_provider import JournalProvider
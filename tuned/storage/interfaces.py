@@ -12,6 +12,12 @@ class Provider(object):
 	def unset(self, namespace, option):
 		raise NotImplementedError()
 
+	def set_deferred(self, namespace, option, value):
+		raise NotImplementedError()
+
+	def flush(self):
+		raise NotImplementedError()
+
 	def clear(self):
 		raise NotImplementedError()
 
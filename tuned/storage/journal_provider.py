@@ -0,0 +1,212 @@
+from . import pickle_provider
+import tuned.logs
+import pickle
+import os
+import threading
+import tuned.consts as consts
+
+log = tuned.logs.get()
+
+class JournalProvider(pickle_provider.PickleProvider):
+	"""
+	Persistent storage provider which survives crashes of the daemon.
+
+	The data are kept in a pickle snapshot and every change is appended
+	to a journal file next to it, so a change costs one small append
+	instead of rewriting the whole snapshot. When the journal grows over
+	compact_records records, it is compacted: the snapshot is written to
+	a temporary file, atomically renamed over the old one and the journal
+	is truncated. load() replays the journal over the snapshot, a torn
+	record at the end of the journal (crash during the append) is ignored.
+
+	Options set by set_deferred() are only marked dirty and written to the
+	journal by a timer at most flush_interval seconds later, so an option
+	changed many times within the interval is written once.
+	"""
+
+	__slots__ = ["_journal_path", "_journal_fd", "_journal_records",
+			"_compact_records", "_dirty", "_flush_interval",
+			"_flush_timer"]
+
+	def __init__(self, path = None, compact_records = None, flush_interval = None):
+		super(JournalProvider, self).__init__(path)
+		self._journal_path = self._path + consts.STORAGE_JOURNAL_SUFFIX
+		self._journal_fd = None
+		self._journal_records = 0
+		if compact_records is None:
+			compact_records = consts.STORAGE_JOURNAL_COMPACT_RECORDS
+		self._compact_records = compact_records
+		self._dirty = set()
+		if flush_interval is None:
+			flush_interval = consts.STORAGE_FLUSH_INTERVAL
+		self._flush_interval = flush_interval
+		self._flush_timer = None
+
+	def _open_journal(self):
+		if self._journal_fd is None:
+			dir_name = os.path.dirname(self._path)
+			if dir_name and not os.path.exists(dir_name):
+				os.makedirs(dir_name)
+			self._journal_fd = os.open(self._journal_path,
+					os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_CLOEXEC", 0), 0o600)
+		return self._journal_fd
+
+	def _close_journal(self):
+		if self._journal_fd is not None:
+			try:
+				os.close(self._journal_fd)
+			except OSError:
+				pass
+			self._journal_fd = None
+
+	def _append(self, record):
+		"""Append the record, return False if it has to be retried later."""
+		try:
+			data = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+		except RuntimeError:
+			# the value was modified by another thread while it was pickled
+			return False
+		try:
+			os.write(self._open_journal(), data)
+		except (OSError, IOError, pickle.PicklingError) as e:
+			log.error("Error writing storage journal '%s': %s" % (self._journal_path, e))
+			return True
+		self._journal_records += 1
+		if self._journal_records >= self._compact_records:
+			self._compact()
+		return True
+
+	def _schedule_flush(self):
+		if self._flush_timer is None:
+			self._flush_timer = threading.Timer(self._flush_interval, self.flush)
+			self._flush_timer.daemon = True
+			self._flush_timer.start()
+
+	def _cancel_flush(self):
+		if self._flush_timer is not None:
+			self._flush_timer.cancel()
+			self._flush_timer = None
+
+	def _write_snapshot(self):
+		tmp_path = "%s.tmp" % self._path
+		data = pickle.dumps(self._data, pickle.HIGHEST_PROTOCOL)
+		fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_CLOEXEC", 0), 0o600)
+		try:
+			while data:
+				data = data[os.write(fd, data):]
+			os.fsync(fd)
+		finally:
+			os.close(fd)
+		os.rename(tmp_path, self._path)
+
+	def _compact(self):
+		try:
+			self._write_snapshot()
+		except RuntimeError as e:
+			# the stored value was modified by another thread while it
+			# was pickled, the journal is still valid, retry later
+			log.debug("Postponing compaction of storage '%s': %s" % (self._path, e))
+			return
+		except (OSError, IOError, pickle.PicklingError) as e:
+			log.error("Error saving storage file '%s': %s" % (self._path, e))
+			return
+		# replaying the journal over the new snapshot is harmless, so
+		# a crash before the truncation loses nothing
+		self._close_journal()
+		try:
+			os.close(os.open(self._journal_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600))
+		except (OSError, IOError) as e:
+			log.error("Error truncating storage journal '%s': %s" % (self._journal_path, e))
+		self._journal_records = 0
+
+	def _replay(self):
+		records = 0
+		try:
+			with open(self._journal_path, "rb") as f:
+				while True:
+					try:
+						record = pickle.load(f)
+					except EOFError:
+						break
+					except (pickle.UnpicklingError, ValueError, TypeError, AttributeError, ImportError) as e:
+						log.warning("Ignoring corrupted record in storage journal '%s': %s" % (self._journal_path, e))
+						break
+					if record[0] == "set":
+						super(JournalProvider, self).set(*record[1:])
+					elif record[0] == "unset":
+						super(JournalProvider, self).unset(*record[1:])
+					records += 1
+		except (OSError, IOError) as e:
+			log.debug("Error loading storage journal '%s': %s" % (self._journal_path, e))
+		return records
+
+	def set(self, namespace, option, value):
+		with self._lock:
+			super(JournalProvider, self).set(namespace, option, value)
+			self._dirty.discard((namespace, option))
+			if not self._append(("set", namespace, option, value)):
+				self._dirty.add((namespace, option))
+				self._schedule_flush()
+
+	def set_deferred(self, namespace, option, value):
+		with self._lock:
+			super(JournalProvider, self).set(namespace, option, value)
+			self._dirty.add((namespace, option))
+			self._schedule_flush()
+
+	def flush(self):
+		"""Write the options set by set_deferred() to the journal."""
+		with self._lock:
+			self._cancel_flush()
+			for namespace, option in list(self._dirty):
+				options = self._data.get(namespace, {})
+				if option in options:
+					record = ("set", namespace, option, options[option])
+				else:
+					record = ("unset", namespace, option)
+				if self._append(record):
+					self._dirty.discard((namespace, option))
+			if self._dirty:
+				self._schedule_flush()
+
+	def get(self, namespace, option, default=None):
+		with self._lock:
+			return super(JournalProvider, self).get(namespace, option, default)
+
+	def unset(self, namespace, option):
+		with self._lock:
+			if option not in self._data.get(namespace, {}):
+				return
+			super(JournalProvider, self).unset(namespace, option)
+			self._dirty.discard((namespace, option))
+			self._append(("unset", namespace, option))
+
+	def save(self):
+		with self._lock:
+			log.debug("Saving %s" % str(self._data))
+			self._cancel_flush()
+			self._compact()
+			# the snapshot contains all the deferred changes
+			if self._journal_records == 0:
+				self._dirty.clear()
+			else:
+				self.flush()
+
+	def load(self):
+		with self._lock:
+			super(JournalProvider, self).load()
+			if self._replay() > 0:
+				log.info("recovered storage journal '%s'" % self._journal_path)
+				self._compact()
+
+	def clear(self):
+		with self._lock:
+			self._cancel_flush()
+			self._dirty.clear()
+			self._close_journal()
+			super(JournalProvider, self).clear()
+			try:
+				os.unlink(self._journal_path)
+			except (OSError, IOError) as e:
+				log.debug("Error removing storage journal '%s': %s" % (self._journal_path, e))
+			self._journal_records = 0
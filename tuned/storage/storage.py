@@ -8,6 +8,17 @@ class Storage(object):
 	def set(self, option, value):
 		self._storage_provider.set(self._namespace, option, value)
 
+	def set_deferred(self, option, value):
+		"""
+		Set the option, the provider may persist it later. Repeated calls
+		for the same option are coalesced, which suits big values changed
+		very often (the value can be modified in place before each call).
+		"""
+		self._storage_provider.set_deferred(self._namespace, option, value)
+
+	def flush(self):
+		self._storage_provider.flush()
+
 	def get(self, option, default=None):
 		return self._storage_provider.get(self._namespace, option, default)
 
@@ -1,11 +1,17 @@
 import collections
+import heapq
+import itertools
+import math
+import operator
 import os
 import re
+import time
 import traceback
 import tuned.exceptions
 import tuned.logs
 import tuned.plugins.exceptions
 import tuned.consts as consts
+from concurrent.futures import ThreadPoolExecutor, wait
 from tuned.utils.global_config import GlobalConfig
 from tuned.utils.commands import commands
 
@@ -29,6 +35,13 @@ class Manager(object):
 		self._plugins = []
 		self._config = config or GlobalConfig()
 		self._cmd = commands()
+		# heap of (deadline, sequence number, instance) of the instances
+		# with dynamic tuning, ordered by their next update deadline
+		self._update_schedule = []
+		self._update_schedule_seq = itertools.count()
+		self._scheduled_instances = set()
+		self._def_update_interval = None
+		self._apply_threads = self._config.get_int(consts.CFG_APPLY_THREADS, consts.CFG_DEF_APPLY_THREADS)
 
 	@property
 	def plugins(self):
@@ -60,7 +73,21 @@ class Manager(object):
 		return re.search(unit.uname_regex, uname_string,
 				re.MULTILINE) is not None
 
-	def create(self, instances_config):
+	def parse_update_interval(self, instance_name, value):
+		"""Convert the update_interval unit option to seconds, None means the global interval."""
+		if value is None:
+			return None
+		try:
+			interval = float(value)
+		except ValueError:
+			interval = 0
+		if not math.isfinite(interval) or interval <= 0:
+			log.error("instance '%s': invalid update_interval '%s', using the global update interval"
+					% (instance_name, value))
+			return None
+		return interval
+
+	def _enabled_units(self, instances_config):
 		instance_info_list = []
 		for instance_name, instance_info in list(instances_config.items()):
 			if not instance_info.enabled:
@@ -80,11 +107,19 @@ class Manager(object):
 			instance_info_list.append(instance_info)
 
 		instance_info_list.sort(key=lambda x: x.priority)
+		return instance_info_list
+
+	def _create_instances(self, instance_info_list):
 		plugins_by_name = collections.OrderedDict()
+		for plugin in self._plugins:
+			plugins_by_name[plugin.name] = plugin
 		for instance_info in instance_info_list:
-			plugins_by_name[instance_info.type] = None
+			if instance_info.type not in plugins_by_name:
+				plugins_by_name[instance_info.type] = None
 
-		for plugin_name, none in list(plugins_by_name.items()):
+		for plugin_name, plugin in list(plugins_by_name.items()):
+			if plugin is not None:
+				continue
 			try:
 				plugin = self._plugins_repository.create(plugin_name)
 				plugins_by_name[plugin_name] = plugin
@@ -106,16 +141,79 @@ class Manager(object):
 			new_instance = plugin.create_instance(instance_info.name, instance_info.priority, \
 				instance_info.devices, instance_info.devices_udev_regex, \
 				instance_info.script_pre, instance_info.script_post, instance_info.options)
+			new_instance.update_interval = self.parse_update_interval(instance_info.name,
+				instance_info.update_interval)
 			instances.append(new_instance)
 		for instance in instances:
 			instance.plugin.init_devices()
 			instance.plugin.assign_free_devices(instance)
 			instance.plugin.initialize_instance(instance)
+		return instances
+
+	def create(self, instances_config):
+		instances = self._create_instances(self._enabled_units(instances_config))
 		# At this point we should be able to start the HW events
 		# monitoring/processing thread, without risking race conditions
 		self._hardware_inventory.start_processing_events()
 		self._instances.extend(instances)
 
+	def _instance_matches_unit(self, instance, unit):
+		"""Check whether the instance can be switched to the unit in place."""
+		return instance.plugin.name == unit.type \
+				and instance.priority == unit.priority \
+				and instance.devices_expression == unit.devices \
+				and instance.devices_udev_regex == unit.devices_udev_regex \
+				and instance.script_pre == unit.script_pre \
+				and instance.script_post == unit.script_post
+
+	def switch(self, instances_config):
+		"""
+		Switch the applied instances to the units of another profile.
+
+		Instances which match the units of the new profile (by the name,
+		type, priority, devices and scripts) are kept and only their
+		changed options are rolled back and applied. The remaining
+		instances are unapplied with the full rollback and destroyed and
+		the instances of the new units are created and applied.
+		"""
+		self._hardware_inventory.stop_processing_events()
+		units = self._enabled_units(instances_config)
+		units_by_name = dict([(unit.name, unit) for unit in units])
+		kept = {}
+		removed = []
+		for instance in self._instances:
+			unit = units_by_name.get(instance.name)
+			if unit is not None and self._instance_matches_unit(instance, unit) \
+					and self._try_call("switch", False, instance.plugin.instance_retune,
+						instance, unit.options):
+				instance.update_interval = self.parse_update_interval(unit.name,
+					unit.update_interval)
+				kept[instance.name] = instance
+			else:
+				removed.append(instance)
+
+		for instance in reversed(removed):
+			log.debug("removing instance %s" % instance.name)
+			self._try_call("switch", None, instance.unapply_tuning, consts.ROLLBACK_FULL)
+			self._try_call("switch", None, instance.plugin.destroy_instance, instance)
+			self._instances.remove(instance)
+		used_plugins = set([instance.plugin for instance in self._instances])
+		for plugin in [plugin for plugin in self._plugins if plugin not in used_plugins]:
+			log.debug("cleaning plugin '%s'" % plugin.name)
+			self._try_call("switch", None, self._plugins_repository.delete, plugin)
+			self._plugins.remove(plugin)
+
+		instances = self._create_instances([unit for unit in units if unit.name not in kept])
+		self._call_instances_parallel("switch", instances,
+				operator.methodcaller("apply_tuning"))
+		self._hardware_inventory.start_processing_events()
+		self._instances.extend(instances)
+		self._instances.sort(key=lambda instance: instance.priority)
+		if self._def_update_interval is not None:
+			self.schedule_updates(self._def_update_interval)
+		log.info("profile switched, %d instance(s) kept, %d removed, %d created"
+				% (len(kept), len(removed), len(instances)))
+
 	def _try_call(self, caller, exc_ret, f, *args, **kwargs):
 		try:
 			return f(*args, **kwargs)
@@ -138,16 +236,65 @@ class Manager(object):
 		self._plugins_repository.plugins.clear()
 		del self._plugins[:]
 		del self._instances[:]
+		del self._update_schedule[:]
+		self._scheduled_instances.clear()
+
+	def update_monitors(self, instances = None):
+		"""
+		Update the monitors of the instances, all monitors if instances
+		is None.
+		"""
+		monitors = None
+		if instances is not None:
+			monitors = [instance.load_monitor for instance in instances
+					if instance.load_monitor is not None]
+			if not monitors:
+				return
+		self._try_call("update_monitors", None,
+				self._monitors_repository.update, monitors)
+
+	def _instance_groups(self, instances):
+		"""
+		Split the instances into tiers of the same priority (keeping
+		their order) and each tier into groups processed concurrently.
+		The instances of the plugins with parallel_apply get per-plugin
+		groups, the instances of the other plugins may touch the same
+		resources, so they form one group processed sequentially.
+		"""
+		tiers = []
+		for priority, tier in itertools.groupby(instances, key=lambda instance: instance.priority):
+			groups = collections.OrderedDict()
+			for instance in tier:
+				key = instance.plugin if getattr(instance.plugin, "parallel_apply", False) else None
+				groups.setdefault(key, []).append(instance)
+			tiers.append(list(groups.values()))
+		return tiers
+
+	def _call_instances(self, caller, instances, f):
+		for instance in instances:
+			self._try_call(caller, None, f, instance)
 
-	def update_monitors(self):
-		for monitor in self._monitors_repository.monitors:
-			log.debug("updating monitor %s" % monitor)
-			self._try_call("update_monitors", None, monitor.update)
+	def _call_instances_parallel(self, caller, instances, f):
+		"""
+		Call f(instance) for all instances. With apply_threads > 1 the
+		groups of each priority tier (see _instance_groups) run
+		concurrently and the next tier starts after the previous one
+		completes.
+		"""
+		if self._apply_threads <= 1:
+			self._call_instances(caller, instances, f)
+			return
+		with ThreadPoolExecutor(max_workers=self._apply_threads) as executor:
+			for tier in self._instance_groups(instances):
+				if len(tier) == 1:
+					self._call_instances(caller, tier[0], f)
+					continue
+				wait([executor.submit(self._call_instances, caller, group, f)
+						for group in tier])
 
 	def start_tuning(self):
-		for instance in self._instances:
-			self._try_call("start_tuning", None,
-					instance.apply_tuning)
+		self._call_instances_parallel("start_tuning", self._instances,
+				operator.methodcaller("apply_tuning"))
 
 	def verify_tuning(self, ignore_missing):
 		ret = True
@@ -163,6 +310,66 @@ class Manager(object):
 			self._try_call("update_tuning", None,
 					instance.update_tuning)
 
+	def _schedule(self, instance, deadline):
+		heapq.heappush(self._update_schedule,
+				(deadline, next(self._update_schedule_seq), instance))
+		self._scheduled_instances.add(instance)
+
+	def _schedule_new_instances(self, now):
+		for instance in self._instances:
+			if instance.has_dynamic_tuning and instance not in self._scheduled_instances:
+				interval = instance.update_interval or self._def_update_interval
+				self._schedule(instance, now + interval)
+
+	def schedule_updates(self, update_interval):
+		"""
+		Start scheduling dynamic tuning of the instances. Each instance is
+		updated in its own update_interval, update_interval is used for
+		instances which do not set it.
+		"""
+		self._def_update_interval = update_interval
+		del self._update_schedule[:]
+		self._scheduled_instances.clear()
+		self._schedule_new_instances(time.monotonic())
+
+	def next_update_deadline(self):
+		"""Return time.monotonic() time of the nearest scheduled update or None."""
+		if not self._update_schedule:
+			return None
+		return self._update_schedule[0][0]
+
+	def update_scheduled(self, now = None):
+		"""
+		Update the monitors and the dynamic tuning of the instances whose
+		update deadline expired and schedule their next update. Instances
+		created after schedule_updates() are scheduled here as well.
+		"""
+		if now is None:
+			now = time.monotonic()
+		due = {}
+		while self._update_schedule and self._update_schedule[0][0] <= now:
+			deadline, _, instance = heapq.heappop(self._update_schedule)
+			self._scheduled_instances.discard(instance)
+			due[instance] = deadline
+		# keep the priority order and skip the destroyed instances
+		due_instances = [instance for instance in self._instances if instance in due]
+		if due_instances:
+			# the monitors used by other instances are refreshed
+			# in their own update intervals
+			self.update_monitors(due_instances)
+			for instance in due_instances:
+				self._try_call("update_tuning", None,
+						instance.update_tuning)
+		# the next deadline is advanced from the expired one, so the late
+		# wakeups do not accumulate, the updates missed meanwhile are skipped
+		for instance in due_instances:
+			interval = instance.update_interval or self._def_update_interval
+			deadline = due[instance] + interval
+			if deadline <= now:
+				deadline = now + interval
+			self._schedule(instance, deadline)
+		self._schedule_new_instances(now)
+
 	# rollback parameter is a helper telling plugins whether soft or full
 	# rollback is needed, e.g. for bootloader plugin we need grub.cfg
 	# tuning to persist across reboots and restarts of the daemon, so in
@@ -173,6 +380,5 @@ class Manager(object):
 	# or helper files, unpatch third party config files, etc.
 	def stop_tuning(self, rollback = consts.ROLLBACK_SOFT):
 		self._hardware_inventory.stop_processing_events()
-		for instance in reversed(self._instances):
-			self._try_call("stop_tuning", None,
-					instance.unapply_tuning, rollback)
+		self._call_instances_parallel("stop_tuning", list(reversed(self._instances)),
+				operator.methodcaller("unapply_tuning", rollback))
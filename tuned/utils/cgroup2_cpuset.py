@@ -0,0 +1,119 @@
+import os
+import collections
+import tuned.logs
+from tuned.utils.commands import commands
+
+log = tuned.logs.get()
+
+__all__ = ["CgroupV2Cpuset"]
+
+class CgroupV2Cpuset(object):
+	"""
+	Confinement of tasks by the cpuset controller of the cgroups v2
+	unified hierarchy.
+
+	Instead of setting the affinity of every task, the housekeeping CPUs
+	are written once to the 'cpuset.cpus' of every top level cgroup, the
+	kernel then moves all the tasks of the subtree. Only the tasks of the
+	root cgroup (kernel threads and tasks not managed by a service
+	manager) have to be tuned one by one.
+
+	The original state returned by backup() is proportional to the
+	number of the top level cgroups, not to the number of the tasks.
+	"""
+
+	def __init__(self, mount_point):
+		self._mount_point = mount_point
+		self._cmd = commands()
+
+	def _path(self, *names):
+		return "/".join((self._mount_point,) + names)
+
+	def available(self):
+		"""Check whether the cpuset controller is available in the hierarchy."""
+		controllers = self._cmd.read_file(self._path("cgroup.controllers"),
+				no_error = True)
+		return "cpuset" in controllers.split()
+
+	def _top_dirs(self):
+		try:
+			names = sorted(os.listdir(self._mount_point))
+		except OSError as e:
+			log.error("Unable to list cgroups in '%s': %s" % (self._mount_point, e))
+			return []
+		return [name for name in names if os.path.isdir(self._path(name))]
+
+	def top_groups(self):
+		return [name for name in self._top_dirs()
+				if os.path.isfile(self._path(name, "cpuset.cpus"))]
+
+	def root_pids(self):
+		"""Return the set of PIDs of the root cgroup, None on error."""
+		data = self._cmd.read_file(self._path("cgroup.procs"), err_ret = None,
+				no_error = True)
+		if data is None:
+			return None
+		return set(int(pid) for pid in data.split())
+
+	def backup(self):
+		"""
+		Record the cpusets of all the top level cgroups and whether the
+		cpuset controller has to be enabled for the children of the root
+		cgroup. Nothing is changed, so the state can be stored before
+		apply().
+
+		Return the original state for apply() and restore() or None if
+		the cpuset controller cannot be used.
+		"""
+		subtree = self._cmd.read_file(self._path("cgroup.subtree_control"),
+				err_ret = None, no_error = True)
+		if subtree is None:
+			return None
+		enable = "cpuset" not in subtree.split()
+		original = {"subtree_control": enable,
+				"cpus": collections.OrderedDict()}
+		# the cgroups get their cpusets when the controller is enabled,
+		# the cpusets are empty then, i.e. all the CPUs of the parent
+		for name in (self._top_dirs() if enable else self.top_groups()):
+			orig = self._cmd.read_file(self._path(name, "cpuset.cpus"),
+					err_ret = "" if enable else None, no_error = True)
+			if orig is not None:
+				original["cpus"][name] = orig.strip()
+		return original
+
+	def apply(self, original, cpus):
+		"""
+		Enable the cpuset controller if needed and write the cpulist
+		string cpus to the cgroups of the original state. Return False
+		if the controller cannot be enabled.
+		"""
+		if original["subtree_control"]:
+			subtree_path = self._path("cgroup.subtree_control")
+			if not self._cmd.write_to_file(subtree_path, "+cpuset", no_error = True):
+				log.error("Unable to enable the cpuset controller in '%s'" % subtree_path)
+				return False
+		for name in original["cpus"]:
+			# the cgroup could be removed meanwhile
+			if not os.path.isfile(self._path(name, "cpuset.cpus")):
+				continue
+			log.debug("Setting cgroup '%s' cpuset to '%s'" % (name, cpus))
+			if not self._cmd.write_to_file(self._path(name, "cpuset.cpus"),
+					cpus, no_error = True):
+				log.error("Unable to set affinity '%s' for cgroup '%s'" % (cpus, name))
+		return True
+
+	def restore(self, original):
+		"""Restore the state returned by backup()."""
+		for name, cpus in reversed(list(original["cpus"].items())):
+			if not os.path.isfile(self._path(name, "cpuset.cpus")):
+				continue
+			log.debug("Restoring cgroup '%s' cpuset to '%s'" % (name, cpus))
+			# an empty cpuset means all the CPUs of the parent, an empty
+			# write would not reach the kernel
+			if not self._cmd.write_to_file(self._path(name, "cpuset.cpus"),
+					cpus if cpus else "\n", no_error = True):
+				log.error("Unable to restore affinity '%s' for cgroup '%s'" % (cpus, name))
+		if original["subtree_control"]:
+			subtree_path = self._path("cgroup.subtree_control")
+			if not self._cmd.write_to_file(subtree_path, "-cpuset", no_error = True):
+				log.error("Unable to disable the cpuset controller in '%s'" % subtree_path)
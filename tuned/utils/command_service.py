@@ -0,0 +1,121 @@
+import contextlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import tuned.consts as consts
+import tuned.logs
+from tuned.utils.commands import commands
+
+log = tuned.logs.get()
+
+__all__ = ["CommandService"]
+
+class CommandService(object):
+	"""
+	Execution of external commands with caching of read-only queries and
+	concurrent execution.
+
+	Results of queries executed with cache = True are remembered within
+	a cycle (see cycle()), e.g. 'ethtool -k eth0' runs once per apply
+	even if more options of the device need it. Commands changing the
+	state of an object have to be followed by invalidate() of the object,
+	so the next query sees the new state. Outside of a cycle nothing is
+	cached.
+
+	execute_many() and prefetch() run the commands concurrently in a pool
+	of max_workers threads, the threads mostly wait for the children.
+	"""
+
+	def __init__(self, cmd = None, max_workers = None):
+		if cmd is None:
+			cmd = commands()
+		self._cmd = cmd
+		if max_workers is None:
+			max_workers = consts.COMMAND_SERVICE_WORKERS
+		self._max_workers = max_workers
+		self._pool = None
+		self._lock = threading.Lock()
+		self._cache = None
+		self._cycles = 0
+
+	def _key(self, args, kwargs):
+		return (tuple(args), tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+
+	@contextlib.contextmanager
+	def cycle(self):
+		"""Context in which the query results are cached, it can be nested."""
+		with self._lock:
+			if self._cycles == 0:
+				self._cache = {}
+			self._cycles += 1
+		try:
+			yield self
+		finally:
+			with self._lock:
+				self._cycles -= 1
+				if self._cycles == 0:
+					self._cache = None
+
+	def execute(self, args, cache = False, **kwargs):
+		"""Execute the command, see commands.execute() for kwargs."""
+		if not cache:
+			return self._cmd.execute(args, **kwargs)
+		return self.cached(args, lambda: self._cmd.execute(args, **kwargs), **kwargs)
+
+	def cached(self, args, func, **kwargs):
+		"""
+		Return the result of func() cached within a cycle, args and kwargs
+		identify the query, e.g. a query not executing any command.
+		"""
+		key = self._key(args, kwargs)
+		with self._lock:
+			if self._cache is not None and key in self._cache:
+				log.debug("Using cached result of %s." % str(args))
+				return self._cache[key]
+		res = func()
+		with self._lock:
+			if self._cache is not None:
+				self._cache[key] = res
+		return res
+
+	def invalidate(self, token = None):
+		"""
+		Drop the cached results of the commands having token as an
+		argument, all the results if token is None.
+		"""
+		with self._lock:
+			if self._cache is None:
+				return
+			if token is None:
+				self._cache.clear()
+				return
+			for key in [key for key in self._cache if token in key[0]]:
+				del self._cache[key]
+
+	def _get_pool(self):
+		with self._lock:
+			if self._pool is None:
+				self._pool = ThreadPoolExecutor(max_workers = self._max_workers)
+			return self._pool
+
+	def execute_many(self, args_list, cache = False, **kwargs):
+		"""Execute the commands concurrently, return the list of results."""
+		args_list = list(args_list)
+		if len(args_list) <= 1 or self._max_workers <= 1:
+			return [self.execute(args, cache = cache, **kwargs) for args in args_list]
+		pool = self._get_pool()
+		futures = [pool.submit(self.execute, args, cache, **kwargs) for args in args_list]
+		return [future.result() for future in futures]
+
+	def prefetch(self, args_list, **kwargs):
+		"""Cache the results of the queries, only within a cycle."""
+		with self._lock:
+			if self._cache is None:
+				return
+		self.execute_many(args_list, cache = True, **kwargs)
+
+	def shutdown(self):
+		with self._lock:
+			pool = self._pool
+			self._pool = None
+		if pool is not None:
+			pool.shutdown(wait = True)
@@ -8,6 +8,7 @@ import tuned.consts as consts
 import re
 from subprocess import *
 from tuned.exceptions import TunedException
+from tuned.utils.cpu_set import CpuSet
 
 log = tuned.logs.get()
 
@@ -74,7 +75,8 @@ class commands:
 				return s
 		if r is None:
 			r = self.re_lookup_compile(d)
-		return r.sub(lambda mo: list(d.values())[mo.lastindex - 1], s, flags)
+		values = list(d.values())
+		return r.sub(lambda mo: values[mo.lastindex - 1], s, flags)
 
 	# Do regex lookup on 's' according to lookup table described by
 	# dictionary 'd' and return corresponding value from the dictionary,
@@ -286,24 +288,11 @@ class commands:
 	def hex2cpulist(self, mask):
 		if mask is None:
 			return None
-		mask = str(mask).replace(",", "")
-		try:
-			m = int(mask, 16)
-		except ValueError:
-			log.error("invalid hexadecimal mask '%s'" % str(mask))
-			return []
-		return self.bitmask2cpulist(m)
+		return list(CpuSet.from_hex(str(mask)))
 
 	# Converts an integer bitmask to a list of cpus (e.g. [0,3,4])
 	def bitmask2cpulist(self, mask):
-		cpu = 0
-		cpus = []
-		while mask > 0:
-			if mask & 1:
-				cpus.append(cpu)
-			mask >>= 1
-			cpu += 1
-		return cpus
+		return list(CpuSet(mask))
 
 	# Unpacks CPU list, i.e. 1-3 will be converted to 1, 2, 3, supports
 	# hexmasks that needs to be prefixed by "0x". Hexmasks can have commas,
@@ -315,120 +304,44 @@ class commands:
 	# It should be string with list of chars that is send to string.strip method
 	# Default is english single and double quotes ("') rhbz#1891036
 	def cpulist_unpack(self, l, strip_chars='\'"'):
-		rl = []
-		if l is None:
+		cpus = self.cpuset(l, strip_chars)
+		if cpus is None:
+			return None
+		return list(cpus)
+
+	# Returns the CpuSet of the CPU list, see cpulist_unpack about the
+	# syntax. The parsed CPU lists are cached.
+	def cpuset(self, l, strip_chars='\'"'):
+		if isinstance(l, CpuSet):
 			return l
-		ll = l
-		if type(ll) is not list:
-			if strip_chars is not None:
-				ll = str(ll).strip(strip_chars)
-			ll = str(ll).split(",")
-		ll2 = []
-		negation_list = []
-		hexmask = False
-		hv = ""
-		# Remove commas from hexmasks
-		for v in ll:
-			sv = str(v)
-			if hexmask:
-				if len(sv) == 0:
-					hexmask = False
-					ll2.append(hv)
-					hv = ""
-				else:
-					hv += sv
-			else:
-				if sv[0:2].lower() == "0x":
-					hexmask = True
-					hv = sv
-				elif sv and (sv[0] == "^" or sv[0] == "!"):
-					nl = sv[1:].split("-")
-					try:
-						if (len(nl) > 1):
-							negation_list += list(range(
-								int(nl[0]),
-								int(nl[1]) + 1
-								)
-							)
-						else:
-							negation_list.append(int(sv[1:]))
-					except ValueError:
-						return []
-				else:
-					if len(sv) > 0:
-						ll2.append(sv)
-		if len(hv) > 0:
-			ll2.append(hv)
-		for v in ll2:
-			vl = v.split("-")
-			if v[0:2].lower() == "0x":
-				rl += self.hex2cpulist(v)
-			else:
-				try:
-					if len(vl) > 1:
-						rl += list(range(int(vl[0]), int(vl[1]) + 1))
-					else:
-						rl.append(int(vl[0]))
-				except ValueError:
-					return []
-		cpu_list = sorted(list(set(rl)))
-
-		# Remove negated cpus after expanding
-		for cpu in negation_list:
-			if cpu in cpu_list:
-				cpu_list.remove(cpu)
-		return cpu_list
+		return CpuSet.parse(l, strip_chars)
 
 	# Packs CPU list, i.e. 1, 2, 3  will be converted to 1-3. It unpacks the
 	# CPU list through cpulist_unpack first, so see its description about the
 	# details of the input syntax
 	def cpulist_pack(self, l):
-		l = self.cpulist_unpack(l)
-		if l is None or len(l) == 0:
-			return l
-		i = 0
-		j = i
-		rl = []
-		while i + 1 < len(l):
-			if l[i + 1] - l[i] != 1:
-				if j != i:
-					rl.append(str(l[j]) + "-" + str(l[i]))
-				else:
-					rl.append(str(l[i]))
-				j = i + 1
-			i += 1
-		if j + 1 < len(l):
-			rl.append(str(l[j]) + "-" + str(l[-1]))
-		else:
-			rl.append(str(l[-1]))
-		return rl
+		cpus = self.cpuset(l)
+		if cpus is None:
+			return None
+		return cpus.pack()
 
 	# Inverts CPU list (i.e. makes its complement)
 	def cpulist_invert(self, l):
-		cpus = self.cpulist_unpack(l)
-		online = self.cpulist_unpack(self.read_file("/sys/devices/system/cpu/online"))
-		return list(set(online) - set(cpus))
+		cpus = self.cpuset(l)
+		online = self.cpuset(self.read_file("/sys/devices/system/cpu/online"))
+		return list(online - cpus)
 
 	# Converts CPU list to hexadecimal CPU mask
 	def cpulist2hex(self, l):
 		if l is None:
 			return None
-		ul = self.cpulist_unpack(l)
-		if ul is None:
+		cpus = self.cpuset(l)
+		if cpus is None:
 			return None
-		m = self.cpulist2bitmask(ul)
-		s = "%x" % m
-		ls = len(s)
-		if ls % 8 != 0:
-			ls += 8 - ls % 8
-		s = s.zfill(ls)
-		return ",".join(s[i:i + 8] for i in range(0, len(s), 8))
+		return cpus.to_hex()
 
 	def cpulist2bitmask(self, l):
-		m = 0
-		for v in l:
-			m |= pow(2, v)
-		return m
+		return CpuSet.from_list(l).mask
 
 	def cpulist2string(self, l, prefix = ""):
 		return ",".join((prefix + str(v)) for v in l)
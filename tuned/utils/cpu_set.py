@@ -0,0 +1,181 @@
+import functools
+import tuned.logs
+
+log = tuned.logs.get()
+
+__all__ = ["CpuSet"]
+
+# number of distinct CPU lists whose parsing results are remembered
+PARSE_CACHE_SIZE = 1024
+
+def _range_mask(first, last):
+	if last < first:
+		return 0
+	return ((1 << (last + 1)) - 1) ^ ((1 << first) - 1)
+
+def _hex_mask(s):
+	try:
+		mask = int(s.replace(",", ""), 16)
+	except ValueError:
+		log.error("invalid hexadecimal mask '%s'" % s)
+		return 0
+	return mask if mask > 0 else 0
+
+class CpuSet(object):
+	"""
+	Immutable set of CPUs backed by an integer bitmask, bit N set means
+	that CPU N is in the set.
+
+	Set operations, membership tests and conversions to hexadecimal masks
+	work on the bitmask, so they do not depend on the number of CPUs in a
+	Python loop. Iteration yields the CPUs in the increasing order.
+	"""
+
+	__slots__ = ["_mask"]
+
+	def __init__(self, mask = 0):
+		self._mask = mask if mask > 0 else 0
+
+	@classmethod
+	def from_list(cls, cpus):
+		mask = 0
+		for cpu in cpus:
+			mask |= 1 << int(cpu)
+		return cls(mask)
+
+	@classmethod
+	def from_hex(cls, s):
+		"""Create the set from a hexadecimal mask, commas are ignored."""
+		return cls(_hex_mask(s))
+
+	@classmethod
+	def parse(cls, l, strip_chars = '\'"'):
+		"""
+		Parse the CPU list syntax described at commands.cpulist_unpack(),
+		l can be a string or a list of its comma separated items. Return
+		None if l is None.
+
+		The results are cached, the same CPU lists are parsed repeatedly
+		by the plugins and profile functions.
+		"""
+		if l is None:
+			return None
+		if type(l) is not list:
+			if strip_chars is not None:
+				l = str(l).strip(strip_chars)
+			l = str(l).split(",")
+		return _parse_tokens(tuple(str(v) for v in l))
+
+	@property
+	def mask(self):
+		return self._mask
+
+	def __len__(self):
+		return bin(self._mask).count("1")
+
+	def __iter__(self):
+		# the binary string is reversed, so index N is bit N
+		bits = bin(self._mask)[:1:-1]
+		return (cpu for cpu, bit in enumerate(bits) if bit == "1")
+
+	def __contains__(self, cpu):
+		return cpu >= 0 and (self._mask >> cpu) & 1 == 1
+
+	def __bool__(self):
+		return self._mask != 0
+
+	__nonzero__ = __bool__
+
+	def __eq__(self, other):
+		return isinstance(other, CpuSet) and self._mask == other._mask
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __hash__(self):
+		return hash(self._mask)
+
+	def __or__(self, other):
+		return CpuSet(self._mask | other._mask)
+
+	def __and__(self, other):
+		return CpuSet(self._mask & other._mask)
+
+	def __sub__(self, other):
+		return CpuSet(self._mask & ~other._mask)
+
+	def __repr__(self):
+		return "CpuSet('%s')" % ",".join(self.pack())
+
+	def to_list(self):
+		return list(self)
+
+	def pack(self):
+		"""Return the list of ranges, e.g. ["0-1", "3-6", "32"]."""
+		ranges = []
+		mask = self._mask
+		while mask:
+			low = mask & -mask
+			# adding the lowest set bit clears the lowest run of ones
+			rest = mask & (mask + low)
+			first = low.bit_length() - 1
+			last = (mask ^ rest).bit_length() - 1
+			ranges.append(str(first) if first == last else "%d-%d" % (first, last))
+			mask = rest
+		return ranges
+
+	def to_hex(self):
+		"""Return the mask in the format of /proc/irq/*/smp_affinity."""
+		s = "%x" % self._mask
+		ls = len(s)
+		if ls % 8 != 0:
+			ls += 8 - ls % 8
+		s = s.zfill(ls)
+		return ",".join(s[i:i + 8] for i in range(0, len(s), 8))
+
+@functools.lru_cache(maxsize = PARSE_CACHE_SIZE)
+def _parse_tokens(tokens):
+	items = []
+	negated = 0
+	hexmask = False
+	hv = ""
+	# join the comma separated parts of hexmasks
+	for sv in tokens:
+		if hexmask:
+			if len(sv) == 0:
+				hexmask = False
+				items.append(hv)
+				hv = ""
+			else:
+				hv += sv
+		else:
+			if sv[0:2].lower() == "0x":
+				hexmask = True
+				hv = sv
+			elif sv and (sv[0] == "^" or sv[0] == "!"):
+				nl = sv[1:].split("-")
+				try:
+					if len(nl) > 1:
+						negated |= _range_mask(int(nl[0]), int(nl[1]))
+					else:
+						negated |= 1 << int(sv[1:])
+				except ValueError:
+					return CpuSet()
+			elif len(sv) > 0:
+				items.append(sv)
+	if len(hv) > 0:
+		items.append(hv)
+	mask = 0
+	for v in items:
+		if v[0:2].lower() == "0x":
+			mask |= _hex_mask(v)
+			continue
+		vl = v.split("-")
+		try:
+			if len(vl) > 1:
+				mask |= _range_mask(int(vl[0]), int(vl[1]))
+			else:
+				mask |= 1 << int(vl[0])
+		except ValueError:
+			return CpuSet()
+	return CpuSet(mask & ~negated)
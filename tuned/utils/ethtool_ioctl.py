@@ -0,0 +1,93 @@
+import array
+import fcntl
+import socket
+import struct
+import threading
+
+__all__ = ["EthtoolIoctl"]
+
+# include/uapi/linux/sockios.h
+SIOCETHTOOL = 0x8946
+# include/uapi/linux/ethtool.h
+ETHTOOL_GRINGPARAM = 0x00000010
+ETHTOOL_SRINGPARAM = 0x00000011
+ETHTOOL_GCHANNELS = 0x0000003c
+ETHTOOL_SCHANNELS = 0x0000003d
+IFNAMSIZ = 16
+
+class EthtoolIoctl(object):
+	"""
+	Getting and setting of the ring and channel parameters of network
+	devices by the SIOCETHTOOL ioctl, without executing ethtool.
+
+	The parameters use the names and string values of the parsed output
+	of 'ethtool -g' and 'ethtool -l'. All the methods raise EnvironmentError
+	(e.g. EOPNOTSUPP) if the ioctl fails, the callers are expected to fall
+	back to ethtool then.
+	"""
+
+	# struct ethtool_ringparam: cmd, maximums, current values
+	_RING_PARAMS = ["rx", "rx-mini", "rx-jumbo", "tx"]
+	# struct ethtool_channels: cmd, maximums, current values
+	_CHANNELS_PARAMS = ["rx", "tx", "other", "combined"]
+
+	def __init__(self):
+		self._sock = None
+		self._lock = threading.Lock()
+
+	def _ioctl(self, device, data):
+		"""Call the ioctl with the u32 array data, updated in place."""
+		with self._lock:
+			if self._sock is None:
+				self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+			addr = data.buffer_info()[0]
+			ifr = struct.pack("%dsP16x" % IFNAMSIZ, device.encode("utf-8")[:IFNAMSIZ - 1], addr)
+			fcntl.ioctl(self._sock.fileno(), SIOCETHTOOL, ifr)
+
+	def _get(self, device, cmd, names):
+		data = array.array("I", [cmd] + [0] * (2 * len(names)))
+		self._ioctl(device, data)
+		return data
+
+	def _set(self, device, get_cmd, set_cmd, names, params):
+		data = self._get(device, get_cmd, names)
+		current = 1 + len(names)
+		for name, value in params.items():
+			data[current + names.index(name)] = int(value)
+		data[0] = set_cmd
+		self._ioctl(device, data)
+
+	def _check(self, params, names):
+		unknown = set(params) - set(names)
+		if unknown:
+			raise ValueError("unknown parameter(s): %s" % ", ".join(sorted(unknown)))
+
+	def get_ring(self, device):
+		data = self._get(device, ETHTOOL_GRINGPARAM, self._RING_PARAMS)
+		current = 1 + len(self._RING_PARAMS)
+		# ethtool shows the rings without maximum as 'n/a'
+		return dict((name, str(data[current + i]) if data[1 + i] else "n/a")
+				for i, name in enumerate(self._RING_PARAMS))
+
+	def set_ring(self, device, params):
+		self._check(params, self._RING_PARAMS)
+		self._set(device, ETHTOOL_GRINGPARAM, ETHTOOL_SRINGPARAM,
+				self._RING_PARAMS, params)
+
+	def get_channels(self, device):
+		data = self._get(device, ETHTOOL_GCHANNELS, self._CHANNELS_PARAMS)
+		current = 1 + len(self._CHANNELS_PARAMS)
+		# ethtool shows the channels without maximum as 'n/a'
+		return dict((name, str(data[current + i]) if data[1 + i] else "n/a")
+				for i, name in enumerate(self._CHANNELS_PARAMS))
+
+	def set_channels(self, device, params):
+		self._check(params, self._CHANNELS_PARAMS)
+		self._set(device, ETHTOOL_GCHANNELS, ETHTOOL_SCHANNELS,
+				self._CHANNELS_PARAMS, params)
+
+	def close(self):
+		with self._lock:
+			if self._sock is not None:
+				self._sock.close()
+				self._sock = None
@@ -0,0 +1,148 @@
+import errno
+import heapq
+import itertools
+import os
+import selectors
+import threading
+import time
+import tuned.logs
+
+log = tuned.logs.get()
+
+__all__ = ["EventLoop"]
+
+class _Timer(object):
+	__slots__ = ["deadline", "callback", "cancelled"]
+
+	def __init__(self, deadline, callback):
+		self.deadline = deadline
+		self.callback = callback
+		self.cancelled = False
+
+	def cancel(self):
+		self.cancelled = True
+
+class EventLoop(object):
+	"""
+	Selector based event loop multiplexing file descriptors and timers.
+
+	The loop sleeps until one of the registered file descriptors becomes
+	readable, the nearest timer deadline expires or wakeup() is called
+	(from another thread or from a signal handler). There is no periodic
+	polling, so an idle loop causes no wakeups at all.
+
+	File descriptors can be (un)registered only from the thread running
+	the loop, timers and wakeup() can be used from any thread.
+	"""
+
+	def __init__(self):
+		self._selector = selectors.DefaultSelector()
+		self._timers = []
+		self._timers_seq = itertools.count()
+		self._timers_lock = threading.Lock()
+		self._wakeup_rfd, self._wakeup_wfd = os.pipe()
+		os.set_blocking(self._wakeup_rfd, False)
+		os.set_blocking(self._wakeup_wfd, False)
+		self._selector.register(self._wakeup_rfd, selectors.EVENT_READ, None)
+
+	def close(self):
+		self._selector.close()
+		os.close(self._wakeup_rfd)
+		os.close(self._wakeup_wfd)
+
+	def register_fd(self, fileobj, callback):
+		"""Call callback() every time fileobj becomes readable."""
+		try:
+			self._selector.register(fileobj, selectors.EVENT_READ, callback)
+		except KeyError:
+			self._selector.modify(fileobj, selectors.EVENT_READ, callback)
+
+	def unregister_fd(self, fileobj):
+		try:
+			self._selector.unregister(fileobj)
+		except (KeyError, ValueError):
+			pass
+
+	def registered_fds(self):
+		return [key.fileobj for key in self._selector.get_map().values()
+				if key.data is not None]
+
+	def call_at(self, deadline, callback):
+		"""Schedule callback() at the given time.monotonic() deadline.
+
+		Return:
+		timer handle, its cancel() method unschedules the callback
+		"""
+		timer = _Timer(deadline, callback)
+		with self._timers_lock:
+			heapq.heappush(self._timers, (deadline, next(self._timers_seq), timer))
+			first = self._timers[0][2] is timer
+		if first:
+			self.wakeup()
+		return timer
+
+	def call_later(self, delay, callback):
+		return self.call_at(time.monotonic() + delay, callback)
+
+	def wakeup(self):
+		"""Interrupt the loop sleep, safe to call from signal handlers."""
+		try:
+			os.write(self._wakeup_wfd, b"\0")
+		except OSError:
+			# the pipe is full (the loop will wake up anyway) or the
+			# loop was already closed
+			pass
+
+	def _drain_wakeup(self):
+		try:
+			while os.read(self._wakeup_rfd, 4096):
+				pass
+		except OSError as e:
+			if e.errno != errno.EAGAIN:
+				raise
+
+	def _next_timeout(self):
+		with self._timers_lock:
+			while self._timers and self._timers[0][2].cancelled:
+				heapq.heappop(self._timers)
+			if not self._timers:
+				return None
+			return max(0, self._timers[0][0] - time.monotonic())
+
+	def _pop_expired_timers(self):
+		now = time.monotonic()
+		expired = []
+		with self._timers_lock:
+			while self._timers and self._timers[0][0] <= now:
+				timer = heapq.heappop(self._timers)[2]
+				if not timer.cancelled:
+					expired.append(timer)
+		return expired
+
+	def _call(self, callback):
+		try:
+			callback()
+		except Exception as e:
+			log.error("Unhandled exception in event loop callback %s" % callback)
+			log.exception(e)
+
+	def run_once(self, timeout = None):
+		"""Wait for the first event (at most timeout seconds) and dispatch it."""
+		next_timeout = self._next_timeout()
+		if next_timeout is not None and (timeout is None or next_timeout < timeout):
+			timeout = next_timeout
+		for key, mask in self._selector.select(timeout):
+			if key.data is None:
+				self._drain_wakeup()
+			else:
+				self._call(key.data)
+		for timer in self._pop_expired_timers():
+			self._call(timer.callback)
+
+	def run(self, terminate):
+		"""Dispatch events until the terminate threading.Event is set.
+
+		Whoever sets the terminate event has to call wakeup() afterwards.
+		"""
+		while not terminate.is_set():
+			self.run_once()
@@ -0,0 +1,76 @@
+import errno
+import os
+import threading
+import tuned.logs
+
+log = tuned.logs.get()
+
+__all__ = ["CachedFileReader"]
+
+class CachedFileReader(object):
+	"""
+	Reader of small sysfs / procfs files which keeps the file descriptors
+	open between the reads and rereads the files by pread() from offset 0,
+	so periodic reads cost one syscall instead of open, read and close.
+
+	Descriptors of vanished files (e.g. removed devices) are dropped
+	automatically on read errors, invalidate() drops them explicitly.
+	"""
+
+	_chunk_size = 65536
+
+	def __init__(self):
+		self._fds = {}
+		self._lock = threading.Lock()
+
+	def _open(self, path):
+		fd = self._fds.get(path)
+		if fd is None:
+			fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+			self._fds[path] = fd
+		return fd
+
+	def _close(self, path):
+		fd = self._fds.pop(path, None)
+		if fd is not None:
+			try:
+				os.close(fd)
+			except OSError:
+				pass
+
+	def _pread_all(self, fd):
+		chunks = []
+		offset = 0
+		while True:
+			chunk = os.pread(fd, self._chunk_size, offset)
+			chunks.append(chunk)
+			if len(chunk) < self._chunk_size:
+				break
+			offset += len(chunk)
+		return b"".join(chunks)
+
+	def read(self, path, err_ret = None):
+		"""Read the whole file, return err_ret if it cannot be read."""
+		with self._lock:
+			# the second attempt reopens the file, the cached descriptor
+			# may belong to a file which was removed in the meantime
+			for attempt in range(2):
+				try:
+					fd = self._open(path)
+					return self._pread_all(fd).decode("utf-8", "replace")
+				except (OSError, IOError) as e:
+					self._close(path)
+					if attempt or e.errno == errno.ENOENT:
+						log.debug("Error when reading file '%s': '%s'" % (path, e))
+						return err_ret
+		return err_ret
+
+	def invalidate(self, prefix = None):
+		"""Close the descriptors of the files with the path prefix, all if None."""
+		with self._lock:
+			for path in list(self._fds):
+				if prefix is None or path.startswith(prefix):
+					self._close(path)
+
+	def close(self):
+		self.invalidate()
@@ -0,0 +1,188 @@
+import errno
+import tuned.consts as consts
+import tuned.logs
+from tuned.utils.cpu_set import CpuSet
+
+log = tuned.logs.get()
+
+__all__ = ["IrqAffinityTable", "IrqAffinityStats", "DEFAULT_IRQ"]
+
+# name of the pseudo IRQ of /proc/irq/default_smp_affinity
+DEFAULT_IRQ = "DEFAULT"
+
+# results of IrqAffinityTable.set()
+CHANGED = 0
+UNCHANGED = 1
+FAILED = -1
+UNCHANGEABLE = -2
+
+class IrqAffinityStats(object):
+	"""Lists of IRQs by the result of the writes to the table."""
+
+	def __init__(self):
+		self.changed = []
+		self.skipped = []
+		self.unchangeable = []
+		self.failed = []
+
+	def __str__(self):
+		return "%d changed, %d skipped, %d unchangeable, %d failed" % (
+				len(self.changed), len(self.skipped),
+				len(self.unchangeable), len(self.failed))
+
+class IrqAffinityTable(object):
+	"""
+	Table of the SMP affinities of all the IRQs listed in /proc/interrupts,
+	i.e. the IRQs with a handler, read in one pass of /proc/irq. The
+	affinities are kept as CpuSet bitmasks.
+
+	Without load() the affinities are read one by one when they are
+	first needed, e.g. for the hotplugged IRQs.
+
+	set() and apply() write only the affinities which differ from the
+	table, so the IRQs already having the target affinity cost no
+	syscalls. The written entries are invalidated and read again when
+	they are next needed, as the kernel may adjust the written affinity.
+	The results of the writes are collected in the stats attribute.
+
+	The table is not shared, every plugin loads its own table for one
+	apply, unapply or verify, as the affinities are changed by other
+	plugins and by irqbalance in the meantime.
+	"""
+
+	def __init__(self, irq_dir = None, interrupts_file = None):
+		if irq_dir is None:
+			irq_dir = "%s/irq" % consts.PROCFS_MOUNT_POINT
+		if interrupts_file is None:
+			interrupts_file = "%s/interrupts" % consts.PROCFS_MOUNT_POINT
+		self._irq_dir = irq_dir
+		self._interrupts_file = interrupts_file
+		self._masks = {}
+		# IRQs whose affinity has to be read again
+		self._invalid = set()
+		self._loaded = False
+		self.stats = IrqAffinityStats()
+
+	def _path(self, irq):
+		if irq == DEFAULT_IRQ:
+			return "%s/default_smp_affinity" % self._irq_dir
+		return "%s/%s/smp_affinity" % (self._irq_dir, irq)
+
+	def _read(self, irq):
+		try:
+			with open(self._path(irq), "r") as f:
+				return CpuSet.from_hex(f.readline().strip()).mask
+		except (OSError, IOError) as e:
+			log.debug("Failed to read SMP affinity of IRQ %s: %s" % (irq, e))
+			return None
+
+	def _list_irqs(self):
+		"""
+		Return the IRQ numbers of /proc/interrupts, /proc/irq contains
+		also the IRQs without a handler.
+		"""
+		irqs = []
+		try:
+			with open(self._interrupts_file, "r") as f:
+				# the first line is the header with the CPUs
+				f.readline()
+				for line in f:
+					irq = line.split(":", 1)[0].strip()
+					if irq.isdigit():
+						irqs.append(irq)
+		except (OSError, IOError) as e:
+			log.error("Failed to list IRQs in '%s': %s" % (self._interrupts_file, e))
+		return irqs
+
+	def load(self):
+		"""Read the affinities of all the IRQs and the default affinity."""
+		masks = {}
+		for name in self._list_irqs():
+			mask = self._read(name)
+			if mask is not None:
+				masks[name] = mask
+		mask = self._read(DEFAULT_IRQ)
+		if mask is not None:
+			masks[DEFAULT_IRQ] = mask
+		self._masks = masks
+		self._invalid.clear()
+		self._loaded = True
+		return self
+
+	def _get_mask(self, irq):
+		if irq in self._invalid or (irq not in self._masks and not self._loaded):
+			self._invalid.discard(irq)
+			mask = self._read(irq)
+			if mask is None:
+				self._masks.pop(irq, None)
+				return None
+			self._masks[irq] = mask
+		return self._masks.get(irq)
+
+	def irqs(self):
+		"""Return the IRQ numbers as strings sorted numerically."""
+		if not self._loaded:
+			self.load()
+		return sorted((irq for irq in self._masks if irq != DEFAULT_IRQ), key = int)
+
+	def get(self, irq):
+		"""Return the CpuSet of the affinity, None if it cannot be read."""
+		mask = self._get_mask(str(irq))
+		if mask is None:
+			return None
+		return CpuSet(mask)
+
+	def set(self, irq, cpus, restoring = False):
+		"""
+		Set the affinity of the IRQ to cpus (CpuSet or CPU list), unless
+		it already has it. Return CHANGED, UNCHANGED, UNCHANGEABLE (the
+		IRQ does not support changing the affinity) or FAILED.
+		"""
+		irq = str(irq)
+		if not isinstance(cpus, CpuSet):
+			cpus = CpuSet.from_list(cpus)
+		if self._get_mask(irq) == cpus.mask:
+			self.stats.skipped.append(irq)
+			return UNCHANGED
+		affinity_hex = cpus.to_hex()
+		if irq == DEFAULT_IRQ:
+			log.debug("Setting default SMP IRQ affinity to '%s'" % affinity_hex)
+		else:
+			log.debug("Setting SMP affinity of IRQ %s to '%s'" % (irq, affinity_hex))
+		try:
+			with open(self._path(irq), "w") as f:
+				f.write(affinity_hex)
+		except (OSError, IOError) as e:
+			# EIO is returned by
+			# kernel/irq/proc.c:write_irq_affinity() if changing
+			# the affinity is not supported
+			# (at least on kernels 3.10 and 4.18)
+			if hasattr(e, "errno") and e.errno == errno.EIO and not restoring:
+				log.debug("Setting SMP affinity of IRQ %s is not supported" % irq)
+				self.stats.unchangeable.append(irq)
+				return UNCHANGEABLE
+			log.error("Failed to set SMP affinity of IRQ %s to '%s': %s"
+					% (irq, affinity_hex, e))
+			self.stats.failed.append(irq)
+			return FAILED
+		self._masks[irq] = cpus.mask
+		self._invalid.add(irq)
+		self.stats.changed.append(irq)
+		return CHANGED
+
+	def apply(self, targets, restoring = False):
+		"""
+		Set the affinities of the IRQs from the targets dictionary
+		(IRQ -> CpuSet or CPU list), return the stats of this call.
+		"""
+		stats = self.stats
+		self.stats = IrqAffinityStats()
+		try:
+			for irq, cpus in targets.items():
+				self.set(irq, cpus, restoring)
+			result = self.stats
+		finally:
+			for name in ["changed", "skipped", "unchangeable", "failed"]:
+				getattr(stats, name).extend(getattr(self.stats, name))
+			self.stats = stats
+		return result
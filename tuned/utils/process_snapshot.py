@@ -0,0 +1,137 @@
+import errno
+import os
+import tuned.consts as consts
+
+__all__ = ["ProcessSnapshot", "ProcessInfo", "format_cmdline"]
+
+# include/linux/sched.h
+PF_KTHREAD = 0x00200000
+
+def format_cmdline(data, comm, kthread):
+	"""
+	Format the content of /proc/PID/cmdline as procfs.process_cmdline()
+	does: the first line split by NUL without the part after the last
+	NUL, joined by spaces, the comm if there are no arguments. The cmdline
+	of kernel threads is in square brackets.
+	"""
+	args = data.split("\n", 1)[0].strip().split("\0")[:-1]
+	cmdline = " ".join(args).strip() if args else comm
+	if kthread:
+		cmdline = "[" + cmdline + "]"
+	return cmdline
+
+class ProcessInfo(object):
+	"""
+	Task of the process snapshot. Threads share the cmdline of their
+	process, only the process leaders have threads. The cgroup is the
+	content of /proc/PID/cgroup in the format of procfs (the lines in
+	reversed order joined by ','), empty if it cannot be read.
+	"""
+
+	__slots__ = ["pid", "tid", "comm", "cmdline", "kthread", "cgroup", "threads"]
+
+	def __init__(self, pid, tid, comm, cmdline, kthread, cgroup = ""):
+		self.pid = pid
+		self.tid = tid
+		self.comm = comm
+		self.cmdline = cmdline
+		self.kthread = kthread
+		self.cgroup = cgroup
+		self.threads = []
+
+class ProcessSnapshot(object):
+	"""
+	Snapshot of the running processes and their threads taken by a single
+	walk of /proc. The walk is done lazily on the first access and the
+	result is reused until a new snapshot is created.
+
+	The cmdline of the process is read once and shared by its threads,
+	the cmdline of kernel threads is their comm in square brackets.
+	"""
+
+	def __init__(self, proc_dir = consts.PROCFS_MOUNT_POINT):
+		self._proc_dir = proc_dir
+		self._processes = None
+
+	@property
+	def processes(self):
+		"""List of ProcessInfo of the process leaders.
+
+		Raises OSError, IOError if /proc cannot be read.
+		"""
+		if self._processes is None:
+			self._processes = self._load()
+		return self._processes
+
+	def tasks(self):
+		"""Iterate over all processes and threads."""
+		for process in self.processes:
+			yield process
+			for thread in process.threads:
+				yield thread
+
+	def _read(self, path):
+		with open(path, "rb") as f:
+			return f.read().decode("utf-8", "replace")
+
+	def _parse_stat(self, stat):
+		# the comm can contain spaces and parentheses
+		start = stat.index("(")
+		end = stat.rindex(")")
+		comm = stat[start + 1:end]
+		# the fields after the comm start by the state (3rd field),
+		# the flags are the 9th field
+		flags = int(stat[end + 2:].split()[6])
+		return comm, flags & PF_KTHREAD != 0
+
+	def _read_cgroup(self, path):
+		try:
+			lines = self._read(path).splitlines()
+		except (OSError, IOError):
+			return ""
+		return ",".join(reversed(lines))
+
+	def _load_process(self, pid):
+		path = "%s/%d" % (self._proc_dir, pid)
+		comm, kthread = self._parse_stat(self._read("%s/stat" % path))
+		cmdline = format_cmdline(self._read("%s/cmdline" % path), comm, kthread)
+		process = ProcessInfo(pid, pid, comm, cmdline, kthread,
+				self._read_cgroup("%s/cgroup" % path))
+		for tid in self._list_pids("%s/task" % path):
+			if tid == pid:
+				continue
+			try:
+				thread_comm, thread_kthread = self._parse_stat(
+						self._read("%s/task/%d/stat" % (path, tid)))
+			except (OSError, IOError) as e:
+				if e.errno in [errno.ENOENT, errno.ESRCH]:
+					continue
+				raise
+			process.threads.append(ProcessInfo(pid, tid, thread_comm,
+					cmdline, thread_kthread,
+					self._read_cgroup("%s/task/%d/cgroup" % (path, tid))))
+		return process
+
+	def cmdline(self, pid):
+		"""Read the cmdline of the task, it is not taken from the snapshot.
+
+		Raises OSError, IOError
+		"""
+		path = "%s/%d" % (self._proc_dir, pid)
+		comm, kthread = self._parse_stat(self._read("%s/stat" % path))
+		return format_cmdline(self._read("%s/cmdline" % path), comm, kthread)
+
+	def _list_pids(self, path):
+		return sorted(int(name) for name in os.listdir(path) if name.isdigit())
+
+	def _load(self):
+		processes = []
+		for pid in self._list_pids(self._proc_dir):
+			try:
+				processes.append(self._load_process(pid))
+			except (OSError, IOError) as e:
+				# the process vanished during the walk
+				if e.errno in [errno.ENOENT, errno.ESRCH]:
+					continue
+				raise
+		return processes
@@ -0,0 +1,140 @@
+import os
+import socket
+import struct
+import threading
+
+__all__ = ["RtNetlink"]
+
+# include/uapi/linux/netlink.h
+NETLINK_ROUTE = 0
+NLM_F_REQUEST = 0x1
+NLM_F_MULTI = 0x2
+NLM_F_ACK = 0x4
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 0x2
+NLMSG_DONE = 0x3
+# include/uapi/linux/rtnetlink.h
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+# include/uapi/linux/if_link.h
+IFLA_IFNAME = 3
+IFLA_MTU = 4
+IFLA_TXQLEN = 13
+
+# struct nlmsghdr: len, type, flags, seq, pid
+_NLMSGHDR = struct.Struct("=IHHII")
+# struct ifinfomsg: family, pad, type, index, flags, change
+_IFINFOMSG = struct.Struct("=BxHiII")
+# struct rtattr: len, type
+_RTATTR = struct.Struct("=HH")
+_U32 = struct.Struct("=I")
+
+# attributes of the links returned by dump_links()
+_LINK_ATTRS = { IFLA_MTU: "mtu", IFLA_TXQLEN: "txqueuelen" }
+
+def _align(length):
+	return (length + 3) & ~3
+
+class RtNetlink(object):
+	"""
+	Minimal rtnetlink client for reading and setting the link attributes
+	of network devices without executing 'ip link'.
+
+	dump_links() returns the attributes of all the links at once, so
+	querying of many devices costs one request. All the methods raise
+	EnvironmentError on failure, the callers are expected to fall back
+	to 'ip' then.
+	"""
+
+	def __init__(self):
+		self._sock = None
+		self._seq = 0
+		self._lock = threading.Lock()
+
+	def _open(self):
+		if self._sock is None:
+			sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+			sock.bind((0, 0))
+			self._sock = sock
+		return self._sock
+
+	def _request(self, msg_type, flags, payload):
+		"""
+		Send the request and return the list of (type, payload) of the
+		response messages, raise EnvironmentError on a netlink error.
+		"""
+		with self._lock:
+			sock = self._open()
+			self._seq += 1
+			seq = self._seq
+			sock.send(_NLMSGHDR.pack(_NLMSGHDR.size + len(payload), msg_type,
+					flags, seq, 0) + payload)
+			messages = []
+			while True:
+				data = sock.recv(65536)
+				offset = 0
+				while offset + _NLMSGHDR.size <= len(data):
+					length, rtype, rflags, rseq, pid = _NLMSGHDR.unpack_from(data, offset)
+					if length < _NLMSGHDR.size:
+						break
+					body = data[offset + _NLMSGHDR.size:offset + length]
+					offset += _align(length)
+					if rseq != seq:
+						continue
+					if rtype == NLMSG_DONE:
+						return messages
+					if rtype == NLMSG_ERROR:
+						error = -struct.unpack_from("=i", body)[0]
+						if error:
+							raise EnvironmentError(error, os.strerror(error))
+						return messages
+					messages.append((rtype, body))
+					if not rflags & NLM_F_MULTI:
+						return messages
+
+	def _parse_attrs(self, data, offset):
+		attrs = {}
+		while offset + _RTATTR.size <= len(data):
+			length, attr_type = _RTATTR.unpack_from(data, offset)
+			if length < _RTATTR.size:
+				break
+			attrs[attr_type] = data[offset + _RTATTR.size:offset + length]
+			offset += _align(length)
+		return attrs
+
+	def _pack_attr(self, attr_type, value):
+		length = _RTATTR.size + len(value)
+		return _RTATTR.pack(length, attr_type) + value + b"\0" * (_align(length) - length)
+
+	def dump_links(self):
+		"""
+		Return dict: link name -> dict of the link attributes ('mtu',
+		'txqueuelen') as strings.
+		"""
+		payload = _IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+		links = {}
+		for msg_type, body in self._request(RTM_GETLINK, NLM_F_REQUEST | NLM_F_DUMP, payload):
+			if msg_type != RTM_NEWLINK:
+				continue
+			attrs = self._parse_attrs(body, _IFINFOMSG.size)
+			if IFLA_IFNAME not in attrs:
+				continue
+			name = attrs[IFLA_IFNAME].split(b"\0", 1)[0].decode("utf-8")
+			links[name] = dict((key, str(_U32.unpack_from(attrs[attr])[0]))
+					for attr, key in _LINK_ATTRS.items() if attr in attrs)
+		return links
+
+	def set_link(self, device, mtu = None, txqueuelen = None):
+		index = socket.if_nametoindex(device)
+		payload = _IFINFOMSG.pack(socket.AF_UNSPEC, 0, index, 0, 0)
+		if mtu is not None:
+			payload += self._pack_attr(IFLA_MTU, _U32.pack(int(mtu)))
+		if txqueuelen is not None:
+			payload += self._pack_attr(IFLA_TXQLEN, _U32.pack(int(txqueuelen)))
+		self._request(RTM_NEWLINK, NLM_F_REQUEST | NLM_F_ACK, payload)
+
+	def close(self):
+		with self._lock:
+			if self._sock is not None:
+				self._sock.close()
+				self._sock = None
@@ -0,0 +1,66 @@
+import re
+import tuned.logs
+
+log = tuned.logs.get()
+
+__all__ = ["RuleMatcher"]
+
+class RuleMatcher(object):
+	"""
+	Matcher of strings against prioritized regex rules.
+
+	The rules are (regex, value) pairs ordered by increasing priority,
+	i.e. when more rules match, the value of the last one wins. All the
+	rules are compiled into one regex whose alternatives are tried in
+	the order of decreasing priority, so a string is matched in a single
+	pass. The results are cached by the string, e.g. the threads of one
+	process share the cmdline and are matched once.
+	"""
+
+	def __init__(self, rules, cache_size = 4096):
+		self._values = []
+		self._patterns = []
+		self._cache = {}
+		self._cache_size = cache_size
+		alternatives = []
+		for regex, value in reversed(rules):
+			# make any contained groups non-capturing: replace "(" with
+			# "(?:", unless the "(" is preceded by "\" or followed by "?"
+			regex = re.sub(r"(?<!\\)\((?!\?)", "(?:", str(regex))
+			alternatives.append(r"(?=[\s\S]*?(?:%s))(?P<_rule%d>)" % (regex, len(self._values)))
+			self._patterns.append(regex)
+			self._values.append(value)
+		self._regex = None
+		if alternatives:
+			try:
+				self._regex = re.compile("|".join(alternatives))
+			except re.error as e:
+				# e.g. the same named group in more rules, match the
+				# rules one by one
+				log.debug("cannot combine the rules, matching them separately: %s" % e)
+				self._patterns = [re.compile(regex) for regex in self._patterns]
+
+	def _match(self, s):
+		if self._regex is not None:
+			mo = self._regex.match(s)
+			if mo is None:
+				return None
+			return self._values[int(mo.lastgroup[5:])]
+		for pattern, value in zip(self._patterns, self._values):
+			if pattern.search(s) is not None:
+				return value
+		return None
+
+	def match(self, s):
+		"""Return the value of the winning rule or None if no rule matches."""
+		if not self._values or s is None:
+			return None
+		try:
+			return self._cache[s]
+		except KeyError:
+			pass
+		value = self._match(s)
+		if len(self._cache) >= self._cache_size:
+			self._cache.clear()
+		self._cache[s] = value
+		return value